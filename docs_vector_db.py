@@ -6,6 +6,9 @@ from langchain_community.document_loaders import RecursiveUrlLoader
 from bs4 import BeautifulSoup, SoupStrainer
 from typing import List
 from dotenv import load_dotenv
+from src.flat_index import build_flat_index, FLAT_INDEX_DIR
+from src.bm25 import build_bm25_index, LEXICAL_INDEX_DIR
+from src.symbol_index import build_symbol_index
 import os
 
 load_dotenv()
@@ -53,6 +56,13 @@ def create_docs_vector_store(vector_store_path: str = "./chroma_docs_db", base_u
 
     print(f"Vector store made at {vector_store_path}")
 
+    # exact in-process index over the same embeddings, used with RAG_BACKEND=flat
+    build_flat_index(vector_store, FLAT_INDEX_DIR / "docs")
+    # lexical index over the same chunks, used with RAG_HYBRID
+    build_bm25_index(vector_store, LEXICAL_INDEX_DIR / "docs")
+    # signatures of the installed manim, linked to these chunks by id
+    build_symbol_index(vector_store)
+
     return vector_store
 
 if __name__ == "__main__":
@@ -3,26 +3,35 @@ from langchain_openai import ChatOpenAI
 from langchain_anthropic import ChatAnthropic
 from langgraph.graph import StateGraph, START, END
 from src.state import VideoState
-from src.scripts import scriptwriter_agent
+from src.scripts import scriptwriter_agent, ascriptwriter_agent
 from src.audio import create_audio_graph
 from src.ani_planner import create_animation_planner_graph
 from src.manim_agent import create_manim_graph
-from src.reviewer import code_reviewer_node, route_after_review
-from src.composer import video_composer, render_manim_scripts
+from src.reviewer import code_reviewer_node, acode_reviewer_node, route_after_review
+from src.composer import video_composer, render_manim_scripts, arender_manim_scripts
+from src.tex_prewarm import tex_prewarm_node
+from src.validation_memo import ValidationMemo
+from src.model_tiers import ModelTierPolicy
+from src.rate_limit import configure_rate_limiter
+from src.llm_cache import configure_llm_cache
+from src.retrieval import get_retrieval_service, configure_retrieval_service
+import asyncio
 import os
 
 load_dotenv()
 
-def create_workflow():
+def create_workflow(use_async: bool = False):
+    """use_async swaps in the async nodes, the graph then has to be run with ainvoke"""
 
     workflow = StateGraph(VideoState)
 
-    workflow.add_node("scriptwriter", scriptwriter_agent)
-    workflow.add_node("audio_generation", create_audio_graph())
-    workflow.add_node("animation_planning", create_animation_planner_graph())
-    workflow.add_node("manim_generation", create_manim_graph())
-    workflow.add_node("code_reviewer", code_reviewer_node)
-    workflow.add_node("manim_renderer", render_manim_scripts)
+    workflow.add_node("scriptwriter", ascriptwriter_agent if use_async else scriptwriter_agent)
+    workflow.add_node("audio_generation", create_audio_graph(use_async))
+    workflow.add_node("animation_planning", create_animation_planner_graph(use_async))
+    workflow.add_node("manim_generation", create_manim_graph(use_async))
+    workflow.add_node("code_reviewer", acode_reviewer_node if use_async else code_reviewer_node)
+    workflow.add_node("tex_prewarm", tex_prewarm_node)
+    workflow.add_node("manim_renderer", arender_manim_scripts if use_async else render_manim_scripts)
     workflow.add_node("composer", video_composer)
 
     workflow.add_edge(START, "scriptwriter")
@@ -33,7 +42,8 @@ def create_workflow():
     workflow.add_edge(["audio_generation", "animation_planning"], "manim_generation")
 
     workflow.add_edge("manim_generation", "code_reviewer")
-    workflow.add_conditional_edges("code_reviewer", route_after_review, ["manim_generation", "manim_renderer"])
+    workflow.add_conditional_edges("code_reviewer", route_after_review, ["manim_generation", "tex_prewarm"])
+    workflow.add_edge("tex_prewarm", "manim_renderer")
    
     workflow.add_edge("manim_renderer", "composer")
     workflow.add_edge("composer", END)
@@ -55,9 +65,20 @@ def main():
     print("-" * 30)
 
     try:
+        # RATE_LIMIT_DB shares the per model budgets with other pipeline processes on this machine
+        configure_rate_limiter(shared_path=os.getenv("RATE_LIMIT_DB"))
+        # LLM_CACHE_MODE=read-write reuses responses when a topic is rerun, replay-only never calls a provider
+        llm_cache = configure_llm_cache(mode=os.getenv("LLM_CACHE_MODE", "off"), path=os.getenv("LLM_CACHE_PATH"))
+        # RAG_BACKEND=flat searches the memory-mapped indexes built next to the Chroma collections,
+        # RAG_HYBRID adds BM25 so identifier queries are answered locally
+        configure_retrieval_service(backend=os.getenv("RAG_BACKEND", "chroma"), hybrid=bool(os.getenv("RAG_HYBRID")))
+
         openai_llm = ChatOpenAI(model="gpt-5-mini", temperature=0.6)
         claude_llm = ChatAnthropic(model="claude-sonnet-4-5-20250929", temperature=0.6)
-        app = create_workflow()
+        claude_fast_llm = ChatAnthropic(model="claude-haiku-4-5", temperature=0.6)
+        # ASYNC_PIPELINE runs the graph on one event loop with per resource semaphores instead of thread pools
+        use_async = bool(os.getenv("ASYNC_PIPELINE"))
+        app = create_workflow(use_async)
 
 
         initial_state = VideoState(
@@ -71,18 +92,32 @@ def main():
         print(initial_state)
         print("Starting the video generation pipeline")
 
-        result = app.invoke(
-            initial_state,
-            config={
-                "configurable": {
-                    "script_llm": openai_llm,
-                    "animation_llm": claude_llm,
-                    "manim_llm": claude_llm,
-                    "review_llm": claude_llm,
-                    "summary_llm": openai_llm
-                }
+        config = {
+            "configurable": {
+                "script_llm": openai_llm,
+                "animation_llm": claude_llm,
+                "manim_llm": claude_llm,
+                "review_llm": claude_llm,
+                "summary_llm": openai_llm,
+                "manim_tiers": ModelTierPolicy(strong=claude_llm, fast=claude_fast_llm, escalate_after=1),
+                "review_tiers": ModelTierPolicy(strong=claude_llm, fast=claude_fast_llm, escalate_after=2),
+                "validation_memo": ValidationMemo(path=os.getenv("VALIDATION_MEMO_PATH")),
+                "manim_candidates": 1,
+                "manim_candidate_token_cap": None,
+                "concurrency_limits": {"llm": 8, "embedding": 16, "tts": 4, "review": 4}
             }
-        )
+        }
+
+        if use_async:
+            result = asyncio.run(app.ainvoke(initial_state, config=config))
+        else:
+            result = app.invoke(initial_state, config=config)
+
+        if llm_cache.enabled:
+            print(f"----LLM cache ({llm_cache.mode}): {llm_cache.hits} hits, {llm_cache.misses} misses")
+
+        embedding_stats = get_retrieval_service().embedding_cache.stats()
+        print(f"----Embedding cache: {embedding_stats['memory_hits']} memory hits, {embedding_stats['disk_hits']} disk hits, {embedding_stats['misses']} misses")
 
         if isinstance(result, dict):
             error = result.get('error')
@@ -5,6 +5,8 @@ from langchain.schema import Document
 from langchain_chroma import Chroma
 from langchain_openai import OpenAIEmbeddings
 from langchain_text_splitters import RecursiveCharacterTextSplitter, Language
+from src.flat_index import build_flat_index, FLAT_INDEX_DIR
+from src.bm25 import build_bm25_index, LEXICAL_INDEX_DIR
 
 load_dotenv()
 
@@ -97,6 +99,11 @@ def create_manim_db(source_dir: str = "./data/videos", output_dir: str = "./mani
     print("\n\nDone addding docs")
     print(f"----Files: {len(documents)}\n----Chunks: {len(all_splits)}\n----Location: {chroma_dir}\n")
 
+    # exact in-process index over the same embeddings, used with RAG_BACKEND=flat
+    build_flat_index(vector_store, FLAT_INDEX_DIR / "manim_code")
+    # lexical index over the same chunks, used with RAG_HYBRID
+    build_bm25_index(vector_store, LEXICAL_INDEX_DIR / "manim_code")
+
     return vector_store
     
 if __name__ == "__main__":
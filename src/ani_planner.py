@@ -1,117 +1,126 @@
 from langgraph.types import Send
 from langgraph.graph import StateGraph, START, END
-from langchain_openai import ChatOpenAI, OpenAIEmbeddings
-from langchain_chroma import Chroma
+from langchain_openai import ChatOpenAI
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.messages import HumanMessage
 from typing import List
 from .state import VideoSegment, VideoState, OutputSchema
+from .rate_limit import safe_llm_invoke, safe_llm_ainvoke
+from .retrieval import query_manim_rag, query_rag_batch
+from .concurrency import get_semaphore
+from .context_packer import pack_context, get_context_budget
 from langchain_core.runnables.config import RunnableConfig
-import os
+import asyncio
 
 def animation_planner_orchestrator(state: VideoState) -> List[Send]:
     print(f"Starting animation planner orchestrator for {len(state.segments)} segments")
-    return [Send("animation_planner_worker", {"segment": segment}) for segment in state.segments]
+    # one embedding request and one search for all segments, workers fall back to their own lookup
+    code_examples = query_rag_batch("manim_code", [segment.text for segment in state.segments], 5) or [None] * len(state.segments)
+
+    return [
+        Send("animation_planner_worker", {"segment": segment, "code_examples": examples})
+        for segment, examples in zip(state.segments, code_examples)
+    ]
+
+def _planner_messages(segment, code_examples: str):
+    prompt = ChatPromptTemplate.from_messages([
+        ("system", "You are an expert at creating Manim library animation descriptions/pseudocode for animations in educational videos."),
+        ("human", """Create a detailed Manim pseudocode for this segment:
+
+            Narration: {text}
+            Duration: {duration} seconds
+         
+            Below are some of the code examples from 3Blue1Brown.
+            You can refer to them for making the animation pseudocode.
+            NOTE: The code provided may or may not match this particular animation narration.
+            So use the code as reference only after checking that it is matching this particular animation narration
+         
+            <START OF CODE EXAMPLES>
+         
+            {examples}
+         
+            <END OF CODE EXAMPLES>
+            
+            NOTE: YOU ONLY HAVE TO PROVIDE PSEUDOCODE BASED ON THE NARRATION GIVEN ABOVE.
+            The video style should match to that of the youtube channel 3Blue1brown by
+            Grant Sanderson. The video animation prompt/pseudocode should be something that
+            Manim library can make good animations of, like colourful graphs, diagrams, 3d/2d plots and curves,
+            mathematical expressions, symbols, equations and written words, etc.
+
+            Provide a clear, specific animation pseudocode that:
+            1. Matches the narration content, The pseudocode should strictly supplement or match the Narration text
+            2. Can be created with Manim (mathematical animations library)
+            3. Is visually engaging and educational
+            4. Can be completed in {duration} seconds
+            5. Uses Manim's capabilities: graphs, equations, geometric shapes, transformations
+            6. They should sync with the narration provided.
+
+            Include:
+            - What objects to show (text, shapes, graphs, equations, diagrams)
+            - What animations to use (FadeIn, Transform, Create, Write, etc.)
+            - Color scheme (use vibrant colors)
+            - Key visual moments that sync with narration
+         
+            pseudocode instructions:
+            1. The pseudocode should be detailed, describing every animation to last detail
+            2. The coding agent can refer to the pseudocode and create exact animations using the manim library
+            3. Make sure that the functions, tools that you use are available in the manim library.
+
+            Be specific and concise.
+            """)
+    ])
+
+    return prompt.format_messages(
+        text = segment.text,
+        duration = segment.audio_duration_sec,
+        examples = code_examples,
+    )
+
+def animation_planner_worker(data: dict, config: RunnableConfig) -> dict:
+
+    segment = data["segment"]
+
+    chunks = data.get("code_examples")
+    if chunks is None:
+        chunks = query_manim_rag(query=segment.text, k=5)
+    code_examples = pack_context(chunks, get_context_budget(config["configurable"], "planner"), f"Segment {segment.segment_id} planner").get("code_examples", "")
+
+    llm = config["configurable"]["animation_llm"]
+
+    print(f"----Worker planning animation for the segment {segment.segment_id}")
 
-def query_manim_rag(query: str, k: int) -> str:
     try:
-        chroma_dir = "./chroma_manim_db"
-
-        if not os.path.exists(chroma_dir):
-            print(f"Warning: No database found at {chroma_dir}")
-            return ""
-        
-        embeddings = OpenAIEmbeddings(model="text-embedding-3-small")
-
-        vector_store = Chroma(
-            collection_name="manim_code",
-            embedding_function=embeddings,
-            persist_directory=chroma_dir
-        )
-
-        results = vector_store.similarity_search_with_score(query=query, k=k)
-
-        if not results:
-            print("no results found from rag")
-            return ""
-        
-        examples_text = ""
-        
-        for i, (doc, score) in enumerate(results, 1):
-            examples_text += f"--- Example {i} (from {doc.metadata.get('file', 'unknown')}, similarity: {score:.2f}) ---\n"
-            examples_text += f"```python\n{doc.page_content}\n```\n\n"        
-
-        return examples_text
+        messages = _planner_messages(segment, code_examples)
 
-    except Exception as e:
-        print(f"Error with RAG query: {e}")
-        return ""
+        response = safe_llm_invoke(llm, messages)
+        segment.animation_prompt = response.content
 
-def animation_planner_worker(data: dict, config: RunnableConfig) -> dict:
+        print(f"----The animation prompt of segment {segment.segment_id} is created.")
+        return {"segments": [segment]}
+    except Exception as e:
+        print(f"Error creating segment: {e}")
+        return {"segments": [segment]}
+    
+async def aanimation_planner_worker(data: dict, config: RunnableConfig) -> dict:
 
     segment = data["segment"]
+    configurable = config["configurable"]
 
-    code_examples = query_manim_rag(query=segment.text, k=3)
+    chunks = data.get("code_examples")
+    if chunks is None:
+        async with get_semaphore(configurable, "embedding"):
+            chunks = await asyncio.to_thread(query_manim_rag, segment.text, 5)
+    code_examples = pack_context(chunks, get_context_budget(configurable, "planner"), f"Segment {segment.segment_id} planner").get("code_examples", "")
 
-    llm = config["configurable"]["animation_llm"]
+    llm = configurable["animation_llm"]
 
     print(f"----Worker planning animation for the segment {segment.segment_id}")
 
     try:
-        prompt = ChatPromptTemplate.from_messages([
-            ("system", "You are an expert at creating Manim library animation descriptions/pseudocode for animations in educational videos."),
-            ("human", """Create a detailed Manim pseudocode for this segment:
-
-                Narration: {text}
-                Duration: {duration} seconds
-             
-                Below are some of the code examples from 3Blue1Brown.
-                You can refer to them for making the animation pseudocode.
-                NOTE: The code provided may or may not match this particular animation narration.
-                So use the code as reference only after checking that it is matching this particular animation narration
-             
-                <START OF CODE EXAMPLES>
-             
-                {examples}
-             
-                <END OF CODE EXAMPLES>
-                
-                NOTE: YOU ONLY HAVE TO PROVIDE PSEUDOCODE BASED ON THE NARRATION GIVEN ABOVE.
-                The video style should match to that of the youtube channel 3Blue1brown by
-                Grant Sanderson. The video animation prompt/pseudocode should be something that
-                Manim library can make good animations of, like colourful graphs, diagrams, 3d/2d plots and curves,
-                mathematical expressions, symbols, equations and written words, etc.
-
-                Provide a clear, specific animation pseudocode that:
-                1. Matches the narration content, The pseudocode should strictly supplement or match the Narration text
-                2. Can be created with Manim (mathematical animations library)
-                3. Is visually engaging and educational
-                4. Can be completed in {duration} seconds
-                5. Uses Manim's capabilities: graphs, equations, geometric shapes, transformations
-                6. They should sync with the narration provided.
-
-                Include:
-                - What objects to show (text, shapes, graphs, equations, diagrams)
-                - What animations to use (FadeIn, Transform, Create, Write, etc.)
-                - Color scheme (use vibrant colors)
-                - Key visual moments that sync with narration
-             
-                pseudocode instructions:
-                1. The pseudocode should be detailed, describing every animation to last detail
-                2. The coding agent can refer to the pseudocode and create exact animations using the manim library
-                3. Make sure that the functions, tools that you use are available in the manim library.
-
-                Be specific and concise.
-                """)
-        ])
-
-        messages = prompt.format_messages(
-            text = segment.text,
-            duration = segment.audio_duration_sec,
-            examples = code_examples,
-        )
-
-        response = llm.invoke(messages)
+        messages = _planner_messages(segment, code_examples)
+
+        async with get_semaphore(configurable, "llm"):
+            response = await safe_llm_ainvoke(llm, messages)
         segment.animation_prompt = response.content
 
         print(f"----The animation prompt of segment {segment.segment_id} is created.")
@@ -120,11 +129,11 @@ def animation_planner_worker(data: dict, config: RunnableConfig) -> dict:
         print(f"Error creating segment: {e}")
         return {"segments": [segment]}
     
-def create_animation_planner_graph():
+def create_animation_planner_graph(use_async: bool = False):
     graph = StateGraph(state_schema=VideoState, output_schema=OutputSchema)
     try:
 
-        graph.add_node("animation_planner_worker", animation_planner_worker)
+        graph.add_node("animation_planner_worker", aanimation_planner_worker if use_async else animation_planner_worker)
 
         graph.add_conditional_edges(START, animation_planner_orchestrator)
         graph.add_edge("animation_planner_worker", END)
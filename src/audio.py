@@ -1,22 +1,21 @@
 from langgraph.types import Send
 from langgraph.graph import StateGraph, START, END
-from openai import OpenAI
+from openai import OpenAI, AsyncOpenAI
+from langchain_core.runnables.config import RunnableConfig
 from typing import List
 from pathlib import Path
 from .state import VideoSegment, VideoState,OutputSchema
 from pydub import AudioSegment
+from .rate_limit import get_rate_limiter, estimate_tokens, TTS_KEY
+from .concurrency import get_semaphore
+import asyncio
 
 def audio_orchestrator(state: VideoState) -> List[Send]:
     print(f"Running audio orchestrator for creating audio for {len(state.segments)} segments\n")
 
     return [Send("audio_worker", {"segment": segment}) for segment in state.segments]
 
-def audio_worker(seg: dict) -> dict:
-    segment = seg["segment"]
-
-    print(f"----Worker processing segement ID: {segment.segment_id}")
-
-    instructions = """Voice Affect: Calm, composed, and reassuring; project quiet authority and confidence.
+VOICE_INSTRUCTIONS = """Voice Affect: Calm, composed, and reassuring; project quiet authority and confidence.
     Tone: Sincere, empathetic, and gently authoritative—express genuine apology while conveying competence.
     Pacing: Steady and moderate; unhurried enough to communicate care, yet efficient enough to demonstrate professionalism.
     Emotion: Genuine empathy and understanding; speak with warmth, especially during apologies ("I'm very sorry for any disruption...").
@@ -24,6 +23,12 @@ def audio_worker(seg: dict) -> dict:
     Pauses: Brief pauses after offering assistance or requesting details, highlighting willingness to listen and support.    
     """
 
+def audio_worker(seg: dict) -> dict:
+    segment = seg["segment"]
+
+    print(f"----Worker processing segement ID: {segment.segment_id}")
+
+
     try:
         client = OpenAI()
         audio_dir = Path("video_files/audio")
@@ -31,11 +36,12 @@ def audio_worker(seg: dict) -> dict:
 
         audio_path = audio_dir / f"segment_{segment.segment_id}.mp3"
 
+        get_rate_limiter().acquire(TTS_KEY, estimate_tokens(segment.text))
         with client.audio.speech.with_streaming_response.create(
             model="gpt-4o-mini-tts",
             voice="sage",
             input=segment.text,
-            instructions=instructions,
+            instructions=VOICE_INSTRUCTIONS,
         ) as response:
             response.stream_to_file(audio_path)
 
@@ -51,11 +57,46 @@ def audio_worker(seg: dict) -> dict:
         print(f"----Error in segment: {e}")
         return {"segments": [segment]}
     
-def create_audio_graph():
+async def aaudio_worker(seg: dict, config: RunnableConfig) -> dict:
+    segment = seg["segment"]
+
+    print(f"----Worker processing segement ID: {segment.segment_id}")
+
+    try:
+        client = AsyncOpenAI()
+        audio_dir = Path("video_files/audio")
+        audio_dir.mkdir(parents=True, exist_ok=True)
+
+        audio_path = audio_dir / f"segment_{segment.segment_id}.mp3"
+
+        async with get_semaphore(config["configurable"], "tts"):
+            await get_rate_limiter().aacquire(TTS_KEY, estimate_tokens(segment.text))
+            async with client.audio.speech.with_streaming_response.create(
+                model="gpt-4o-mini-tts",
+                voice="sage",
+                input=segment.text,
+                instructions=VOICE_INSTRUCTIONS,
+            ) as response:
+                await response.stream_to_file(audio_path)
+
+        # pydub shells out to ffmpeg, keep it off the event loop
+        audio = await asyncio.to_thread(AudioSegment.from_mp3, str(audio_path))
+        duration = len(audio) / 1000.0
+
+        segment.audio_path = str(audio_path)
+        segment.audio_duration_sec = duration
+
+        print(f"----Segment {segment.segment_id} audio generated with duration of {duration:.2f} seconds")
+        return {"segments": [segment]}
+    except Exception as e:
+        print(f"----Error in segment: {e}")
+        return {"segments": [segment]}
+    
+def create_audio_graph(use_async: bool = False):
 
     graph = StateGraph(state_schema=VideoState, output_schema=OutputSchema)
     try:
-        graph.add_node("audio_worker", audio_worker)
+        graph.add_node("audio_worker", aaudio_worker if use_async else audio_worker)
 
         graph.add_conditional_edges(START, audio_orchestrator)
         graph.add_edge("audio_worker", END)
@@ -0,0 +1,149 @@
+from typing import Callable, Dict, List, Tuple
+import tokenize
+import io
+import re
+import ast
+from .static_check import _bound_names
+
+VALID_COLORS = {"BLUE", "RED", "GREEN", "YELLOW", "PURPLE", "ORANGE", "WHITE", "PINK", "GRAY"}
+
+COLOR_REPLACEMENTS = {
+    "GOLD": "YELLOW",
+    "TEAL": "GREEN",
+    "CYAN": "BLUE",
+    "MAGENTA": "PINK",
+    "MAROON": "RED",
+}
+
+COLOR_PREFIXES = ("PASTEL_", "VIVID_", "BRIGHT_")
+
+SCENE_BASES = {"Scene", "ThreeDScene"}
+
+# error signatures that show up in dry run logs rather than static diagnostics
+LOG_SIGNATURES = [
+    (re.compile(r"NameError: name '(\w+)' is not defined"), "undefined_name"),
+    (re.compile(r"No valid class found, must inherit from Scene or ThreeDScene"), "invalid_base_class"),
+]
+
+def _replace_names(code: str, mapping: Dict[str, str]) -> str:
+    """Rename bare NAME tokens, leaving strings, comments and attribute access alone"""
+    lines = code.splitlines(keepends=True)
+    edits = []
+    previous = None
+
+    for token in tokenize.generate_tokens(io.StringIO(code).readline):
+        if token.type == tokenize.NAME and token.string in mapping and not (previous and previous.string == "."):
+            edits.append((token.start, token.end, mapping[token.string]))
+        if token.type not in (tokenize.NL, tokenize.NEWLINE, tokenize.COMMENT):
+            previous = token
+
+    for (start_row, start_col), (_, end_col), replacement in reversed(edits):
+        line = lines[start_row - 1]
+        lines[start_row - 1] = line[:start_col] + replacement + line[end_col:]
+
+    return "".join(lines)
+
+def _color_replacement(name: str) -> str:
+    if name in COLOR_REPLACEMENTS:
+        return COLOR_REPLACEMENTS[name]
+    for prefix in COLOR_PREFIXES:
+        if name.startswith(prefix):
+            base = name[len(prefix):]
+            return base if base in VALID_COLORS else "WHITE"
+    return ""
+
+def fix_colors(code: str, segment_id: int) -> str:
+    try:
+        bound = _bound_names(ast.parse(code))
+    except SyntaxError:
+        return code
+
+    # names the script binds itself (BRIGHT_RED = "#ff0000", VIVID_SCALE = 1.2) are its own, not manim colours
+    names = set(re.findall(r"\b[A-Z][A-Z_]+\b", code)) - bound
+    mapping = {name: _color_replacement(name) for name in names if _color_replacement(name)}
+    return _replace_names(code, mapping) if mapping else code
+
+def fix_missing_import(code: str, segment_id: int) -> str:
+    if re.search(r"^\s*from manim import", code, re.MULTILINE):
+        return code
+    return "from manim import *\n\n" + code
+
+def _set_bases(code: str, class_node: ast.ClassDef, base: str) -> str:
+    lines = code.splitlines(keepends=True)
+
+    if class_node.bases:
+        first, last = class_node.bases[0], class_node.bases[-1]
+        if first.lineno != last.end_lineno:
+            return code
+        line = lines[first.lineno - 1]
+        lines[first.lineno - 1] = line[:first.col_offset] + base + line[last.end_col_offset:]
+    else:
+        line = lines[class_node.lineno - 1]
+        lines[class_node.lineno - 1] = re.sub(rf"class\s+{class_node.name}\s*(\(\s*\))?\s*:", f"class {class_node.name}({base}):", line, count=1)
+
+    return "".join(lines)
+
+def fix_base_class(code: str, segment_id: int) -> str:
+    code = _replace_names(code, {"MovingCameraScene": "Scene"})
+
+    tree = ast.parse(code)
+    for node in tree.body:
+        if isinstance(node, ast.ClassDef) and node.name == f"Segment{segment_id}":
+            bases = {base.id for base in node.bases if isinstance(base, ast.Name)}
+            if not bases & SCENE_BASES:
+                return _set_bases(code, node, "Scene")
+    return code
+
+def fix_scene_class_name(code: str, segment_id: int) -> str:
+    expected = f"Segment{segment_id}"
+    tree = ast.parse(code)
+
+    classes = [node for node in tree.body if isinstance(node, ast.ClassDef)]
+    if any(node.name == expected for node in classes):
+        return code
+
+    scenes = [
+        node for node in classes
+        if any(isinstance(base, ast.Name) and base.id in SCENE_BASES | {"MovingCameraScene"} for base in node.bases)
+    ]
+    if len(scenes) != 1:
+        return code
+
+    return _replace_names(code, {scenes[0].name: expected})
+
+def fix_undefined_color(code: str, segment_id: int) -> str:
+    # only colours are safe to fix blindly, other undefined names go to the llm
+    return fix_colors(code, segment_id)
+
+RULES: Dict[str, Callable[[str, int], str]] = {
+    "forbidden_color": fix_colors,
+    "missing_import": fix_missing_import,
+    "forbidden_base_class": fix_base_class,
+    "invalid_base_class": fix_base_class,
+    "missing_scene_class": fix_scene_class_name,
+    "undefined_name": fix_undefined_color,
+}
+
+def error_signatures(logs: str) -> List[str]:
+    """Signature codes found in the logs, static diagnostics are printed as `[code] ...`"""
+    signatures = re.findall(r"^\[(\w+)\]", logs, re.MULTILINE)
+    for pattern, signature in LOG_SIGNATURES:
+        if pattern.search(logs):
+            signatures.append(signature)
+    return list(dict.fromkeys(signatures))
+
+def apply_autofixes(code: str, logs: str, segment_id: int) -> Tuple[str, List[str]]:
+    """Apply every rule whose signature is in the logs, returns the new code and the rules that changed it"""
+    applied = []
+    for signature in error_signatures(logs):
+        rule = RULES.get(signature)
+        if rule is None:
+            continue
+        try:
+            fixed = rule(code, segment_id)
+        except (SyntaxError, tokenize.TokenError, IndentationError):
+            continue
+        if fixed != code:
+            code = fixed
+            applied.append(signature)
+    return (code, applied)
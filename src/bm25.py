@@ -0,0 +1,109 @@
+from langchain_core.documents import Document
+from collections import Counter
+from pathlib import Path
+from typing import Dict, List, Tuple
+import json
+import math
+import re
+
+LEXICAL_INDEX_DIR = Path("./lexical_index")
+INDEX_FILE = "bm25.json"
+
+WORD = re.compile(r"[A-Za-z_][A-Za-z0-9_]*")
+CAMEL_PART = re.compile(r"[A-Z]+(?=[A-Z][a-z])|[A-Z]?[a-z]+|[A-Z]+|\d+")
+
+def tokenize(text: str) -> List[str]:
+    """Identifier aware tokens, MathTex -> mathtex, math, tex and add_fixed_in_frame -> the whole name plus its parts"""
+    tokens = []
+    for word in WORD.findall(text):
+        lower = word.lower()
+        tokens.append(lower)
+        parts = [part.lower() for piece in word.split("_") for part in CAMEL_PART.findall(piece)]
+        if len(parts) > 1:
+            tokens.extend(part for part in parts if len(part) > 1)
+    return tokens
+
+def is_identifier_query(query: str) -> bool:
+    """Queries made mostly of code identifiers, which lexical search answers better than embeddings"""
+    words = query.replace("'", " ").replace(":", " ").split()
+    if not words:
+        return False
+    identifiers = [word for word in words if re.search(r"[a-z][A-Z]|_|\.|\(|^[A-Z][a-z]+[A-Z]", word)]
+    return len(identifiers) / len(words) >= 0.5
+
+class BM25Index:
+    """Okapi BM25 over an inverted index of a collection's chunks, stored as one json file"""
+
+    def __init__(self, postings: Dict[str, List[List[int]]], lengths: List[int], documents: List[str], metadatas: List[dict], k1: float = 1.5, b: float = 0.75):
+        self.postings = postings
+        self.lengths = lengths
+        self.documents = documents
+        self.metadatas = metadatas
+        self.k1 = k1
+        self.b = b
+        self.average_length = sum(lengths) / len(lengths) if lengths else 0.0
+
+    @classmethod
+    def from_texts(cls, documents: List[str], metadatas: List[dict]) -> "BM25Index":
+        postings: Dict[str, List[List[int]]] = {}
+        lengths = []
+        for doc_id, text in enumerate(documents):
+            counts = Counter(tokenize(text))
+            lengths.append(sum(counts.values()))
+            for term, count in counts.items():
+                postings.setdefault(term, []).append([doc_id, count])
+        return cls(postings, lengths, documents, metadatas)
+
+    @classmethod
+    def load(cls, index_dir: Path) -> "BM25Index":
+        with open(Path(index_dir) / INDEX_FILE, encoding="utf-8") as f:
+            data = json.load(f)
+        return cls(data["postings"], data["lengths"], data["documents"], data["metadatas"])
+
+    @staticmethod
+    def exists(index_dir: Path) -> bool:
+        return (Path(index_dir) / INDEX_FILE).exists()
+
+    def save(self, index_dir: Path):
+        index_dir = Path(index_dir)
+        index_dir.mkdir(parents=True, exist_ok=True)
+        tmp_path = index_dir / f"tmp_{INDEX_FILE}"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"postings": self.postings, "lengths": self.lengths, "documents": self.documents, "metadatas": self.metadatas}, f)
+        tmp_path.replace(index_dir / INDEX_FILE)
+
+    def search(self, query: str, k: int) -> List[Tuple[Document, float]]:
+        """(document, bm25 score) pairs, best first, only documents sharing a term with the query"""
+        total = len(self.lengths)
+        scores: Dict[int, float] = {}
+
+        for term in set(tokenize(query)):
+            postings = self.postings.get(term)
+            if not postings:
+                continue
+            idf = math.log(1 + (total - len(postings) + 0.5) / (len(postings) + 0.5))
+            for doc_id, count in postings:
+                norm = self.k1 * (1 - self.b + self.b * self.lengths[doc_id] / (self.average_length or 1))
+                scores[doc_id] = scores.get(doc_id, 0.0) + idf * count * (self.k1 + 1) / (count + norm)
+
+        best = sorted(scores.items(), key=lambda item: -item[1])[:k]
+        return [(Document(page_content=self.documents[i], metadata=self.metadatas[i]), score) for i, score in best]
+
+def build_bm25_index(vector_store, index_dir: Path) -> BM25Index:
+    """Lexical index over the same chunks as a Chroma collection"""
+    data = vector_store._collection.get(include=["documents", "metadatas"])
+    index = BM25Index.from_texts(data["documents"], [metadata or {} for metadata in data["metadatas"]])
+    index.save(index_dir)
+    print(f"----BM25 index with {len(index.lengths)} chunks and {len(index.postings)} terms written to {index_dir}")
+    return index
+
+if __name__ == "__main__":
+    from langchain_chroma import Chroma
+    from .retrieval import COLLECTIONS
+
+    for collection, persist_directory in COLLECTIONS.items():
+        if not Path(persist_directory).exists():
+            print(f"Warning: No database found at {persist_directory}")
+            continue
+        # reading documents back never embeds, so no embedding function is needed
+        build_bm25_index(Chroma(collection_name=collection, persist_directory=persist_directory), LEXICAL_INDEX_DIR / collection)
@@ -1,91 +1,265 @@
 from pathlib import Path
 from moviepy import VideoFileClip, AudioFileClip, concatenate_videoclips
 from .state import VideoState
+from langchain_core.runnables.config import RunnableConfig
+from .render_cache import RenderCache, get_render_cache, render_cache_key
+from .tex_cache import TexCache, get_tex_cache
+from .tex_prewarm import tex_svg_names
+from .manim_server import run_manim, arun_manim
+from .concurrency import get_semaphore
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Optional
 import subprocess
+import asyncio
 import os
 import uuid
 import shutil
 import re
 
-def render_manim_scripts(state: VideoState) -> VideoState:
+RENDER_FLAGS = ["-qh", "--format", "mp4"]
+
+def _default_render_workers(threads_per_render: int) -> int:
+    cores = os.cpu_count() or 1
+    return max(1, cores // max(1, threads_per_render))
+
+def _prepare_render(segment_id: int, manim_script: str, manim_dir: Path, video_dir: Path, cache: Optional[RenderCache], tex_cache: Optional[TexCache]) -> dict:
+    """Write the script and set up the job's media/TeX dirs, the job is marked cached on a render cache hit"""
+
+    script_path = manim_dir / f"segment_{segment_id}.py"
+
+    # Save the reviewed script
+    with open(script_path, "w") as f:
+        f.write(manim_script)
+
+    video_path = video_dir / f"segment_{segment_id}.mp4"
+    video_dir.mkdir(parents=True, exist_ok=True)
+
+    # Extract class name from script
+    class_match = re.search(r'class\s+(\w+)\s*\(', manim_script)
+    class_name = class_match.group(1) if class_match else f"Segment{segment_id}"
+
+    cache_key = render_cache_key(manim_script, class_name, RENDER_FLAGS)
+    if cache is not None and cache.fetch(cache_key, video_path):
+        print(f"----Segment {segment_id} served from render cache")
+        return {"cached": True, "video_path": video_path}
+
+    print(f"----Rendering segment {segment_id}...")
+
+    # the old file may be a hard link into the render cache, never let manim write through it
+    video_path.unlink(missing_ok=True)
+
+    # every worker gets its own media and tex dir so concurrent renders never share partial files
+    unique_media_dir = manim_dir / f"media_temp_{uuid.uuid4()}"
+    unique_tex_dir = unique_media_dir / "Tex"
+    unique_tex_dir.mkdir(parents=True, exist_ok=True)
+
+    if tex_cache is not None:
+        tex_cache.seed(unique_media_dir, tex_svg_names(manim_script))
+
+    return {
+        "cached": False,
+        "segment_id": segment_id,
+        "script_path": script_path,
+        "video_path": video_path,
+        "class_name": class_name,
+        "cache_key": cache_key,
+        "media_dir": unique_media_dir,
+        "env": {
+            "MANIMCE_TEX_DIR": str(unique_tex_dir),
+            "MANIM_DISABLE_CACHING": "true",
+        },
+        "args": [
+            str(script_path.absolute()),
+            class_name,
+            *RENDER_FLAGS,
+            "--media_dir", str(unique_media_dir.absolute()),
+            "-o", str(video_path.absolute()),
+            "--disable_caching"
+        ],
+    }
+
+def _finish_render(job: dict, result, cache: Optional[RenderCache], tex_cache: Optional[TexCache]) -> str:
+    segment_id = job["segment_id"]
+    script_path = job["script_path"]
+    video_path = job["video_path"]
+    class_name = job["class_name"]
+    unique_media_dir = job["media_dir"]
+
+    if result.returncode != 0:
+        print(f"----Render error for segment {segment_id}: {result.stderr}")
+
+        # Check default locations
+        default_locations = [
+            unique_media_dir / "videos" / script_path.stem / "1080p60" / f"{class_name}.mp4",
+            unique_media_dir / "videos" / script_path.stem / "720p30" / f"{class_name}.mp4",
+        ]
+
+        for default_path in default_locations:
+            if default_path.exists():
+                shutil.move(str(default_path), str(video_path))
+                print(f"----Found video in default location, moved to {video_path}")
+                break
+
+    if tex_cache is not None and result.returncode == 0:
+        tex_cache.publish(unique_media_dir)
+
+    if video_path.exists():
+        print(f"----Segment {segment_id} rendered successfully")
+        if cache is not None and result.returncode == 0:
+            cache.store(job["cache_key"], video_path)
+        return str(video_path)
+
+    print(f"----ERROR: Video not created for segment {segment_id}")
+    return ""
+
+def _render_segment(segment_id: int, manim_script: str, manim_dir: Path, video_dir: Path, timeout: int = 180, cache: Optional[RenderCache] = None, tex_cache: Optional[TexCache] = None, use_server: bool = True, memory_mb: Optional[int] = None) -> str:
+    """Render a single segment in its own media/TeX dirs, returns the video path or empty string"""
+
+    job = _prepare_render(segment_id, manim_script, manim_dir, video_dir, cache, tex_cache)
+    if job["cached"]:
+        return str(job["video_path"])
+
+    try:
+        result = run_manim(
+            job["args"],
+            env=job["env"],
+            timeout=timeout,
+            memory_mb=memory_mb,
+            use_server=use_server,
+        )
+        return _finish_render(job, result, cache, tex_cache)
+
+    finally:
+        shutil.rmtree(job["media_dir"], ignore_errors=True)
+
+async def _arender_segment(segment_id: int, manim_script: str, manim_dir: Path, video_dir: Path, timeout: int = 180, cache: Optional[RenderCache] = None, tex_cache: Optional[TexCache] = None, use_server: bool = True, memory_mb: Optional[int] = None) -> str:
+    job = _prepare_render(segment_id, manim_script, manim_dir, video_dir, cache, tex_cache)
+    if job["cached"]:
+        return str(job["video_path"])
+
+    try:
+        result = await arun_manim(
+            job["args"],
+            env=job["env"],
+            timeout=timeout,
+            memory_mb=memory_mb,
+            use_server=use_server,
+        )
+        return _finish_render(job, result, cache, tex_cache)
+
+    finally:
+        shutil.rmtree(job["media_dir"], ignore_errors=True)
+
+def render_manim_scripts(state: VideoState, config: RunnableConfig) -> VideoState:
 
     print("Starting manim scripts rendering for all segments....")
 
+    configurable = config["configurable"]
+    threads_per_render = configurable.get("render_threads_per_job", 2)
+    max_workers = configurable.get("render_workers") or _default_render_workers(threads_per_render)
+    timeout = configurable.get("render_timeout", 180)
+    cache = get_render_cache(configurable)
+    tex_cache = get_tex_cache(configurable)
+    use_server = configurable.get("manim_server", True)
+    memory_mb = configurable.get("manim_memory_mb")
+
     manim_dir = Path("video_files/manim_script")
     video_dir = Path("video_files/video")
-    
+    manim_dir.mkdir(parents=True, exist_ok=True)
+
+    segments_to_render = []
     for segment in state.segments:
         if not segment.manim_script:
             print(f"----Skipping segment {segment.segment_id}: No script")
             continue
-        
-        script_path = manim_dir / f"segment_{segment.segment_id}.py"
-        
-        # Save the reviewed script
-        with open(script_path, "w") as f:
-            f.write(segment.manim_script)
-        
-        print(f"----Rendering segment {segment.segment_id}...")
-        
-        try:
-            video_path = video_dir / f"segment_{segment.segment_id}.mp4"
-            video_dir.mkdir(parents=True, exist_ok=True)
-            
-            unique_tex_dir = manim_dir / f"tex_temp_{uuid.uuid4()}"
-            unique_tex_dir.mkdir(exist_ok=True)
-            
-            env = os.environ.copy()
-            env["MANIMCE_TEX_DIR"] = str(unique_tex_dir)
-            env["MANIM_DISABLE_CACHING"] = "true"
-            
-            # Extract class name from script
-            class_match = re.search(r'class\s+(\w+)\s*\(', segment.manim_script)
-            class_name = class_match.group(1) if class_match else f"Segment{segment.segment_id}"
-            
-            render_cmd = [
-                "manim",
-                str(script_path.absolute()),
-                class_name,
-                "-qh",
-                "--format", "mp4",
-                "-o", str(video_path.absolute()),
-                "--disable_caching"
-            ]
-            
-            result = subprocess.run(
-                render_cmd,
-                capture_output=True,
-                text=True,
-                timeout=180,
-                env=env,
-            )
-            
-            if result.returncode != 0:
-                print(f"----Render error for segment {segment.segment_id}: {result.stderr}")
-                
-                # Check default locations
-                default_locations = [
-                    Path("media/videos") / script_path.stem / "1080p60" / f"{class_name}.mp4",
-                    Path("media/videos") / script_path.stem / "720p30" / f"{class_name}.mp4",
-                ]
-                
-                for default_path in default_locations:
-                    if default_path.exists():
-                        shutil.move(str(default_path), str(video_path))
-                        print(f"----Found video in default location, moved to {video_path}")
-                        break
-            
-            if video_path.exists():
-                segment.video_path = str(video_path)
-                print(f"----Segment {segment.segment_id} rendered successfully")
-            else:
-                print(f"----ERROR: Video not created for segment {segment.segment_id}")
-            
-            shutil.rmtree(unique_tex_dir, ignore_errors=True)
-            
-        except Exception as e:
-            print(f"----Error rendering segment {segment.segment_id}: {e}")
-    
+        segments_to_render.append(segment)
+
+    if not segments_to_render:
+        return state
+
+    max_workers = min(max_workers, len(segments_to_render))
+    print(f"----Rendering {len(segments_to_render)} segments with {max_workers} workers")
+
+    # manim runs as its own process per segment, so threads here only bound how many renders run at once
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {
+            executor.submit(
+                _render_segment,
+                segment.segment_id,
+                segment.manim_script,
+                manim_dir,
+                video_dir,
+                timeout,
+                cache,
+                tex_cache,
+                use_server,
+                memory_mb
+            ): segment
+            for segment in segments_to_render
+        }
+
+        for future in as_completed(futures):
+            segment = futures[future]
+            try:
+                video_path = future.result()
+                if video_path:
+                    segment.video_path = video_path
+            except subprocess.TimeoutExpired:
+                print(f"----Render timed out for segment {segment.segment_id} after {timeout}s")
+            except Exception as e:
+                print(f"----Error rendering segment {segment.segment_id}: {e}")
+
+    return state
+
+async def arender_manim_scripts(state: VideoState, config: RunnableConfig) -> VideoState:
+    """Async renderer, the "manim" semaphore bounds how many renders run at once"""
+
+    print("Starting manim scripts rendering for all segments....")
+
+    configurable = config["configurable"]
+    timeout = configurable.get("render_timeout", 180)
+    cache = get_render_cache(configurable)
+    tex_cache = get_tex_cache(configurable)
+    use_server = configurable.get("manim_server", True)
+    memory_mb = configurable.get("manim_memory_mb")
+
+    manim_dir = Path("video_files/manim_script")
+    video_dir = Path("video_files/video")
+    manim_dir.mkdir(parents=True, exist_ok=True)
+
+    semaphore = get_semaphore(configurable, "manim")
+
+    async def render(segment):
+        async with semaphore:
+            try:
+                video_path = await _arender_segment(
+                    segment.segment_id,
+                    segment.manim_script,
+                    manim_dir,
+                    video_dir,
+                    timeout,
+                    cache,
+                    tex_cache,
+                    use_server,
+                    memory_mb
+                )
+                if video_path:
+                    segment.video_path = video_path
+            except subprocess.TimeoutExpired:
+                print(f"----Render timed out for segment {segment.segment_id} after {timeout}s")
+            except Exception as e:
+                print(f"----Error rendering segment {segment.segment_id}: {e}")
+
+    segments_to_render = []
+    for segment in state.segments:
+        if not segment.manim_script:
+            print(f"----Skipping segment {segment.segment_id}: No script")
+            continue
+        segments_to_render.append(segment)
+
+    print(f"----Rendering {len(segments_to_render)} segments")
+    await asyncio.gather(*(render(segment) for segment in segments_to_render))
+
     return state
 
 def video_composer(state: VideoState) -> VideoState:
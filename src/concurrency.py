@@ -0,0 +1,25 @@
+from typing import Dict, Tuple
+import asyncio
+import os
+
+# how many calls of each resource class may be in flight at once in async mode
+DEFAULT_LIMITS: Dict[str, int] = {
+    "llm": 8,
+    "embedding": 16,
+    "tts": 4,
+    "manim": max(1, (os.cpu_count() or 2) // 2),
+    "review": 4,
+}
+
+_semaphores: Dict[Tuple[int, str], asyncio.Semaphore] = {}
+
+def get_semaphore(configurable: dict, resource: str) -> asyncio.Semaphore:
+    """Semaphore for a resource class, one per event loop so repeated asyncio.run calls stay valid"""
+    loop = asyncio.get_running_loop()
+    key = (id(loop), resource)
+
+    if key not in _semaphores:
+        limits = {**DEFAULT_LIMITS, **configurable.get("concurrency_limits", {})}
+        _semaphores[key] = asyncio.Semaphore(limits.get(resource, 4))
+
+    return _semaphores[key]
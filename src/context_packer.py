@@ -0,0 +1,88 @@
+from pydantic import BaseModel
+from functools import lru_cache
+from typing import Dict, List
+import re
+
+# prompt context budgets in tokens, per stage, overridable with configurable["context_budgets"]
+DEFAULT_BUDGETS: Dict[str, int] = {
+    "planner": 2500,
+    "codegen": 3000,
+    "fix": 6000,
+}
+
+DUPLICATE_OVERLAP = 0.8
+
+class ContextChunk(BaseModel):
+    slot: str
+    text: str
+    score: float = 0.0
+    required: bool = False
+
+@lru_cache(maxsize=1)
+def _encoding():
+    try:
+        import tiktoken
+        return tiktoken.get_encoding("cl100k_base")
+    except Exception:
+        return None
+
+def count_tokens(text: str) -> int:
+    """tiktoken count when available, otherwise the usual 4 characters per token estimate"""
+    encoding = _encoding()
+    if encoding is None:
+        return len(text) // 4 + 1
+    return len(encoding.encode(text, disallowed_special=()))
+
+def similarity_to_score(distance: float) -> float:
+    """Chroma returns distances, lower is closer"""
+    return 1.0 / (1.0 + max(distance, 0.0))
+
+def _lines(text: str) -> set:
+    return {re.sub(r"\s+", " ", line).strip() for line in text.splitlines() if line.strip()}
+
+def _is_duplicate(chunk: ContextChunk, kept: List[ContextChunk]) -> bool:
+    lines = _lines(chunk.text)
+    if not lines:
+        return True
+    for other in kept:
+        other_lines = _lines(other.text)
+        if len(lines & other_lines) / len(lines) >= DUPLICATE_OVERLAP:
+            return True
+    return False
+
+def pack_context(chunks: List[ContextChunk], budget: int, label: str = "") -> Dict[str, str]:
+    """Fill a token budget with the most relevant chunks, returns the packed text per slot
+
+    Required chunks always go in, the rest are deduplicated and added by descending score
+    while they fit. Within a slot chunks keep their original order.
+    """
+    ranked = sorted(enumerate(chunks), key=lambda item: (not item[1].required, -item[1].score))
+
+    kept = []
+    used = 0
+    dropped = 0
+    for index, chunk in ranked:
+        if not chunk.required and _is_duplicate(chunk, [other for _, other in kept]):
+            dropped += 1
+            continue
+
+        tokens = count_tokens(chunk.text)
+        if not chunk.required and used + tokens > budget:
+            dropped += 1
+            continue
+
+        kept.append((index, chunk))
+        used += tokens
+
+    packed: Dict[str, List[str]] = {chunk.slot: [] for chunk in chunks}
+    for _, chunk in sorted(kept, key=lambda item: item[0]):
+        packed[chunk.slot].append(chunk.text)
+
+    if label:
+        print(f"----{label} context: {used}/{budget} tokens, {len(kept)} chunks kept, {dropped} dropped")
+
+    return {slot: "\n".join(texts) for slot, texts in packed.items()}
+
+def get_context_budget(configurable: dict, stage: str) -> int:
+    budgets = {**DEFAULT_BUDGETS, **configurable.get("context_budgets", {})}
+    return budgets[stage]
@@ -0,0 +1,259 @@
+from pydantic import BaseModel
+from typing import Dict, List, Optional, Tuple
+import ast
+
+DEFAULT_RUN_TIME = 1.0
+DEFAULT_WAIT = 1.0
+MIN_WAIT = 0.1
+
+class DurationReport(BaseModel):
+    total: float
+    target: float
+    waits: float
+    approximate: bool
+
+    @property
+    def delta(self) -> float:
+        return self.target - self.total
+
+class _Wait:
+    """A self.wait() call with a literal (or missing) duration, and how often it runs"""
+    def __init__(self, node: ast.Call, value: float, multiplier: float):
+        self.node = node
+        self.value = value
+        self.multiplier = multiplier
+
+class _Estimator:
+    def __init__(self, methods: Dict[str, ast.FunctionDef]):
+        self.methods = methods
+        self.constants: Dict[str, float] = {}
+        self.waits: List[_Wait] = []
+        self.approximate = False
+        self._stack: List[str] = []
+
+    def number(self, node: Optional[ast.expr]) -> Optional[float]:
+        if node is None:
+            return None
+        if isinstance(node, ast.Constant) and isinstance(node.value, (int, float)) and not isinstance(node.value, bool):
+            return float(node.value)
+        if isinstance(node, ast.Name):
+            return self.constants.get(node.id)
+        if isinstance(node, ast.UnaryOp) and isinstance(node.op, ast.USub):
+            value = self.number(node.operand)
+            return -value if value is not None else None
+        if isinstance(node, ast.BinOp):
+            left, right = self.number(node.left), self.number(node.right)
+            if left is None or right is None:
+                return None
+            if isinstance(node.op, ast.Add):
+                return left + right
+            if isinstance(node.op, ast.Sub):
+                return left - right
+            if isinstance(node.op, ast.Mult):
+                return left * right
+            if isinstance(node.op, ast.Div) and right:
+                return left / right
+        return None
+
+    def _kwarg(self, call: ast.Call, name: str) -> Optional[ast.expr]:
+        return next((keyword.value for keyword in call.keywords if keyword.arg == name), None)
+
+    def _iterations(self, loop: ast.For) -> float:
+        iterable = loop.iter
+        if isinstance(iterable, (ast.List, ast.Tuple, ast.Set)):
+            return float(len(iterable.elts))
+        if isinstance(iterable, ast.Call) and isinstance(iterable.func, ast.Name):
+            if iterable.func.id == "range":
+                bounds = [self.number(arg) for arg in iterable.args]
+                if bounds and all(bound is not None for bound in bounds):
+                    start, stop, step = (0.0, bounds[0], 1.0) if len(bounds) == 1 else (bounds + [1.0])[:3]
+                    if step:
+                        return float(max(0, len(range(int(start), int(stop), int(step)))))
+            if iterable.func.id in ("enumerate", "zip", "reversed") and iterable.args:
+                inner = ast.For(target=loop.target, iter=iterable.args[0], body=[], orelse=[])
+                return self._iterations(inner)
+        self.approximate = True
+        return 1.0
+
+    def _play_time(self, call: ast.Call) -> float:
+        run_time = self._kwarg(call, "run_time")
+        if run_time is not None:
+            value = self.number(run_time)
+            if value is None:
+                self.approximate = True
+                return DEFAULT_RUN_TIME
+            return value
+
+        # an animation can carry its own run_time, the play lasts as long as the longest one
+        inner = [self.number(self._kwarg(arg, "run_time")) for arg in call.args if isinstance(arg, ast.Call)]
+        inner = [value for value in inner if value is not None]
+        return max(inner) if inner else DEFAULT_RUN_TIME
+
+    def _wait_time(self, call: ast.Call, multiplier: float) -> float:
+        node = call.args[0] if call.args else self._kwarg(call, "duration")
+        if node is None:
+            # only a bare self.wait() can take a duration in place, wait(frozen_frame=...) is left alone
+            if not call.keywords:
+                self.waits.append(_Wait(call, DEFAULT_WAIT, multiplier))
+            return DEFAULT_WAIT
+
+        value = self.number(node)
+        if value is None:
+            self.approximate = True
+            return DEFAULT_WAIT
+
+        if isinstance(node, ast.Constant):
+            self.waits.append(_Wait(call, value, multiplier))
+        return value
+
+    def call_time(self, call: ast.Call, multiplier: float) -> float:
+        func = call.func
+        if not (isinstance(func, ast.Attribute) and isinstance(func.value, ast.Name) and func.value.id == "self"):
+            return 0.0
+
+        if func.attr == "play":
+            return self._play_time(call)
+        if func.attr == "wait":
+            return self._wait_time(call, multiplier)
+        if func.attr in self.methods and func.attr not in self._stack:
+            self._stack.append(func.attr)
+            total = self.block(self.methods[func.attr].body, multiplier)
+            self._stack.pop()
+            return total
+        return 0.0
+
+    def _forget(self, targets: List[ast.expr]):
+        """A tracked name was rebound to something we can't follow, later uses of it are guesses"""
+        for target in targets:
+            for node in ast.walk(target):
+                if isinstance(node, ast.Name) and node.id in self.constants:
+                    del self.constants[node.id]
+                    self.approximate = True
+
+    def block(self, statements: List[ast.stmt], multiplier: float = 1.0) -> float:
+        total = 0.0
+        for statement in statements:
+            if isinstance(statement, ast.Assign):
+                value = self.number(statement.value)
+                if value is not None and len(statement.targets) == 1 and isinstance(statement.targets[0], ast.Name):
+                    self.constants[statement.targets[0].id] = value
+                else:
+                    self._forget(statement.targets)
+            elif isinstance(statement, (ast.AugAssign, ast.AnnAssign)):
+                self._forget([statement.target])
+            elif isinstance(statement, ast.Expr) and isinstance(statement.value, ast.Call):
+                total += self.call_time(statement.value, multiplier)
+            elif isinstance(statement, ast.For):
+                self._forget([statement.target])
+                iterations = self._iterations(statement)
+                total += iterations * self.block(statement.body, multiplier * iterations)
+            elif isinstance(statement, (ast.While, ast.If)):
+                self.approximate = True
+                total += self.block(statement.body, multiplier)
+            elif isinstance(statement, (ast.With, ast.Try)):
+                total += self.block(statement.body, multiplier)
+        return total
+
+def _scene_methods(code: str, segment_id: int) -> Optional[Dict[str, ast.FunctionDef]]:
+    try:
+        tree = ast.parse(code)
+    except SyntaxError:
+        return None
+
+    for node in tree.body:
+        if isinstance(node, ast.ClassDef) and node.name == f"Segment{segment_id}":
+            methods = {item.name: item for item in node.body if isinstance(item, ast.FunctionDef)}
+            return methods if "construct" in methods else None
+    return None
+
+def _estimate(code: str, segment_id: int) -> Optional[Tuple[float, _Estimator]]:
+    methods = _scene_methods(code, segment_id)
+    if methods is None:
+        return None
+
+    estimator = _Estimator(methods)
+    estimator._stack.append("construct")
+    total = estimator.block(methods["construct"].body)
+    return (total, estimator)
+
+def analyze_duration(code: str, segment_id: int, target: float) -> Optional[DurationReport]:
+    """Statically estimate the scene runtime from play run_times, waits and simple loops"""
+    estimate = _estimate(code, segment_id)
+    if estimate is None:
+        return None
+
+    total, estimator = estimate
+    return DurationReport(
+        total=round(total, 3),
+        target=target,
+        waits=round(sum(wait.value * wait.multiplier for wait in estimator.waits), 3),
+        approximate=estimator.approximate
+    )
+
+def _merged_waits(waits: List[_Wait]) -> List[_Wait]:
+    """One entry per wait node, a wait in a helper called twice is collected twice with the same node"""
+    merged: Dict[int, _Wait] = {}
+    for wait in waits:
+        if id(wait.node) in merged:
+            merged[id(wait.node)].multiplier += wait.multiplier
+        else:
+            merged[id(wait.node)] = _Wait(wait.node, wait.value, wait.multiplier)
+    return list(merged.values())
+
+def _format_seconds(value: float) -> str:
+    return f"{round(value, 2):g}"
+
+def rescale_waits(code: str, segment_id: int, target: float) -> Optional[str]:
+    """Rescale literal waits (or append a final wait) so the estimated runtime matches target
+
+    Returns None when the estimate is approximate, unresolved loops or calls make any rescale a guess.
+    """
+    estimate = _estimate(code, segment_id)
+    if estimate is None:
+        return None
+
+    total, estimator = estimate
+    if estimator.approximate:
+        return None
+
+    delta = target - total
+    lines = code.splitlines(keepends=True)
+
+    if delta > 0:
+        construct = estimator.methods["construct"]
+        last = construct.body[-1]
+        indent = " " * last.col_offset
+        insert_at = last.end_lineno
+        if not lines[insert_at - 1].endswith("\n"):
+            lines[insert_at - 1] += "\n"
+        lines.insert(insert_at, f"{indent}self.wait({_format_seconds(delta)})\n")
+        return "".join(lines)
+
+    waits = _merged_waits(estimator.waits)
+    scalable = sum(wait.value * wait.multiplier for wait in waits)
+    if scalable <= 0:
+        return None
+
+    factor = max(0.0, (scalable + delta) / scalable)
+
+    # edit from the bottom up so earlier column offsets stay valid
+    for wait in sorted(waits, key=lambda w: (w.node.lineno, w.node.col_offset), reverse=True):
+        new_value = _format_seconds(max(MIN_WAIT, wait.value * factor))
+        call = wait.node
+        if call.end_lineno != call.lineno:
+            continue
+
+        line = lines[call.lineno - 1]
+        if call.args:
+            arg = call.args[0]
+            line = line[:arg.col_offset] + new_value + line[arg.end_col_offset:]
+        elif call.keywords:
+            keyword = next((keyword for keyword in call.keywords if keyword.arg == "duration"), None)
+            if keyword is None:
+                continue
+            line = line[:keyword.value.col_offset] + new_value + line[keyword.value.end_col_offset:]
+        else:
+            line = line[:call.end_col_offset - 1] + new_value + line[call.end_col_offset - 1:]
+        lines[call.lineno - 1] = line
+
+    return "".join(lines)
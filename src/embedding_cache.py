@@ -0,0 +1,118 @@
+from langchain_core.embeddings import Embeddings
+from collections import OrderedDict
+from pathlib import Path
+from typing import List, Optional
+from array import array
+from .rate_limit import get_rate_limiter, estimate_tokens, EMBEDDING_KEY
+import threading
+import hashlib
+import sqlite3
+import re
+
+DEFAULT_CACHE_PATH = Path(".cache/embeddings.sqlite")
+
+def normalize_text(text: str) -> str:
+    return re.sub(r"\s+", " ", text).strip()
+
+class EmbeddingCache:
+    """Query embeddings keyed on (model, normalized text)
+
+    An in-memory LRU sits in front of a sqlite table of float32 blobs, so repeated queries
+    within a run never leave the process and queries from earlier runs skip the API.
+    """
+
+    def __init__(self, path: Optional[Path] = DEFAULT_CACHE_PATH, memory_items: int = 2048):
+        self.memory_items = memory_items
+        self._memory: "OrderedDict[str, List[float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._conn = None
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+        if path is not None:
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+            self._conn = sqlite3.connect(str(path), check_same_thread=False)
+            self._conn.execute("CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, model TEXT, vector BLOB)")
+            self._conn.commit()
+
+    @staticmethod
+    def key(model: str, text: str) -> str:
+        return hashlib.sha256(f"{model}\0{normalize_text(text)}".encode("utf-8")).hexdigest()
+
+    def _remember(self, key: str, vector: List[float]):
+        self._memory[key] = vector
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_items:
+            self._memory.popitem(last=False)
+
+    def get(self, model: str, text: str) -> Optional[List[float]]:
+        key = self.key(model, text)
+        with self._lock:
+            vector = self._memory.get(key)
+            if vector is not None:
+                self._memory.move_to_end(key)
+                self.memory_hits += 1
+                return vector
+
+            row = None
+            if self._conn is not None:
+                row = self._conn.execute("SELECT vector FROM embeddings WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+
+            vector = array("f", row[0]).tolist()
+            self._remember(key, vector)
+            self.disk_hits += 1
+            return vector
+
+    def put(self, model: str, text: str, vector: List[float]):
+        key = self.key(model, text)
+        with self._lock:
+            self._remember(key, list(vector))
+            if self._conn is not None:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO embeddings (key, model, vector) VALUES (?, ?, ?)",
+                    (key, model, array("f", vector).tobytes())
+                )
+                self._conn.commit()
+
+    def stats(self) -> dict:
+        lookups = self.memory_hits + self.disk_hits + self.misses
+        hits = self.memory_hits + self.disk_hits
+        return {
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": round(hits / lookups, 3) if lookups else 0.0,
+        }
+
+class CachedEmbeddings(Embeddings):
+    """Embeddings wrapper that serves repeats from an EmbeddingCache and rate limits only the misses"""
+
+    def __init__(self, embeddings: Embeddings, model: str, cache: EmbeddingCache):
+        self.embeddings = embeddings
+        self.model = model
+        self.cache = cache
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        vectors = [self.cache.get(self.model, text) for text in texts]
+        missing = [i for i, vector in enumerate(vectors) if vector is None]
+
+        if missing:
+            missing_texts = [texts[i] for i in missing]
+            get_rate_limiter().acquire(EMBEDDING_KEY, estimate_tokens(missing_texts))
+            for i, vector in zip(missing, self.embeddings.embed_documents(missing_texts)):
+                self.cache.put(self.model, texts[i], vector)
+                vectors[i] = vector
+
+        return vectors
+
+    def embed_query(self, text: str) -> List[float]:
+        vector = self.cache.get(self.model, text)
+        if vector is None:
+            get_rate_limiter().acquire(EMBEDDING_KEY, estimate_tokens(text))
+            vector = self.embeddings.embed_query(text)
+            self.cache.put(self.model, text, vector)
+        return vector
@@ -0,0 +1,83 @@
+from pydantic import BaseModel
+from typing import Optional
+import re
+
+# rich (manim's default) and plain python tracebacks, plus the static check diagnostics
+EXCEPTION_LINE = re.compile(r"^[\s│]*(?:[\w.]+\.)?(\w+(?:Error|Exception|Exit))\s*:\s*(.+?)[\s│]*$", re.MULTILINE)
+PLAIN_FRAME = re.compile(r'File "([^"]+)", line (\d+), in (\w+)')
+RICH_FRAME = re.compile(r"([\w./\\~-]+\.py):(\d+) in (\w+)")
+DIAGNOSTIC_LINE = re.compile(r"^\[(\w+)\](?: line (\d+):)? (.+)$", re.MULTILINE)
+
+SYMBOL_PATTERNS = [
+    (re.compile(r"'?(\w+)'? object has no attribute '(\w+)'"), "{0}.{1}"),
+    (re.compile(r"type object '(\w+)' has no attribute '(\w+)'"), "{0}.{1}"),
+    (re.compile(r"module '([\w.]+)' has no attribute '(\w+)'"), "{0}.{1}"),
+    (re.compile(r"(\w+)(?:\.__init__)?\(\) got an unexpected keyword argument '(\w+)'"), "{0}({1}=)"),
+    (re.compile(r"(\w+)(?:\.__init__)?\(\) missing \d+ required positional arguments?: '(\w+)'"), "{0}({1})"),
+    (re.compile(r"cannot import name '(\w+)'"), "{0}"),
+    (re.compile(r"name '(\w+)' is not defined"), "{0}"),
+    (re.compile(r"(?:Colour|Name) (\w+) is not"), "{0}"),
+    (re.compile(r"self\.(\w+)\(\)"), "Scene.{0}"),
+]
+
+LIBRARY_PATH = re.compile(r"(site-packages|dist-packages|/lib/python|[/\\]manim[/\\])")
+
+class ErrorSignature(BaseModel):
+    exc_type: Optional[str] = None
+    symbol: Optional[str] = None
+    line: Optional[int] = None
+    message: str = ""
+
+    @property
+    def found(self) -> bool:
+        return self.exc_type is not None
+
+    def as_query(self) -> str:
+        """Short "ErrorType: symbol message" string used directly as the docs search query"""
+        parts = [f"{self.exc_type}:" if self.exc_type else "", self.symbol or "", self.message]
+        return " ".join(part for part in parts if part)[:300]
+
+def _script_line(logs: str) -> Optional[int]:
+    """Line of the deepest frame that belongs to the generated script rather than a library"""
+    frames = [(path, int(line)) for path, line, _ in PLAIN_FRAME.findall(logs)]
+    frames += [(path, int(line)) for path, line, _ in RICH_FRAME.findall(logs)]
+    script_frames = [line for path, line in frames if not LIBRARY_PATH.search(path)]
+    return script_frames[-1] if script_frames else None
+
+def _symbol_from_code(code: str, line: Optional[int]) -> Optional[str]:
+    if not code or not line:
+        return None
+    lines = code.splitlines()
+    if not 0 < line <= len(lines):
+        return None
+    # manim classes are CamelCase, the first one on the failing line is usually the culprit
+    match = re.search(r"\b([A-Z][a-z]+[A-Za-z0-9]*)\s*\(", lines[line - 1])
+    return match.group(1) if match else None
+
+def parse_error(logs: str, code: str = "") -> ErrorSignature:
+    """Extract exception type, offending symbol, script line and message from manim/python logs"""
+    if not logs:
+        return ErrorSignature()
+
+    diagnostics = DIAGNOSTIC_LINE.findall(logs)
+    if diagnostics:
+        exc_type, line, message = diagnostics[0]
+        signature = ErrorSignature(exc_type=exc_type, line=int(line) if line else None, message=message.strip())
+    else:
+        exceptions = EXCEPTION_LINE.findall(logs)
+        if not exceptions:
+            return ErrorSignature(message=logs.strip().splitlines()[-1][:200] if logs.strip() else "")
+
+        exc_type, message = exceptions[-1]
+        signature = ErrorSignature(exc_type=exc_type, line=_script_line(logs), message=message.strip()[:200])
+
+    for pattern, template in SYMBOL_PATTERNS:
+        match = pattern.search(signature.message)
+        if match:
+            signature.symbol = template.format(*match.groups())
+            break
+
+    if signature.symbol is None:
+        signature.symbol = _symbol_from_code(code, signature.line)
+
+    return signature
@@ -0,0 +1,142 @@
+from pathlib import Path
+from typing import List, Optional, Tuple
+from .error_parser import ErrorSignature
+import threading
+import difflib
+import sqlite3
+import json
+import time
+import re
+
+DEFAULT_STORE_PATH = Path(".cache/fix_store.sqlite")
+
+def normalize_signature(signature: ErrorSignature) -> Optional[str]:
+    """Stable key for an error, line numbers, paths and literal values are dropped"""
+    if not signature.found:
+        return None
+
+    if signature.symbol:
+        return f"{signature.exc_type}|{signature.symbol}"
+
+    message = re.sub(r"(/[\w.\-]+)+", "<path>", signature.message)
+    message = re.sub(r"\d+(\.\d+)?", "<n>", message)
+    return f"{signature.exc_type}|{message.lower()}"
+
+def _line_replacements(before: str, after: str) -> List[Tuple[str, str]]:
+    old_lines = [line.strip() for line in before.splitlines()]
+    new_lines = [line.strip() for line in after.splitlines()]
+
+    replacements = []
+    matcher = difflib.SequenceMatcher(a=old_lines, b=new_lines, autojunk=False)
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == "replace" and (i2 - i1) == (j2 - j1):
+            replacements.extend(zip(old_lines[i1:i2], new_lines[j1:j2]))
+    return [(old, new) for old, new in replacements if old]
+
+def apply_replacements(code: str, replacements: List[Tuple[str, str]]) -> Optional[str]:
+    """Replay a stored fix on new code, None unless every replaced line is found"""
+    if not replacements:
+        return None
+
+    lines = code.splitlines()
+    for old, new in replacements:
+        for i, line in enumerate(lines):
+            if line.strip() == old:
+                indent = line[:len(line) - len(line.lstrip())]
+                lines[i] = indent + new
+                break
+        else:
+            return None
+
+    return "\n".join(lines) + ("\n" if code.endswith("\n") else "")
+
+class FixStore:
+    """SQLite store of error signatures and the code changes that fixed them in earlier runs"""
+
+    def __init__(self, path: Path = DEFAULT_STORE_PATH):
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(path), check_same_thread=False)
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS fixes (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                signature TEXT NOT NULL,
+                diff TEXT NOT NULL,
+                replacements TEXT NOT NULL,
+                uses INTEGER DEFAULT 0,
+                successes INTEGER DEFAULT 1,
+                created REAL
+            );
+            CREATE INDEX IF NOT EXISTS fixes_signature ON fixes(signature);
+            CREATE TABLE IF NOT EXISTS metrics (name TEXT PRIMARY KEY, value INTEGER DEFAULT 0);
+        """)
+        self._conn.commit()
+
+    def _bump(self, name: str):
+        self._conn.execute("INSERT INTO metrics (name, value) VALUES (?, 1) ON CONFLICT(name) DO UPDATE SET value = value + 1", (name,))
+
+    def record(self, signature_key: str, before: str, after: str):
+        diff = "".join(difflib.unified_diff(before.splitlines(keepends=True), after.splitlines(keepends=True), "before.py", "after.py", n=1))
+        if not diff:
+            return
+
+        replacements = _line_replacements(before, after)
+        with self._lock:
+            existing = self._conn.execute(
+                "SELECT id FROM fixes WHERE signature = ? AND replacements = ?",
+                (signature_key, json.dumps(replacements))
+            ).fetchone()
+
+            if existing and replacements:
+                self._conn.execute("UPDATE fixes SET successes = successes + 1 WHERE id = ?", (existing[0],))
+            else:
+                self._conn.execute(
+                    "INSERT INTO fixes (signature, diff, replacements, created) VALUES (?, ?, ?, ?)",
+                    (signature_key, diff[:4000], json.dumps(replacements), time.time())
+                )
+            self._bump("recorded")
+            self._conn.commit()
+
+    def lookup(self, signature_key: str) -> Optional[dict]:
+        """Best known fix for a signature, ranked by how often it worked"""
+        with self._lock:
+            self._bump("lookups")
+            row = self._conn.execute(
+                "SELECT id, diff, replacements FROM fixes WHERE signature = ? ORDER BY successes DESC, created DESC LIMIT 1",
+                (signature_key,)
+            ).fetchone()
+            if row is not None:
+                self._bump("hits")
+                self._conn.execute("UPDATE fixes SET uses = uses + 1 WHERE id = ?", (row[0],))
+            self._conn.commit()
+
+        if row is None:
+            return None
+        return {"id": row[0], "diff": row[1], "replacements": [tuple(pair) for pair in json.loads(row[2])]}
+
+    def mark_applied(self, fix_id: int, success: bool):
+        with self._lock:
+            self._bump("applied_success" if success else "applied_failed")
+            if success:
+                self._conn.execute("UPDATE fixes SET successes = successes + 1 WHERE id = ?", (fix_id,))
+            self._conn.commit()
+
+    def stats(self) -> dict:
+        with self._lock:
+            metrics = dict(self._conn.execute("SELECT name, value FROM metrics").fetchall())
+        lookups = metrics.get("lookups", 0)
+        metrics["hit_rate"] = round(metrics.get("hits", 0) / lookups, 3) if lookups else 0.0
+        return metrics
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+def get_fix_store(configurable: dict) -> Optional[FixStore]:
+    if not configurable.get("fix_store", True):
+        return None
+
+    path = str(configurable.get("fix_store_path", DEFAULT_STORE_PATH))
+    with _stores_lock:
+        if path not in _stores:
+            _stores[path] = FixStore(Path(path))
+        return _stores[path]
@@ -0,0 +1,107 @@
+from langchain_core.documents import Document
+from pathlib import Path
+from typing import List, Optional, Tuple
+import numpy as np
+import json
+
+FLAT_INDEX_DIR = Path("./flat_index")
+VECTORS_FILE = "vectors.npy"
+META_FILE = "meta.json"
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+def build_flat_index(vector_store, index_dir: Path, dtype: str = "float32", dims: Optional[int] = None) -> Path:
+    """Dump a Chroma collection into a normalized .npy matrix plus a json sidecar with the documents
+
+    `dims` keeps only the leading dimensions, text-embedding-3 vectors stay meaningful when
+    truncated and renormalized. `dtype="float16"` halves the file again.
+    """
+    data = vector_store._collection.get(include=["embeddings", "documents", "metadatas"])
+
+    vectors = np.asarray(data["embeddings"], dtype=np.float32)
+    if dims:
+        vectors = vectors[:, :dims]
+    vectors = _normalize(vectors).astype(dtype)
+
+    index_dir = Path(index_dir)
+    index_dir.mkdir(parents=True, exist_ok=True)
+
+    # write under temp names first so readers never map a half written index
+    np.save(index_dir / f"tmp_{VECTORS_FILE}", vectors)
+    with open(index_dir / f"tmp_{META_FILE}", "w", encoding="utf-8") as f:
+        json.dump({
+            "ids": data["ids"],
+            "documents": data["documents"],
+            "metadatas": [metadata or {} for metadata in data["metadatas"]],
+            "dims": int(vectors.shape[1]) if len(vectors) else dims,
+            "dtype": dtype,
+        }, f)
+
+    (index_dir / f"tmp_{VECTORS_FILE}").replace(index_dir / VECTORS_FILE)
+    (index_dir / f"tmp_{META_FILE}").replace(index_dir / META_FILE)
+
+    print(f"----Flat index with {len(vectors)} vectors ({dtype}, {vectors.shape[1] if len(vectors) else 0} dims) written to {index_dir}")
+    return index_dir
+
+class FlatIndex:
+    """Exact top-k over a memory-mapped matrix of normalized embeddings
+
+    The matrix is mapped read-only, so loading is instant and every process on the machine
+    shares the same pages.
+    """
+
+    def __init__(self, index_dir: Path):
+        index_dir = Path(index_dir)
+        self.vectors = np.load(index_dir / VECTORS_FILE, mmap_mode="r")
+        with open(index_dir / META_FILE, encoding="utf-8") as f:
+            meta = json.load(f)
+        self.ids = meta["ids"]
+        self.documents = meta["documents"]
+        self.metadatas = meta["metadatas"]
+        self.dims = meta["dims"]
+
+    @staticmethod
+    def exists(index_dir: Path) -> bool:
+        return (Path(index_dir) / VECTORS_FILE).exists() and (Path(index_dir) / META_FILE).exists()
+
+    def search(self, query_vectors: List[List[float]], k: int) -> List[List[Tuple[Document, float]]]:
+        """(document, distance) pairs per query, distance is the squared L2 of unit vectors like Chroma's default"""
+        if not len(self.vectors) or not query_vectors:
+            return [[] for _ in query_vectors]
+
+        queries = np.asarray(query_vectors, dtype=np.float32)[:, :self.dims]
+        queries = _normalize(queries)
+
+        # multiply in the stored dtype, upcasting the mapped matrix would copy all of it per search
+        similarities = (self.vectors @ queries.astype(self.vectors.dtype).T).T.astype(np.float32)
+        k = min(k, similarities.shape[1])
+
+        results = []
+        for row in similarities:
+            top = np.argpartition(-row, k - 1)[:k]
+            top = top[np.argsort(-row[top])]
+            results.append([
+                (Document(page_content=self.documents[i], metadata=self.metadatas[i]), max(0.0, float(2.0 - 2.0 * row[i])))
+                for i in top
+            ])
+        return results
+
+if __name__ == "__main__":
+    import argparse
+    from langchain_chroma import Chroma
+    from langchain_openai import OpenAIEmbeddings
+    from .retrieval import COLLECTIONS, EMBEDDING_MODEL
+
+    parser = argparse.ArgumentParser(description="Build flat indexes from the existing Chroma collections")
+    parser.add_argument("--dtype", default="float32", choices=["float32", "float16"])
+    parser.add_argument("--dims", type=int, default=None)
+    args = parser.parse_args()
+
+    for collection, persist_directory in COLLECTIONS.items():
+        if not Path(persist_directory).exists():
+            print(f"Warning: No database found at {persist_directory}")
+            continue
+        store = Chroma(collection_name=collection, embedding_function=OpenAIEmbeddings(model=EMBEDDING_MODEL), persist_directory=persist_directory)
+        build_flat_index(store, FLAT_INDEX_DIR / collection, args.dtype, args.dims)
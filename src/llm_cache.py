@@ -0,0 +1,139 @@
+from pathlib import Path
+from typing import Optional
+from langchain_core.load import dumps, loads
+import threading
+import hashlib
+import sqlite3
+import json
+import time
+
+OFF = "off"
+READ_WRITE = "read-write"
+REPLAY_ONLY = "replay-only"
+MODES = (OFF, READ_WRITE, REPLAY_ONLY)
+
+DEFAULT_CACHE_PATH = Path(".cache/llm_responses.sqlite")
+
+def _base_model(llm):
+    """The chat model under with_structured_output/bind wrappers"""
+    for _ in range(5):
+        if hasattr(llm, "first"):
+            llm = llm.first
+        elif hasattr(llm, "bound"):
+            llm = llm.bound
+        else:
+            break
+    return llm
+
+def _render_messages(messages) -> list:
+    if isinstance(messages, str):
+        return [["human", messages]]
+    return [[getattr(message, "type", "human"), getattr(message, "content", message)] for message in messages]
+
+def response_cache_key(llm, messages, model_key: str, schema: Optional[type] = None, tag: str = "") -> str:
+    """Hash of model id, temperature, rendered messages, structured output schema and an optional caller tag"""
+    model = _base_model(llm)
+    payload = {
+        "model": model_key,
+        "temperature": getattr(model, "temperature", None),
+        "messages": _render_messages(messages),
+        "schema": schema.model_json_schema() if schema is not None else None,
+        "tag": tag,
+    }
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+class LLMCache:
+    """SQLite cache of LLM responses for reruns of the same topic
+
+    `read-write` serves hits and stores misses, `replay-only` serves hits (ignoring the TTL)
+    and raises on a miss so a rerun never reaches a provider, `off` does nothing.
+    """
+
+    def __init__(self, path: Path = DEFAULT_CACHE_PATH, mode: str = READ_WRITE, ttl_days: float = 30, max_bytes: int = 256 * 1024 ** 2):
+        if mode not in MODES:
+            raise ValueError(f"Unknown llm cache mode {mode!r}, expected one of {MODES}")
+
+        self.mode = mode
+        self.ttl = ttl_days * 86400
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn = None
+        self._writes = 0
+
+        if mode != OFF:
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+            self._conn = sqlite3.connect(str(path), check_same_thread=False)
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS responses (key TEXT PRIMARY KEY, model TEXT, payload TEXT, size INTEGER, created REAL, used REAL)"
+            )
+            self._conn.commit()
+
+    @property
+    def enabled(self) -> bool:
+        return self._conn is not None
+
+    def get(self, key: str, schema: Optional[type] = None):
+        if not self.enabled:
+            return None
+
+        with self._lock:
+            row = self._conn.execute("SELECT payload, created FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is not None and self.mode == READ_WRITE and time.time() - row[1] > self.ttl:
+                row = None
+
+            if row is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+                self._conn.execute("UPDATE responses SET used = ? WHERE key = ?", (time.time(), key))
+                self._conn.commit()
+
+        if row is None:
+            if self.mode == REPLAY_ONLY:
+                raise LookupError(f"LLM cache miss in replay-only mode (key {key[:12]})")
+            return None
+
+        if schema is not None:
+            return schema.model_validate_json(row[0])
+        return loads(row[0])
+
+    def put(self, key: str, model: str, response, schema: Optional[type] = None):
+        if self.mode != READ_WRITE:
+            return
+
+        payload = response.model_dump_json() if schema is not None else dumps(response)
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, model, payload, size, created, used) VALUES (?, ?, ?, ?, ?, ?)",
+                (key, model, payload, len(payload), now, now)
+            )
+            self._writes += 1
+            if self._writes % 50 == 1:
+                self._evict(now)
+            self._conn.commit()
+
+    def _evict(self, now: float):
+        """Drop expired rows, then the least recently used ones past max_bytes"""
+        self._conn.execute("DELETE FROM responses WHERE created < ?", (now - self.ttl,))
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+
+        for key, size in self._conn.execute("SELECT key, size FROM responses ORDER BY used ASC").fetchall():
+            if total <= self.max_bytes:
+                break
+            self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+            total -= size
+
+_llm_cache = LLMCache(mode=OFF)
+
+def configure_llm_cache(mode: str = READ_WRITE, path: Optional[Path] = None, ttl_days: float = 30, max_bytes: int = 256 * 1024 ** 2) -> LLMCache:
+    global _llm_cache
+    _llm_cache = LLMCache(Path(path) if path else DEFAULT_CACHE_PATH, mode, ttl_days, max_bytes)
+    return _llm_cache
+
+def get_llm_cache() -> LLMCache:
+    return _llm_cache
@@ -2,102 +2,200 @@ from langgraph.types import Send
 from langgraph.graph import StateGraph, START, END
 from langchain_core.prompts import ChatPromptTemplate
 from pathlib import Path
-from typing import List
+from typing import List, Optional, Tuple
+from concurrent.futures import ThreadPoolExecutor, as_completed
 import time
+import asyncio
+import threading
 import subprocess
 from .state import VideoSegment, VideoState, ManimScript
+from .reviewer import create_code_reviewer
+from .model_tiers import get_tier_policy
+from .rate_limit import safe_llm_invoke, safe_llm_ainvoke, estimate_tokens, OUTPUT_ALLOWANCE
+from .retrieval import query_manim_rag, query_docs_rag, query_rag_batch
+from .concurrency import get_semaphore
+from .prompt_cache import cacheable_system_message, report_prompt_cache
+from .context_packer import ContextChunk, pack_context, get_context_budget
+from .symbol_index import get_symbol_index
 from langchain_core.runnables.config import RunnableConfig
 import os, uuid
+import hashlib
 import shutil
-import random, time
-from langchain_chroma import Chroma
-from langchain_openai import OpenAIEmbeddings
 from dotenv import load_dotenv
 
 load_dotenv()
 
-def safe_llm_invoke(llm, messages, max_retries=5, base_delay=2):
-    """Retry LLM calls with exponential backoff + jitter if rate limit or timeout occurs."""
-    for attempt in range(max_retries):
-        try:
-            return llm.invoke(messages)
-        except Exception as e:
-            if "rate limit" in str(e).lower() or "429" in str(e) or "timeout" in str(e).lower():
-                delay = base_delay * (2 ** attempt) + random.uniform(0, 1)
-                print(f"Rate limit hit (attempt {attempt+1}/{max_retries}), retrying in {delay:.1f}s...")
-                time.sleep(delay)
-            else:
-                raise e
-    raise Exception("Too many rate-limit retries, aborting.")
-
-def query_manim_rag(query: str, k: int) -> str:
-    try:
-        chroma_dir = "./chroma_manim_db"
-
-        if not os.path.exists(chroma_dir):
-            print(f"Warning: No database found at {chroma_dir}")
-            return ""
-        
-        embeddings = OpenAIEmbeddings(model="text-embedding-3-small")
-
-        vector_store = Chroma(
-            collection_name="manim_code",
-            embedding_function=embeddings,
-            persist_directory=chroma_dir
-        )
+def _extract_code(response, segment_id: int) -> Tuple[str, int]:
+    manim_code = response.content if hasattr(response, 'content') else str(response)
+    usage = getattr(response, "usage_metadata", None) or {}
 
-        results = vector_store.similarity_search_with_score(query=query, k=k)
+    if "```python" in manim_code:
+        manim_code = manim_code.split("```python")[1].split("```")[0].strip()
+    elif "```" in manim_code:
+        manim_code = manim_code.split("```")[1].split("```")[0].strip()
 
-        if not results:
-            print("no results found from rag")
-            return ""
-        
-        examples_text = ""
-        
-        for i, (doc, score) in enumerate(results, 1):
-            examples_text += f"--- Example {i} (from {doc.metadata.get('file', 'unknown')}, similarity: {score:.2f}) ---\n"
-            examples_text += f"```python\n{doc.page_content}\n```\n\n"        
-
-        return examples_text
-
-    except Exception as e:
-        print(f"Error with RAG query: {e}")
-        return ""
+    if not manim_code or len(manim_code) < 50:
+        raise ValueError(f"Generated code too short: {len(manim_code)} chars")
     
-def query_docs_rag(query: str, k: int) -> str:
-    try:
-        chroma_dir = "./chroma_docs_db"
+    if "from manim import" not in manim_code:
+        raise ValueError("Code missing 'from manim import' statement")
+    
+    if f"class Segment{segment_id}" not in manim_code:
+        raise ValueError(f"Code missing 'class Segment{segment_id}' definition")
 
-        if not os.path.exists(chroma_dir):
-            print(f"Warning: No database found at {chroma_dir}")
-            return ""
-        
-        embeddings = OpenAIEmbeddings(model="text-embedding-3-small")
+    return (manim_code, usage.get("total_tokens", 0))
 
-        vector_store = Chroma(
-            collection_name="docs",
-            embedding_function=embeddings,
-            persist_directory=chroma_dir
-        )
+def generate_manim_code(llm, messages, segment_id: int, cache_tag: str = "") -> Tuple[str, int]:
+    """One llm call, returns the extracted code and the tokens it cost"""
+    response = safe_llm_invoke(llm, messages, cache_tag=cache_tag)
+    report_prompt_cache(response, f"Segment {segment_id} codegen")
+    return _extract_code(response, segment_id)
 
-        results = vector_store.similarity_search_with_score(query=query, k=k)
+async def agenerate_manim_code(llm, messages, segment_id: int, cache_tag: str = "") -> Tuple[str, int]:
+    response = await safe_llm_ainvoke(llm, messages, cache_tag=cache_tag)
+    report_prompt_cache(response, f"Segment {segment_id} codegen")
+    return _extract_code(response, segment_id)
 
-        if not results:
-            print("no results found from rag")
-            return ""
-        
-        examples_text = ""
-        
-        for i, (doc, score) in enumerate(results, 1):
-            examples_text += f"--- Example {i}, similarity: {score:.2f}) ---\n"
-            examples_text += f"\n{doc.page_content}\n\n"        
-
-        return examples_text
-
-    except Exception as e:
-        print(f"Error with RAG query: {e}")
+def _regen_cache_tag(segment) -> str:
+    """Regenerations repeat the first prompt, key their cached response on the script that failed"""
+    if not segment.manim_script:
         return ""
-
+    return "after-" + hashlib.sha256(segment.manim_script.encode("utf-8")).hexdigest()[:16]
+
+def _fix_cost(logs: str) -> Tuple[int, int]:
+    """Rough cost to fix a failing candidate: number of static problems, then log length"""
+    problems = sum(1 for line in logs.splitlines() if line.startswith("["))
+    return (problems or 1, len(logs))
+
+def _wave_size(remaining: int, spent: int, token_cap: Optional[int], per_candidate: float) -> int:
+    """How many more candidates to launch, all of them without a cap, otherwise only what the cap still pays for"""
+    if not token_cap:
+        return remaining
+    return min(remaining, max(0, int((token_cap - spent) // max(per_candidate, 1))))
+
+def generate_speculative(llm, messages, segment_id: int, num_candidates: int, token_cap: Optional[int], configurable: dict, cache_tag: str = "") -> str:
+    """Generate candidates concurrently and keep the first one that validates, else the cheapest to fix
+
+    With a token cap candidates are launched in waves sized from the estimated (then measured)
+    tokens per candidate, so the cap bounds what is spent rather than what is waited for.
+    """
+
+    reviewer = create_code_reviewer(configurable)
+    stop = threading.Event()
+
+    def attempt(index: int) -> Optional[Tuple[str, bool, str, int]]:
+        code, tokens = generate_manim_code(llm, messages, segment_id, f"{cache_tag}candidate-{index}")
+        if stop.is_set():
+            # a winner was already picked, skip the dry run
+            return (code, False, "", tokens)
+        success, logs = reviewer.validate(code, segment_id)
+        print(f"----Segment {segment_id} candidate {index + 1}: {'valid' if success else 'invalid'}")
+        return (code, success, logs, tokens)
+
+    print(f"----Generating up to {num_candidates} candidates for segment {segment_id}")
+
+    executor = ThreadPoolExecutor(max_workers=num_candidates)
+    per_candidate = estimate_tokens(messages) + OUTPUT_ALLOWANCE
+    launched = 0
+    finished = 0
+    best = None
+    spent = 0
+    try:
+        while launched < num_candidates:
+            wave = _wave_size(num_candidates - launched, spent, token_cap, per_candidate)
+            if wave == 0 and launched > 0:
+                print(f"----Segment {segment_id} candidates hit the token cap ({spent}/{token_cap}), stopping")
+                break
+            wave = max(wave, 1)
+
+            futures = [executor.submit(attempt, launched + i) for i in range(wave)]
+            launched += wave
+
+            for future in as_completed(futures):
+                try:
+                    code, success, logs, tokens = future.result()
+                except Exception as e:
+                    print(f"----Candidate for segment {segment_id} failed: {e}")
+                    continue
+
+                spent += tokens
+                finished += 1
+                if success:
+                    stop.set()
+                    return code
+
+                if logs and (best is None or _fix_cost(logs) < best[0]):
+                    best = (_fix_cost(logs), code)
+
+            # measured usage replaces the up front estimate for the next wave
+            if finished:
+                per_candidate = spent / finished
+    finally:
+        stop.set()
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    if best is None:
+        raise ValueError(f"All {launched} candidates failed to generate")
+
+    print(f"----No candidate validated for segment {segment_id}, keeping the cheapest to fix")
+    return best[1]
+
+async def agenerate_speculative(llm, messages, segment_id: int, num_candidates: int, token_cap: Optional[int], configurable: dict, cache_tag: str = "") -> str:
+    """Async twin of generate_speculative, losing candidates are cancelled once a winner validates"""
+
+    reviewer = create_code_reviewer(configurable)
+
+    async def attempt(index: int) -> Tuple[str, bool, str, int]:
+        code, tokens = await agenerate_manim_code(llm, messages, segment_id, f"{cache_tag}candidate-{index}")
+        success, logs = await reviewer.avalidate(code, segment_id)
+        print(f"----Segment {segment_id} candidate {index + 1}: {'valid' if success else 'invalid'}")
+        return (code, success, logs, tokens)
+
+    print(f"----Generating up to {num_candidates} candidates for segment {segment_id}")
+
+    per_candidate = estimate_tokens(messages) + OUTPUT_ALLOWANCE
+    launched = 0
+    finished = 0
+    best = None
+    spent = 0
+    tasks = []
+    try:
+        while launched < num_candidates:
+            wave = _wave_size(num_candidates - launched, spent, token_cap, per_candidate)
+            if wave == 0 and launched > 0:
+                print(f"----Segment {segment_id} candidates hit the token cap ({spent}/{token_cap}), stopping")
+                break
+            wave = max(wave, 1)
+
+            tasks = [asyncio.create_task(attempt(launched + i)) for i in range(wave)]
+            launched += wave
+
+            for next_done in asyncio.as_completed(tasks):
+                try:
+                    code, success, logs, tokens = await next_done
+                except Exception as e:
+                    print(f"----Candidate for segment {segment_id} failed: {e}")
+                    continue
+
+                spent += tokens
+                finished += 1
+                if success:
+                    return code
+
+                if best is None or _fix_cost(logs) < best[0]:
+                    best = (_fix_cost(logs), code)
+
+            if finished:
+                per_candidate = spent / finished
+    finally:
+        for task in tasks:
+            task.cancel()
+
+    if best is None:
+        raise ValueError(f"All {launched} candidates failed to generate")
+
+    print(f"----No candidate validated for segment {segment_id}, keeping the cheapest to fix")
+    return best[1]
 
 def manim_orchestrator(state: VideoState) -> List[Send]:
     print("Starting manim orchestrator")
@@ -106,50 +204,39 @@ def manim_orchestrator(state: VideoState) -> List[Send]:
     
     if segments_needing_regen:
         print(f"----Regenerating {len(segments_needing_regen)} failed segments")
-        return [
-            Send("manim_worker", {
-                "segment": segment,
-                "manim_dir": "video_files/manim_script",
-                "video_dir": "video_files/video"
-            })
-            for segment in segments_needing_regen
-        ]
+        segments = segments_needing_regen
+        extra = {"attempt": 1}
     else:
         print(f"----Processing all {len(state.segments)} segments")
-        return [
-            Send("manim_worker", {
-                "segment": segment,
-                "manim_dir": "video_files/manim_script",
-                "video_dir": "video_files/video"
-            })
-            for segment in state.segments
-        ]
-
-def manim_worker(data: dict, config: RunnableConfig) -> dict:
-
-    segment = data["segment"]
-    manim_dir = Path(data["manim_dir"])
-    video_dir = Path(data["video_dir"])
-
-    manim_dir.mkdir(parents=True, exist_ok=True)
-    video_dir.mkdir(parents=True, exist_ok=True)
-
-    llm = config["configurable"]["manim_llm"]
-
-    print(f"----Worker generating manim script for segement {segment.segment_id}")
-
-    if segment.segment_id > 0:
-        delay = (int(segment.segment_id) * 3) + random.uniform(1,3)
-        print(f"----Waiting {delay:.1f}s to avoid rate limits...")
-        time.sleep(delay)
-
-    try:
-        code_examples = query_manim_rag(segment.animation_prompt, k=2)
-        docs = query_docs_rag(segment.animation_prompt, k=2)
-
-
-        prompt = ChatPromptTemplate.from_messages([
-            ("system", """You are an expert Manim (Mathematical Animation Engine) programmer.
+        segments = state.segments
+        extra = {}
+
+    # one embedding request and one search per collection for the whole fan out, workers fall back to their own lookups
+    queries = [segment.animation_prompt for segment in segments]
+    code_examples = query_rag_batch("manim_code", queries, 4) or [None] * len(segments)
+    docs = query_rag_batch("docs", queries, 4) or [None] * len(segments)
+
+    return [
+        Send("manim_worker", {
+            "segment": segment,
+            "manim_dir": "video_files/manim_script",
+            "video_dir": "video_files/video",
+            "code_examples": segment_examples,
+            "docs": segment_docs,
+            **extra
+        })
+        for segment, segment_examples, segment_docs in zip(segments, code_examples, docs)
+    ]
+
+def _save_script(segment, manim_code: str, manim_dir: Path):
+    segment.manim_script = manim_code
+    script_path = manim_dir / f"segment_{segment.segment_id}.py"
+
+    with open(script_path, "w") as f:
+        f.write(manim_code)
+
+# invariant instructions, kept byte-identical across segments so providers can cache them as a prompt prefix
+CODEGEN_INSTRUCTIONS = """You are an expert Manim (Mathematical Animation Engine) programmer.
 Generate complete, working Manim Community Edition code that creates engaging educational animations.
 Always include proper imports and ensure timing exactly matches the required duration
 
@@ -157,29 +244,19 @@ CRITICAL: Return ONLY the Python code, nothing else.
 NO markdown code blocks (no ```python or ```).
 NO explanations.
 NO JSON.
-JUST the raw Python code starting with "from manim import *"."""),
-        ("human", """Generate a complete Manim Python script for this animation pseudocode:
+JUST the raw Python code starting with "from manim import *".
+
+You will be given an animation pseudocode, the required duration, the scene class name,
+some example animation manim scripts by 3Blue1Brown and parts of the manim community documentation.
 
 KEEP THE CODE SHORT AND SIMPLE, DO NOT GIVE BIG CODE. KEEP SHORT, SIMPLE CODE
-Animation Pseudocode: {animation_prompt}
-Required Duration: {duration} seconds
-Segment ID: {segment_id}
-         
-Below are some example animation manim scripts by 3Blue1Brown for reference
+
+About the code examples:
 Please note that these script use the 3b1b version of Manim, not ManimCommunity, so the functions, tools, etc may be different or have different names.
 IMPORTANT: You have to write code in Manim Community edition, not 3b1b version.
 Some of the code in examples may be old and depreciated, be aware of that while writing your own code.
 Refer to the code for animations, animation styles, colours, visual style, etc.
-         
-<START OF MANIM CODE EXAMPLES>
-{code_examples}     
-</END OF MANIM CODE EXAMPLES>
-         
-Below are some of the parts of manim community documentation relevant for this animation:
-<START OF MANIM DOCS>      
-{docs}      
-<END OF MANIM DOCS>
-         
+
 !!! IMPORTANT: MAKE SURE THAT THE OBJECTS IN ANIMATION ARE IN FRAME AND DON'T OVERLAP (e.g. that the graphs and text dont overlap) (erase old graphs if not needed for explainations)
 
 TIPS BASED OF SOME OF THE MOST COMMON ISSUES FACED:
@@ -192,8 +269,8 @@ TIPS BASED OF SOME OF THE MOST COMMON ISSUES FACED:
 
 Requirements:
 1. Use Manim Community Edition (from manim import *)
-2. Create a Scene class called Segment{segment_id}
-3. MUST use self.wait() (if necessary) to reach EXACTLY {duration} seconds total runtime.
+2. Create a Scene class with exactly the scene class name given with the task
+3. MUST use self.wait() (if necessary) to reach EXACTLY the required duration of total runtime.
 4. Use clear, educational animations (Write, Create, FadeIn, Transform, etc.)
 5. The video rendered by the code should have no elements that overlap
 6. Use vibrant colors and clear text and include proper timing comments
@@ -208,45 +285,158 @@ Requirements:
 # Example code for reference:
 # self.play(SomeAnimation, run_time=X) 
 # self.wait(Y)
-Total of X + Y + ... should equal {duration} seconds STRICTLY.
+Total of X + Y + ... should equal the required duration STRICTLY.
          
 USE Scene Class and avoid ThreeDScene class in most of the cases.
 Animation is planned so that it runs for the given duration, use self.wait() only when the animation timing does not reach the given duration.
 NO COMMENTS, NO EXPLAINATIONS, JUST RETURN ONLY PYTHON CODE.
-Return the complete working code with all imports. Don't give any explainations or text, just give code.""")
-        ])
+Return the complete working code with all imports. Don't give any explainations or text, just give code."""
 
-        messages = prompt.format_messages(
-            animation_prompt = segment.animation_prompt,
-            duration = segment.audio_duration_sec,
-            code_examples = code_examples,
-            docs=docs,
-            segment_id=segment.segment_id
-        )
+def _codegen_messages(llm, segment, code_examples: str, docs: str):
+    """Cacheable instructions first, then everything that changes per segment"""
+    prompt = ChatPromptTemplate.from_messages([
+        ("human", """Generate a complete Manim Python script for this animation pseudocode:
 
-        response = safe_llm_invoke(llm, messages)
+Animation Pseudocode: {animation_prompt}
+Required Duration: {duration} seconds
+Scene class name: Segment{segment_id}
 
-        manim_code = response.content if hasattr(response, 'content') else str(response)
+<START OF MANIM CODE EXAMPLES>
+{code_examples}     
+</END OF MANIM CODE EXAMPLES>
+         
+Below are some of the parts of manim community documentation relevant for this animation:
+<START OF MANIM DOCS>      
+{docs}      
+<END OF MANIM DOCS>""")
+    ])
+
+    return [cacheable_system_message(llm, CODEGEN_INSTRUCTIONS, "Codegen"), *prompt.format_messages(
+        animation_prompt = segment.animation_prompt,
+        duration = segment.audio_duration_sec,
+        code_examples = code_examples,
+        docs=docs,
+        segment_id=segment.segment_id
+    )]
+
+def _signature_chunks(segment) -> List[ContextChunk]:
+    """Exact signatures of the manim classes the pseudocode names, empty without a symbol index"""
+    symbol_index = get_symbol_index()
+    if symbol_index is None:
+        return []
+    return symbol_index.signature_chunks(segment.animation_prompt)
 
-        if "```python" in manim_code:
-            manim_code = manim_code.split("```python")[1].split("```")[0].strip()
-        elif "```" in manim_code:
-            manim_code = manim_code.split("```")[1].split("```")[0].strip()
+def manim_worker(data: dict, config: RunnableConfig) -> dict:
 
-        if not manim_code or len(manim_code) < 50:
-            raise ValueError(f"Generated code too short: {len(manim_code)} chars")
-        
-        if "from manim import" not in manim_code:
-            raise ValueError("Code missing 'from manim import' statement")
+    segment = data["segment"]
+    manim_dir = Path(data["manim_dir"])
+    video_dir = Path(data["video_dir"])
+
+    manim_dir.mkdir(parents=True, exist_ok=True)
+    video_dir.mkdir(parents=True, exist_ok=True)
+
+    # first attempts go to the fast tier, regenerations of failed segments escalate
+    tier_policy = get_tier_policy(config["configurable"], "manim")
+    tier, llm = tier_policy.select(data.get("attempt", 0))
+
+    print(f"----Worker generating manim script for segement {segment.segment_id}")
+
+    try:
+        # fetch a few extra candidates, the packer keeps the most relevant ones that fit the budget
+        code_examples = data.get("code_examples")
+        if code_examples is None:
+            code_examples = query_manim_rag(segment.animation_prompt, k=4)
+        docs = data.get("docs")
+        if docs is None:
+            docs = query_docs_rag(segment.animation_prompt, k=4)
+        chunks = code_examples + _signature_chunks(segment) + docs
+        context = pack_context(chunks, get_context_budget(config["configurable"], "codegen"), f"Segment {segment.segment_id} codegen")
+
+        messages = _codegen_messages(llm, segment, context.get("code_examples", ""), context.get("docs", ""))
+
+        num_candidates = config["configurable"].get("manim_candidates", 1)
+
+        started = time.monotonic()
+        try:
+            if num_candidates > 1:
+                manim_code = generate_speculative(
+                    llm,
+                    messages,
+                    segment.segment_id,
+                    num_candidates,
+                    config["configurable"].get("manim_candidate_token_cap"),
+                    config["configurable"],
+                    _regen_cache_tag(segment)
+                )
+            else:
+                manim_code, _ = generate_manim_code(llm, messages, segment.segment_id, _regen_cache_tag(segment))
+        except Exception:
+            tier_policy.record(tier, time.monotonic() - started, False)
+            raise
+        tier_policy.record(tier, time.monotonic() - started, True)
+
+        _save_script(segment, manim_code, manim_dir)
+
+        print(f"----Segment {segment.segment_id}: Manim script saved, procceding to send to code reviewer.")
+
+        return {"segments": [segment], "segments_needing_regeneration": []}
         
-        if f"class Segment{segment.segment_id}" not in manim_code:
-            raise ValueError(f"Code missing 'class Segment{segment.segment_id}' definition")
+    except Exception as e:
+        print(f"----Error rendering segment: {e} ")
+        segment.manim_script = ""
+        return {"segments": [segment], "segments_needing_regeneration": []}
+    
+async def amanim_worker(data: dict, config: RunnableConfig) -> dict:
 
-        segment.manim_script = manim_code
-        script_path = manim_dir / f"segment_{segment.segment_id}.py"
+    segment = data["segment"]
+    manim_dir = Path(data["manim_dir"])
+    video_dir = Path(data["video_dir"])
+    configurable = config["configurable"]
+
+    manim_dir.mkdir(parents=True, exist_ok=True)
+    video_dir.mkdir(parents=True, exist_ok=True)
+
+    tier_policy = get_tier_policy(configurable, "manim")
+    tier, llm = tier_policy.select(data.get("attempt", 0))
+
+    print(f"----Worker generating manim script for segement {segment.segment_id}")
+
+    try:
+        code_examples, docs = data.get("code_examples"), data.get("docs")
+        if code_examples is None or docs is None:
+            async with get_semaphore(configurable, "embedding"):
+                code_examples, docs = await asyncio.gather(
+                    asyncio.to_thread(query_manim_rag, segment.animation_prompt, 4),
+                    asyncio.to_thread(query_docs_rag, segment.animation_prompt, 4),
+                )
+        context = pack_context(code_examples + _signature_chunks(segment) + docs, get_context_budget(configurable, "codegen"), f"Segment {segment.segment_id} codegen")
+
+        messages = _codegen_messages(llm, segment, context.get("code_examples", ""), context.get("docs", ""))
+
+        num_candidates = configurable.get("manim_candidates", 1)
+
+        started = time.monotonic()
+        try:
+            if num_candidates > 1:
+                async with get_semaphore(configurable, "review"):
+                    manim_code = await agenerate_speculative(
+                        llm,
+                        messages,
+                        segment.segment_id,
+                        num_candidates,
+                        configurable.get("manim_candidate_token_cap"),
+                        configurable,
+                        _regen_cache_tag(segment)
+                    )
+            else:
+                async with get_semaphore(configurable, "llm"):
+                    manim_code, _ = await agenerate_manim_code(llm, messages, segment.segment_id, _regen_cache_tag(segment))
+        except Exception:
+            tier_policy.record(tier, time.monotonic() - started, False)
+            raise
+        tier_policy.record(tier, time.monotonic() - started, True)
 
-        with open(script_path, "w") as f:
-            f.write(manim_code)
+        _save_script(segment, manim_code, manim_dir)
 
         print(f"----Segment {segment.segment_id}: Manim script saved, procceding to send to code reviewer.")
 
@@ -257,11 +447,11 @@ Return the complete working code with all imports. Don't give any explainations
         segment.manim_script = ""
         return {"segments": [segment], "segments_needing_regeneration": []}
     
-def create_manim_graph():
+def create_manim_graph(use_async: bool = False):
 
     graph = StateGraph(VideoState)
 
-    graph.add_node("manim_worker", manim_worker)
+    graph.add_node("manim_worker", amanim_worker if use_async else manim_worker)
 
     graph.add_conditional_edges(START, manim_orchestrator)
     graph.add_edge("manim_worker", END)
@@ -0,0 +1,300 @@
+"""Warm manim fork server
+
+A long lived process imports manim once and forks a child per job, so dry runs and
+renders skip the interpreter start and `import manim` cost of the CLI. Jobs are
+sent as json lines over stdin and results come back over stdout.
+"""
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+from pathlib import Path
+from typing import Dict, List, Optional
+import subprocess
+import asyncio
+import threading
+import itertools
+import tempfile
+import select
+import signal
+import json
+import time
+import sys
+import os
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+
+class ManimResult:
+    def __init__(self, returncode: int, stdout: str, stderr: str):
+        self.returncode = returncode
+        self.stdout = stdout
+        self.stderr = stderr
+
+
+# ---------------------------------------------------------------- server side
+
+def _run_child(job: dict, stdout_path: str, stderr_path: str):
+    """Runs in the forked child, never returns"""
+    code = 1
+    try:
+        os.setsid()
+
+        if job.get("memory_mb"):
+            import resource
+            limit = int(job["memory_mb"]) * 1024 * 1024
+            resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+
+        out_fd = os.open(stdout_path, os.O_WRONLY)
+        err_fd = os.open(stderr_path, os.O_WRONLY)
+        os.dup2(out_fd, 1)
+        os.dup2(err_fd, 2)
+        sys.stdout = os.fdopen(1, "w", buffering=1)
+        sys.stderr = os.fdopen(2, "w", buffering=1)
+
+        if job.get("cwd"):
+            os.chdir(job["cwd"])
+        os.environ.update(job.get("env") or {})
+
+        from manim.__main__ import main
+        main(args=job["args"], prog_name="manim", standalone_mode=True)
+        code = 0
+    except SystemExit as e:
+        code = e.code if isinstance(e.code, int) else (0 if e.code is None else 1)
+    except BaseException:
+        import traceback
+        traceback.print_exc()
+        code = 1
+    finally:
+        try:
+            sys.stdout.flush()
+            sys.stderr.flush()
+        finally:
+            os._exit(code)
+
+def _read_and_remove(path: str) -> str:
+    try:
+        with open(path, "r", errors="replace") as f:
+            return f.read()
+    finally:
+        os.unlink(path)
+
+def serve():
+    """Server loop: read jobs from stdin, fork per job, reap children and report results"""
+
+    # keep the real stdout for the protocol, anything manim prints at import goes to stderr
+    protocol = os.fdopen(os.dup(1), "w", buffering=1)
+    os.dup2(2, 1)
+
+    import manim  # noqa: F401  the whole point, pay the import once
+
+    protocol.write(json.dumps({"ready": True}) + "\n")
+
+    # single threaded on purpose, forking from a threaded parent is not safe
+    running: Dict[int, dict] = {}
+    stdin_fd = sys.stdin.fileno()
+    stdin_open = True
+    buffer = b""
+
+    while stdin_open or running:
+        jobs = []
+        if stdin_open:
+            readable, _, _ = select.select([stdin_fd], [], [], 0.05)
+            if readable:
+                data = os.read(stdin_fd, 65536)
+                if not data:
+                    stdin_open = False
+                buffer += data
+                *lines, buffer = buffer.split(b"\n")
+                jobs = [json.loads(line) for line in lines if line.strip()]
+        else:
+            time.sleep(0.05)
+
+        for job in jobs:
+            stdout_fd, stdout_path = tempfile.mkstemp(prefix="manim_job_", suffix=".out")
+            stderr_fd, stderr_path = tempfile.mkstemp(prefix="manim_job_", suffix=".err")
+            os.close(stdout_fd)
+            os.close(stderr_fd)
+
+            pid = os.fork()
+            if pid == 0:
+                _run_child(job, stdout_path, stderr_path)
+
+            running[pid] = {
+                "id": job["id"],
+                "deadline": time.monotonic() + job.get("timeout", 180),
+                "stdout": stdout_path,
+                "stderr": stderr_path,
+                "timed_out": False,
+            }
+
+        for pid, info in list(running.items()):
+            finished, status = os.waitpid(pid, os.WNOHANG)
+
+            if finished == 0:
+                if not info["timed_out"] and time.monotonic() > info["deadline"]:
+                    info["timed_out"] = True
+                    try:
+                        os.killpg(pid, signal.SIGKILL)
+                    except ProcessLookupError:
+                        pass
+                continue
+
+            del running[pid]
+            protocol.write(json.dumps({
+                "id": info["id"],
+                "returncode": os.waitstatus_to_exitcode(status),
+                "stdout": _read_and_remove(info["stdout"]),
+                "stderr": _read_and_remove(info["stderr"]),
+                "timed_out": info["timed_out"],
+            }) + "\n")
+
+
+# ---------------------------------------------------------------- client side
+
+class ManimServer:
+    """Client handle for the fork server, started lazily and shared by the whole process"""
+
+    def __init__(self):
+        self._process: Optional[subprocess.Popen] = None
+        self._pending: Dict[int, Future] = {}
+        self._ids = itertools.count()
+        self._lock = threading.Lock()
+
+    def _start(self):
+        process = subprocess.Popen(
+            [sys.executable, "-m", "src.manim_server"],
+            cwd=str(PROJECT_ROOT),
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            text=True,
+        )
+
+        ready = process.stdout.readline()
+        if not ready or not json.loads(ready).get("ready"):
+            process.kill()
+            raise RuntimeError("manim server failed to start, is manim installed?")
+
+        self._process = process
+        threading.Thread(target=self._read_results, args=(process,), daemon=True).start()
+        print("----Started warm manim server")
+
+    def _read_results(self, process: subprocess.Popen):
+        for line in process.stdout:
+            try:
+                result = json.loads(line)
+            except json.JSONDecodeError:
+                # protocol is out of sync, treat it like a dead server
+                process.kill()
+                break
+            with self._lock:
+                future = self._pending.pop(result["id"], None)
+            # the caller may have given up on (and cancelled) a slow job already
+            if future is not None and not future.done():
+                future.set_result(result)
+
+        # server died, fail whatever is still waiting so callers can fall back
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            if self._process is process:
+                self._process = None
+        for future in pending.values():
+            if not future.done():
+                future.set_exception(RuntimeError("manim server exited"))
+
+    def submit(self, args: List[str], cwd: Optional[str] = None, env: Optional[Dict[str, str]] = None, timeout: int = 180, memory_mb: Optional[int] = None) -> Future:
+        with self._lock:
+            if self._process is None or self._process.poll() is not None:
+                self._start()
+
+            job_id = next(self._ids)
+            future = Future()
+            self._pending[job_id] = future
+
+            self._process.stdin.write(json.dumps({
+                "id": job_id,
+                "args": args,
+                "cwd": cwd,
+                "env": env or {},
+                "timeout": timeout,
+                "memory_mb": memory_mb,
+            }) + "\n")
+            self._process.stdin.flush()
+
+        return future
+
+_server = ManimServer()
+_server_broken = False
+
+def _run_cli(args: List[str], cwd: Optional[str], env: Optional[Dict[str, str]], timeout: int) -> ManimResult:
+    process = subprocess.run(
+        ["manim", *args],
+        capture_output=True,
+        text=True,
+        timeout=timeout,
+        cwd=cwd,
+        env={**os.environ, **(env or {})},
+    )
+    return ManimResult(process.returncode, process.stdout, process.stderr)
+
+def run_manim(args: List[str], cwd: Optional[str] = None, env: Optional[Dict[str, str]] = None, timeout: int = 180, memory_mb: Optional[int] = None, use_server: bool = True) -> ManimResult:
+    """Run a manim CLI invocation through the warm server, falling back to a fresh `manim` process
+
+    `args` are the CLI arguments after `manim`, `env` only holds overrides on top of os.environ.
+    Raises subprocess.TimeoutExpired like subprocess.run does. Only connection or protocol
+    errors switch the process over to the CLI, a timed out job leaves the server in use.
+    """
+    global _server_broken
+
+    if use_server and not _server_broken and hasattr(os, "fork"):
+        try:
+            result = _server.submit(args, cwd=cwd, env=env, timeout=timeout, memory_mb=memory_mb).result(timeout=timeout + 30)
+        except FutureTimeoutError:
+            # one slow job, the server kills its process group itself and stays usable
+            raise subprocess.TimeoutExpired(["manim", *args], timeout)
+        except Exception as e:
+            print(f"----Manim server unavailable, falling back to CLI: {e}")
+            _server_broken = True
+        else:
+            if result["timed_out"]:
+                raise subprocess.TimeoutExpired(["manim", *args], timeout, result["stdout"], result["stderr"])
+            return ManimResult(result["returncode"], result["stdout"], result["stderr"])
+
+    return _run_cli(args, cwd, env, timeout)
+
+async def _arun_cli(args: List[str], cwd: Optional[str], env: Optional[Dict[str, str]], timeout: int) -> ManimResult:
+    process = await asyncio.create_subprocess_exec(
+        "manim", *args,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.PIPE,
+        cwd=cwd,
+        env={**os.environ, **(env or {})},
+    )
+    try:
+        stdout, stderr = await asyncio.wait_for(process.communicate(), timeout=timeout)
+    except asyncio.TimeoutError:
+        process.kill()
+        await process.wait()
+        raise subprocess.TimeoutExpired(["manim", *args], timeout)
+
+    return ManimResult(process.returncode, stdout.decode(errors="replace"), stderr.decode(errors="replace"))
+
+async def arun_manim(args: List[str], cwd: Optional[str] = None, env: Optional[Dict[str, str]] = None, timeout: int = 180, memory_mb: Optional[int] = None, use_server: bool = True) -> ManimResult:
+    """Async twin of run_manim, awaits the server job or an asyncio subprocess without holding a thread"""
+    global _server_broken
+
+    if use_server and not _server_broken and hasattr(os, "fork"):
+        try:
+            future = _server.submit(args, cwd=cwd, env=env, timeout=timeout, memory_mb=memory_mb)
+            result = await asyncio.wait_for(asyncio.wrap_future(future), timeout=timeout + 30)
+        except (asyncio.TimeoutError, FutureTimeoutError):
+            raise subprocess.TimeoutExpired(["manim", *args], timeout)
+        except Exception as e:
+            print(f"----Manim server unavailable, falling back to CLI: {e}")
+            _server_broken = True
+        else:
+            if result["timed_out"]:
+                raise subprocess.TimeoutExpired(["manim", *args], timeout, result["stdout"], result["stderr"])
+            return ManimResult(result["returncode"], result["stdout"], result["stderr"])
+
+    return await _arun_cli(args, cwd, env, timeout)
+
+if __name__ == "__main__":
+    serve()
@@ -0,0 +1,61 @@
+from typing import Dict, Iterable, Optional, Tuple
+import threading
+
+FAST = "fast"
+STRONG = "strong"
+
+# runtime errors deep inside manim that a fast model rarely fixes, static problems stay on the fast tier
+DEFAULT_ESCALATE_ON = ("TypeError", "ValueError", "IndexError", "KeyError", "RecursionError")
+
+class ModelTierPolicy:
+    """Picks a fast or strong model per attempt and keeps latency/success counters per tier
+
+    The fast model handles first attempts and easy fixes, the strong one takes over after
+    `escalate_after` failed attempts or as soon as an error type in `escalate_on` shows up.
+    """
+
+    def __init__(self, strong, fast=None, escalate_after: int = 2, escalate_on: Iterable[str] = DEFAULT_ESCALATE_ON):
+        self.strong = strong
+        self.fast = fast
+        self.escalate_after = escalate_after
+        self.escalate_on = set(escalate_on)
+        self._lock = threading.Lock()
+        self._counters: Dict[str, Dict[str, float]] = {
+            tier: {"calls": 0, "successes": 0, "latency": 0.0} for tier in (FAST, STRONG)
+        }
+
+    def select(self, attempt: int, error_type: Optional[str] = None) -> Tuple[str, object]:
+        """attempt is 0 based, returns (tier, llm)"""
+        if self.fast is None or attempt >= self.escalate_after or error_type in self.escalate_on:
+            return (STRONG, self.strong)
+        return (FAST, self.fast)
+
+    def record(self, tier: str, latency: float, success: bool):
+        with self._lock:
+            counters = self._counters[tier]
+            counters["calls"] += 1
+            counters["successes"] += int(success)
+            counters["latency"] += latency
+
+    def stats(self) -> Dict[str, dict]:
+        with self._lock:
+            return {
+                tier: {
+                    "calls": int(counters["calls"]),
+                    "success_rate": round(counters["successes"] / counters["calls"], 3) if counters["calls"] else 0.0,
+                    "mean_latency": round(counters["latency"] / counters["calls"], 2) if counters["calls"] else 0.0,
+                }
+                for tier, counters in self._counters.items()
+            }
+
+    def report(self, name: str):
+        for tier, stats in self.stats().items():
+            if stats["calls"]:
+                print(f"----{name} {tier} tier: {stats['calls']} calls, success rate {stats['success_rate']}, mean latency {stats['mean_latency']}s")
+
+def get_tier_policy(configurable: dict, stage: str) -> ModelTierPolicy:
+    """Policy from configurable['<stage>_tiers'], or a single tier policy around '<stage>_llm'"""
+    policy = configurable.get(f"{stage}_tiers")
+    if policy is None:
+        policy = ModelTierPolicy(strong=configurable.get(f"{stage}_llm"))
+    return policy
@@ -0,0 +1,56 @@
+from langchain_core.messages import SystemMessage
+from typing import Optional
+from .rate_limit import llm_key
+from .context_packer import count_tokens
+
+# shortest prefix each provider will cache, shorter prefixes are silently processed uncached
+# (anthropic: 1024 tokens for sonnet/opus, 2048 for haiku 3.x, 4096 for haiku 4.5; openai: 1024)
+DEFAULT_MIN_CACHEABLE_TOKENS = 1024
+MIN_CACHEABLE_TOKENS = {
+    "anthropic:claude-haiku-4-5": 4096,
+    "anthropic:claude-3-5-haiku": 2048,
+    "anthropic:claude-3-haiku": 2048,
+}
+
+_warned = set()
+
+def min_cacheable_tokens(llm) -> int:
+    key = llm_key(llm)
+    for prefix, minimum in MIN_CACHEABLE_TOKENS.items():
+        if key.startswith(prefix):
+            return minimum
+    return DEFAULT_MIN_CACHEABLE_TOKENS
+
+def cacheable_system_message(llm, text: str, label: Optional[str] = None) -> SystemMessage:
+    """System message holding the invariant prompt prefix, marked for Anthropic prompt caching
+
+    OpenAI caches identical prefixes on its own and rejects unknown content block keys,
+    so the cache_control marker is only added for Anthropic models. The marker is always
+    sent, providers skip caching below their minimum length on their own. The token count
+    here is a tiktoken estimate, not the provider's tokenizer, so it only drives a notice.
+    """
+    tokens = count_tokens(text)
+    minimum = min_cacheable_tokens(llm)
+    if label and tokens < minimum and (label, llm_key(llm)) not in _warned:
+        _warned.add((label, llm_key(llm)))
+        print(f"----{label}: prompt prefix of ~{tokens} tokens may be below the {minimum} token cache minimum of {llm_key(llm)}")
+
+    if llm_key(llm).startswith("anthropic"):
+        return SystemMessage(content=[{"type": "text", "text": text, "cache_control": {"type": "ephemeral"}}])
+    return SystemMessage(content=text)
+
+def report_prompt_cache(response, label: str):
+    """Print cached vs uncached input tokens from the provider's usage metadata"""
+    usage = getattr(response, "usage_metadata", None) or {}
+    if not usage.get("input_tokens"):
+        return
+
+    details = usage.get("input_token_details") or {}
+    cached = details.get("cache_read") or 0
+    written = details.get("cache_creation") or 0
+    uncached = usage["input_tokens"] - cached
+
+    message = f"----{label}: {cached} cached / {uncached} uncached input tokens"
+    if written:
+        message += f" ({written} written to the prompt cache)"
+    print(message)
@@ -0,0 +1,239 @@
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+from .llm_cache import get_llm_cache, response_cache_key
+import anthropic
+import openai
+import threading
+import asyncio
+import sqlite3
+import random
+import time
+
+# (requests per minute, tokens per minute), matched by the longest "provider:model" prefix
+DEFAULT_LIMITS: Dict[str, Tuple[float, float]] = {
+    "openai": (500, 200_000),
+    "openai:text-embedding": (3_000, 1_000_000),
+    "openai:gpt-4o-mini-tts": (500, 200_000),
+    "anthropic": (50, 30_000),
+    "default": (60, 60_000),
+}
+
+EMBEDDING_KEY = "openai:text-embedding-3-small"
+TTS_KEY = "openai:gpt-4o-mini-tts"
+
+# provider pushback (429), drains the shared bucket so every caller backs off
+RATE_LIMIT_ERRORS = (openai.RateLimitError, anthropic.RateLimitError)
+# slow responses, retried without touching the bucket
+TIMEOUT_ERRORS = (openai.APITimeoutError, anthropic.APITimeoutError, TimeoutError)
+
+# output tokens charged up front, corrected with the real usage once the response arrives
+OUTPUT_ALLOWANCE = 2_000
+
+def llm_key(llm) -> str:
+    """provider:model key for a langchain chat model"""
+    model = getattr(llm, "model_name", None) or getattr(llm, "model", None) or "unknown"
+    name = type(llm).__name__.lower()
+    if "anthropic" in name:
+        provider = "anthropic"
+    elif "openai" in name:
+        provider = "openai"
+    else:
+        provider = name
+    return f"{provider}:{model}"
+
+def estimate_tokens(messages) -> int:
+    if isinstance(messages, str):
+        return len(messages) // 4 + 1
+    total = 0
+    for message in messages:
+        content = getattr(message, "content", message)
+        total += len(str(content)) // 4 + 1
+    return total
+
+class RateLimiter:
+    """Token buckets keyed per provider/model with requests and tokens per minute budgets
+
+    Buckets live in process memory by default; with `shared_path` they are kept in a sqlite
+    file so several pipeline processes on the same machine share one budget.
+    """
+
+    def __init__(self, limits: Optional[Dict[str, Tuple[float, float]]] = None, shared_path: Optional[Path] = None):
+        self.limits = {**DEFAULT_LIMITS, **(limits or {})}
+        self.shared_path = Path(shared_path) if shared_path else None
+        self._lock = threading.Lock()
+        self._buckets: Dict[str, Tuple[float, float, float]] = {}
+        self._local = threading.local()
+
+        if self.shared_path is not None:
+            self.shared_path.parent.mkdir(parents=True, exist_ok=True)
+            self._connection().execute(
+                "CREATE TABLE IF NOT EXISTS buckets (key TEXT PRIMARY KEY, requests REAL, tokens REAL, updated REAL)"
+            )
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(str(self.shared_path), timeout=30, isolation_level=None)
+            self._local.conn = conn
+        return conn
+
+    def _limits_for(self, key: str) -> Tuple[float, float]:
+        matches = [prefix for prefix in self.limits if key.startswith(prefix)]
+        return self.limits[max(matches, key=len)] if matches else self.limits["default"]
+
+    def _refill(self, key: str, state: Optional[Tuple[float, float, float]], now: float) -> Tuple[float, float]:
+        rpm, tpm = self._limits_for(key)
+        if state is None:
+            return (rpm, tpm)
+        requests, tokens, updated = state
+        elapsed = max(0.0, now - updated)
+        return (min(rpm, requests + elapsed * rpm / 60), min(tpm, tokens + elapsed * tpm / 60))
+
+    def _take(self, key: str, requests: float, tokens: float, force: bool) -> float:
+        """Take from the buckets, returns 0 on success or the seconds to wait before retrying"""
+        rpm, tpm = self._limits_for(key)
+        requests, tokens = min(requests, rpm), min(tokens, tpm)
+        now = time.time()
+
+        def decide(state):
+            level_requests, level_tokens = self._refill(key, state, now)
+            if force or (level_requests >= requests and level_tokens >= tokens):
+                return (0.0, (level_requests - requests, level_tokens - tokens, now))
+            wait = max((requests - level_requests) * 60 / rpm, (tokens - level_tokens) * 60 / tpm)
+            return (wait, None)
+
+        if self.shared_path is None:
+            with self._lock:
+                wait, new_state = decide(self._buckets.get(key))
+                if new_state is not None:
+                    self._buckets[key] = new_state
+                return wait
+
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute("SELECT requests, tokens, updated FROM buckets WHERE key = ?", (key,)).fetchone()
+            wait, new_state = decide(row)
+            if new_state is not None:
+                conn.execute("INSERT OR REPLACE INTO buckets (key, requests, tokens, updated) VALUES (?, ?, ?, ?)", (key, *new_state))
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return wait
+
+    def acquire(self, key: str, tokens: float = 0):
+        """Block until one request and `tokens` tokens fit in the budget for `key`"""
+        while True:
+            wait = self._take(key, 1, tokens, force=False)
+            if wait <= 0:
+                return
+            time.sleep(min(wait, 5.0) + random.uniform(0, 0.1))
+
+    async def aacquire(self, key: str, tokens: float = 0):
+        """Async acquire, waits on the event loop instead of blocking a thread"""
+        while True:
+            wait = self._take(key, 1, tokens, force=False)
+            if wait <= 0:
+                return
+            await asyncio.sleep(min(wait, 5.0) + random.uniform(0, 0.1))
+
+    def adjust(self, key: str, tokens: float):
+        """Charge (or refund, if negative) the difference between estimated and real token usage"""
+        if tokens:
+            self._take(key, 0, tokens, force=True)
+
+    def penalize(self, key: str):
+        """Drain the buckets after the provider answered 429 so every caller backs off"""
+        rpm, tpm = self._limits_for(key)
+        self._take(key, rpm, tpm, force=True)
+
+_rate_limiter = RateLimiter()
+
+def configure_rate_limiter(limits: Optional[Dict[str, Tuple[float, float]]] = None, shared_path: Optional[Path] = None) -> RateLimiter:
+    global _rate_limiter
+    _rate_limiter = RateLimiter(limits, shared_path)
+    return _rate_limiter
+
+def get_rate_limiter() -> RateLimiter:
+    return _rate_limiter
+
+def safe_llm_invoke(llm, messages, max_retries=5, base_delay=2, key: Optional[str] = None, schema: Optional[type] = None, cache_tag: str = ""):
+    """Invoke an llm inside the shared rate limit, retrying with backoff if the provider still pushes back
+
+    Responses go through the configured LLM cache; `schema` is the structured output model of a
+    with_structured_output llm and `cache_tag` separates calls that intentionally repeat a prompt.
+    """
+    key = key or llm_key(llm)
+    cache = get_llm_cache()
+    cache_key = response_cache_key(llm, messages, key, schema, cache_tag) if cache.enabled else None
+    if cache_key is not None:
+        cached = cache.get(cache_key, schema)
+        if cached is not None:
+            return cached
+
+    limiter = get_rate_limiter()
+    estimated = estimate_tokens(messages) + OUTPUT_ALLOWANCE
+
+    for attempt in range(max_retries):
+        limiter.acquire(key, estimated)
+        try:
+            response = llm.invoke(messages)
+        except RATE_LIMIT_ERRORS:
+            limiter.penalize(key)
+            delay = base_delay * (2 ** attempt) + random.uniform(0, 1)
+            print(f"Rate limit hit (attempt {attempt+1}/{max_retries}), retrying in {delay:.1f}s...")
+            time.sleep(delay)
+            continue
+        except TIMEOUT_ERRORS:
+            delay = base_delay * (2 ** attempt) + random.uniform(0, 1)
+            print(f"Request timed out (attempt {attempt+1}/{max_retries}), retrying in {delay:.1f}s...")
+            time.sleep(delay)
+            continue
+
+        usage = getattr(response, "usage_metadata", None) or {}
+        if usage.get("total_tokens"):
+            limiter.adjust(key, usage["total_tokens"] - estimated)
+        if cache_key is not None:
+            cache.put(cache_key, key, response, schema)
+        return response
+
+    raise Exception("Too many rate-limit or timeout retries, aborting.")
+
+async def safe_llm_ainvoke(llm, messages, max_retries=5, base_delay=2, key: Optional[str] = None, schema: Optional[type] = None, cache_tag: str = ""):
+    """Async twin of safe_llm_invoke using llm.ainvoke"""
+    key = key or llm_key(llm)
+    cache = get_llm_cache()
+    cache_key = response_cache_key(llm, messages, key, schema, cache_tag) if cache.enabled else None
+    if cache_key is not None:
+        cached = cache.get(cache_key, schema)
+        if cached is not None:
+            return cached
+
+    limiter = get_rate_limiter()
+    estimated = estimate_tokens(messages) + OUTPUT_ALLOWANCE
+
+    for attempt in range(max_retries):
+        await limiter.aacquire(key, estimated)
+        try:
+            response = await llm.ainvoke(messages)
+        except RATE_LIMIT_ERRORS:
+            limiter.penalize(key)
+            delay = base_delay * (2 ** attempt) + random.uniform(0, 1)
+            print(f"Rate limit hit (attempt {attempt+1}/{max_retries}), retrying in {delay:.1f}s...")
+            await asyncio.sleep(delay)
+            continue
+        except TIMEOUT_ERRORS:
+            delay = base_delay * (2 ** attempt) + random.uniform(0, 1)
+            print(f"Request timed out (attempt {attempt+1}/{max_retries}), retrying in {delay:.1f}s...")
+            await asyncio.sleep(delay)
+            continue
+
+        usage = getattr(response, "usage_metadata", None) or {}
+        if usage.get("total_tokens"):
+            limiter.adjust(key, usage["total_tokens"] - estimated)
+        if cache_key is not None:
+            cache.put(cache_key, key, response, schema)
+        return response
+
+    raise Exception("Too many rate-limit or timeout retries, aborting.")
@@ -0,0 +1,104 @@
+from pathlib import Path
+from typing import List, Optional
+from importlib import metadata
+import hashlib
+import os
+import shutil
+import threading
+import uuid
+
+DEFAULT_CACHE_DIR = Path(".cache/renders")
+DEFAULT_MAX_BYTES = 2 * 1024 ** 3
+
+_evict_lock = threading.Lock()
+
+def manim_version() -> str:
+    try:
+        return metadata.version("manim")
+    except metadata.PackageNotFoundError:
+        return "unknown"
+
+def render_cache_key(manim_script: str, class_name: str, flags: List[str]) -> str:
+    """Hash of everything that changes the rendered mp4"""
+    hasher = hashlib.sha256()
+    for part in (manim_script, class_name, " ".join(flags), manim_version()):
+        hasher.update(part.encode("utf-8"))
+        hasher.update(b"\0")
+    return hasher.hexdigest()
+
+def _link_or_copy(src: Path, dst: Path):
+    dst.parent.mkdir(parents=True, exist_ok=True)
+    tmp = dst.with_name(f".{dst.name}.{uuid.uuid4().hex}")
+    try:
+        os.link(src, tmp)
+    except OSError:
+        shutil.copy2(src, tmp)
+    os.replace(tmp, dst)
+
+class RenderCache:
+    """Local content addressed store of rendered segment videos with size based LRU eviction"""
+
+    def __init__(self, cache_dir: Path = DEFAULT_CACHE_DIR, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.cache_dir = Path(cache_dir)
+        self.max_bytes = max_bytes
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+
+    def _entry(self, key: str) -> Path:
+        return self.cache_dir / f"{key}.mp4"
+
+    def fetch(self, key: str, video_path: Path) -> bool:
+        entry = self._entry(key)
+        if not entry.exists():
+            return False
+
+        try:
+            _link_or_copy(entry, video_path)
+            # bump the mtime so eviction treats this entry as recently used
+            os.utime(entry)
+            return True
+        except OSError as e:
+            print(f"----Render cache read failed for {key[:12]}: {e}")
+            return False
+
+    def store(self, key: str, video_path: Path):
+        if not video_path.exists():
+            return
+
+        try:
+            _link_or_copy(video_path, self._entry(key))
+        except OSError as e:
+            print(f"----Render cache write failed for {key[:12]}: {e}")
+            return
+
+        self.evict()
+
+    def evict(self):
+        with _evict_lock:
+            entries = []
+            total = 0
+            for entry in self.cache_dir.glob("*.mp4"):
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, entry))
+                total += stat.st_size
+
+            if total <= self.max_bytes:
+                return
+
+            for _, size, entry in sorted(entries):
+                if total <= self.max_bytes:
+                    break
+                entry.unlink(missing_ok=True)
+                total -= size
+                print(f"----Evicted cached render {entry.name}")
+
+def get_render_cache(configurable: dict) -> Optional[RenderCache]:
+    if not configurable.get("render_cache", True):
+        return None
+
+    return RenderCache(
+        cache_dir=Path(configurable.get("render_cache_dir", DEFAULT_CACHE_DIR)),
+        max_bytes=configurable.get("render_cache_max_bytes", DEFAULT_MAX_BYTES)
+    )
@@ -0,0 +1,268 @@
+from langchain_chroma import Chroma
+from langchain_openai import OpenAIEmbeddings
+from langchain_core.documents import Document
+from typing import Dict, List, Optional, Tuple
+from .embedding_cache import EmbeddingCache, CachedEmbeddings
+from .context_packer import ContextChunk, similarity_to_score
+from .flat_index import FlatIndex, FLAT_INDEX_DIR
+from .bm25 import BM25Index, LEXICAL_INDEX_DIR, is_identifier_query
+from pathlib import Path
+import threading
+import os
+
+# collection name -> persist directory, as built by make_vector_db.py and docs_vector_db.py
+COLLECTIONS: Dict[str, str] = {
+    "manim_code": "./chroma_manim_db",
+    "docs": "./chroma_docs_db",
+}
+
+EMBEDDING_MODEL = "text-embedding-3-small"
+
+CHROMA = "chroma"
+FLAT = "flat"
+
+class RetrievalService:
+    """Owns the embedding client and the Chroma collections, shared by every node in the process
+
+    Handles are opened lazily on first use and then reused, so retrieval no longer re-opens
+    the sqlite stores and the HTTP client on every query. Query embeddings go through the
+    embedding cache, only misses reach the API.
+
+    With the `flat` backend, collections that have a flat index (see src/flat_index.py) are
+    searched in process over the memory-mapped matrix and Chroma is only a fallback.
+    With `hybrid`, BM25 indexes (see src/bm25.py) are searched alongside the dense results.
+    """
+
+    def __init__(self, collections: Optional[Dict[str, str]] = None, embedding_model: str = EMBEDDING_MODEL, embedding_cache: Optional[EmbeddingCache] = None, backend: str = CHROMA, flat_index_dir: Path = FLAT_INDEX_DIR, hybrid: bool = False, lexical_index_dir: Path = LEXICAL_INDEX_DIR):
+        if backend not in (CHROMA, FLAT):
+            raise ValueError(f"Unknown retrieval backend {backend!r}")
+
+        self.collections = collections or COLLECTIONS
+        self.embedding_model = embedding_model
+        self.embedding_cache = embedding_cache or EmbeddingCache()
+        self.backend = backend
+        self.flat_index_dir = Path(flat_index_dir)
+        self.hybrid = hybrid
+        self.lexical_index_dir = Path(lexical_index_dir)
+        self._lock = threading.Lock()
+        self._embeddings = None
+        self._stores: Dict[str, Chroma] = {}
+        self._flat: Dict[str, Optional[FlatIndex]] = {}
+        self._lexical: Dict[str, Optional[BM25Index]] = {}
+
+    @property
+    def embeddings(self) -> CachedEmbeddings:
+        with self._lock:
+            if self._embeddings is None:
+                self._embeddings = CachedEmbeddings(OpenAIEmbeddings(model=self.embedding_model), self.embedding_model, self.embedding_cache)
+            return self._embeddings
+
+    def store(self, collection: str) -> Optional[Chroma]:
+        """Open collection, None when its database has not been built"""
+        persist_directory = self.collections[collection]
+        embeddings = self.embeddings
+
+        with self._lock:
+            if collection not in self._stores:
+                if not os.path.exists(persist_directory):
+                    print(f"Warning: No database found at {persist_directory}")
+                    return None
+                self._stores[collection] = Chroma(
+                    collection_name=collection,
+                    embedding_function=embeddings,
+                    persist_directory=persist_directory
+                )
+            return self._stores[collection]
+
+    def flat_index(self, collection: str) -> Optional[FlatIndex]:
+        """Mapped flat index of a collection, None with the chroma backend or when it was not built"""
+        if self.backend != FLAT:
+            return None
+
+        with self._lock:
+            if collection not in self._flat:
+                index_dir = self.flat_index_dir / collection
+                self._flat[collection] = FlatIndex(index_dir) if FlatIndex.exists(index_dir) else None
+            return self._flat[collection]
+
+    def lexical_index(self, collection: str) -> Optional[BM25Index]:
+        """BM25 index of a collection, None unless hybrid retrieval is on and the index was built"""
+        if not self.hybrid:
+            return None
+
+        with self._lock:
+            if collection not in self._lexical:
+                index_dir = self.lexical_index_dir / collection
+                self._lexical[collection] = BM25Index.load(index_dir) if BM25Index.exists(index_dir) else None
+            return self._lexical[collection]
+
+    def get_documents(self, collection: str, ids: List[str]) -> List[Document]:
+        """Chunks by id, e.g. the ones the symbol index links to, without any embedding call"""
+        if not ids:
+            return []
+
+        store = self.store(collection)
+        if store is None:
+            return []
+
+        data = store._collection.get(ids=ids, include=["documents", "metadatas"])
+        by_id = {
+            chunk_id: Document(page_content=text, metadata=metadata or {})
+            for chunk_id, text, metadata in zip(data["ids"], data["documents"], data["metadatas"])
+        }
+        return [by_id[chunk_id] for chunk_id in ids if chunk_id in by_id]
+
+    def search(self, collection: str, query: str, k: int, lexical_query: Optional[str] = None) -> List[Tuple[Document, float]]:
+        """(document, distance) pairs, closest first"""
+        return self.search_many(collection, [query], k, [lexical_query] if lexical_query else None)[0]
+
+    def search_many(self, collection: str, queries: List[str], k: int, lexical_queries: Optional[List[str]] = None) -> List[List[Tuple[Document, float]]]:
+        """search() for a batch of queries, embedded in one request and looked up in one collection query
+
+        In hybrid mode identifier heavy queries are answered by BM25 alone without any network
+        call, the others fuse dense and BM25 rankings. `lexical_queries` replaces the queries on
+        the BM25 side, e.g. the symbol of an error whose full message is embedded.
+        """
+        if not queries:
+            return []
+
+        lexical = self.lexical_index(collection)
+        if lexical is None:
+            return self._dense_search_many(collection, queries, k)
+
+        lexical_queries = lexical_queries or queries
+        results: List[Optional[List[Tuple[Document, float]]]] = [None] * len(queries)
+        lexical_hits = [lexical.search(query, 2 * k) for query in lexical_queries]
+
+        dense_positions = []
+        for i, query in enumerate(lexical_queries):
+            if is_identifier_query(query) and lexical_hits[i]:
+                results[i] = _scores_to_distances(lexical_hits[i][:k])
+            else:
+                dense_positions.append(i)
+
+        if dense_positions:
+            dense = self._dense_search_many(collection, [queries[i] for i in dense_positions], 2 * k)
+            for i, dense_hits in zip(dense_positions, dense):
+                results[i] = _reciprocal_rank_fusion([dense_hits, lexical_hits[i]], k)
+
+        return results
+
+    def _dense_search_many(self, collection: str, queries: List[str], k: int) -> List[List[Tuple[Document, float]]]:
+        index = self.flat_index(collection)
+        if index is not None:
+            return index.search(self.embeddings.embed_documents(queries), k)
+
+        store = self.store(collection)
+        if store is None:
+            return [[] for _ in queries]
+
+        vectors = self.embeddings.embed_documents(queries)
+        response = store._collection.query(
+            query_embeddings=vectors,
+            n_results=k,
+            include=["documents", "metadatas", "distances"]
+        )
+
+        results = []
+        for documents, metadatas, distances in zip(response["documents"], response["metadatas"], response["distances"]):
+            results.append([
+                (Document(page_content=text, metadata=metadata or {}), distance)
+                for text, metadata, distance in zip(documents, metadatas, distances)
+            ])
+        return results
+
+def _scores_to_distances(scored: List[Tuple[Document, float]]) -> List[Tuple[Document, float]]:
+    """Turn relevance scores into distances so similarity_to_score gives score / best score"""
+    if not scored:
+        return []
+    best = max(score for _, score in scored) or 1.0
+    return [(doc, best / score - 1.0 if score > 0 else float("inf")) for doc, score in scored]
+
+def _reciprocal_rank_fusion(rankings: List[List[Tuple[Document, float]]], k: int, offset: int = 60) -> List[Tuple[Document, float]]:
+    scores: Dict[str, float] = {}
+    documents: Dict[str, Document] = {}
+    for ranking in rankings:
+        for rank, (doc, _) in enumerate(ranking, 1):
+            scores[doc.page_content] = scores.get(doc.page_content, 0.0) + 1.0 / (offset + rank)
+            documents.setdefault(doc.page_content, doc)
+
+    fused = sorted(scores.items(), key=lambda item: -item[1])[:k]
+    return _scores_to_distances([(documents[text], score) for text, score in fused])
+
+_service: Optional[RetrievalService] = None
+_service_lock = threading.Lock()
+
+def configure_retrieval_service(**kwargs) -> RetrievalService:
+    global _service
+    with _service_lock:
+        _service = RetrievalService(**kwargs)
+        return _service
+
+def get_retrieval_service() -> RetrievalService:
+    global _service
+    with _service_lock:
+        if _service is None:
+            _service = RetrievalService()
+        return _service
+
+def _code_chunks(results) -> List[ContextChunk]:
+    return [
+        ContextChunk(
+            slot="code_examples",
+            text=f"--- Example {i} (from {doc.metadata.get('file', 'unknown')}, similarity: {score:.2f}) ---\n```python\n{doc.page_content}\n```\n",
+            score=similarity_to_score(score)
+        )
+        for i, (doc, score) in enumerate(results, 1)
+    ]
+
+def _docs_chunks(results) -> List[ContextChunk]:
+    return [
+        ContextChunk(
+            slot="docs",
+            text=f"--- Example {i}, similarity: {score:.2f}) ---\n\n{doc.page_content}\n",
+            score=similarity_to_score(score)
+        )
+        for i, (doc, score) in enumerate(results, 1)
+    ]
+
+def query_manim_rag(query: str, k: int) -> List[ContextChunk]:
+    """3Blue1Brown code examples for the planner and the codegen worker"""
+    try:
+        results = get_retrieval_service().search("manim_code", query, k)
+
+        if not results:
+            print("no results found from rag")
+            return []
+
+        return _code_chunks(results)
+
+    except Exception as e:
+        print(f"Error with RAG query: {e}")
+        return []
+
+def query_docs_rag(query: str, k: int) -> List[ContextChunk]:
+    """Manim community docs for the codegen worker"""
+    try:
+        results = get_retrieval_service().search("docs", query, k)
+
+        if not results:
+            print("no results found from rag")
+            return []
+
+        return _docs_chunks(results)
+
+    except Exception as e:
+        print(f"Error with RAG query: {e}")
+        return []
+
+def query_rag_batch(collection: str, queries: List[str], k: int) -> Optional[List[List[ContextChunk]]]:
+    """Chunks for every query from one embedding request and one search, None if the batch failed"""
+    try:
+        results = get_retrieval_service().search_many(collection, queries, k)
+        to_chunks = _code_chunks if collection == "manim_code" else _docs_chunks
+        return [to_chunks(query_results) for query_results in results]
+
+    except Exception as e:
+        print(f"Error with batched RAG query on {collection}: {e}")
+        return None
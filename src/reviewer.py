@@ -1,37 +1,40 @@
 from langgraph.graph import StateGraph, START
 from langchain_core.prompts import ChatPromptTemplate
 from langgraph.types import Send
-from langchain_openai import ChatOpenAI, OpenAIEmbeddings
+from langchain_openai import ChatOpenAI
 from langchain_anthropic import ChatAnthropic
-from langchain_chroma import Chroma
-from typing import Tuple, List
-from .state import VideoState
+from typing import Tuple, List, Optional
+from .state import VideoState, VideoSegment, merge_segments_reducer
+from .tex_cache import TexCache, get_tex_cache
+from .tex_prewarm import tex_svg_names
+from .manim_server import run_manim, arun_manim
+from .static_check import check_manim_code, format_diagnostics
+from .autofix import apply_autofixes
+from .duration import analyze_duration, rescale_waits
+from .validation_memo import ValidationMemo, get_validation_memo
+from .error_parser import parse_error
+from .rate_limit import safe_llm_invoke, safe_llm_ainvoke
+from .model_tiers import ModelTierPolicy, get_tier_policy
+from .retrieval import get_retrieval_service
+from .symbol_index import get_symbol_index
+from .fix_store import FixStore, get_fix_store, normalize_signature, apply_replacements
+from .concurrency import get_semaphore
+from .prompt_cache import cacheable_system_message, report_prompt_cache
+from .context_packer import ContextChunk, DEFAULT_BUDGETS, pack_context, get_context_budget, similarity_to_score
 import subprocess, time
+import asyncio
 import tempfile
+import shutil
+import traceback
 import os
-import random
 import re
 import json
 from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
-def safe_llm_invoke(llm, messages, max_retries=5, base_delay=3):
-    for attempt in range(max_retries):
-        try:
-            return llm.invoke(messages)
-        except Exception as e:
-            if "rate limit" in str(e).lower() or "429" in str(e).lower() or "timeout" in str(e).lower():
-                delay = base_delay * (2 ** attempt) + random.uniform(0, 2)
-                print(f"Rate limit hit, attempt: {attempt+1}/{max_retries}, delaying for {delay:.2f} secs")
-                time.sleep(delay)
-            else:
-                raise e
-            
-    raise Exception("Too many rate limit retires, retying")
+TRANSIENT_VALIDATION_ERRORS = ("Code validation timed out", "Validation error:")
 
-def query_docs_rag(llm, logs: str, code: str, k: int) -> Tuple[str, str]:
-    if not logs:
-        return "No error logs, and docs as code is running successfully"
-    
+def summarize_error_with_llm(llm, logs: str, code: str) -> str:
     prompt = ChatPromptTemplate.from_messages([
             ("system", "You are an expert at analyzing Manim error logs and extracting key information."),
             ("human", """
@@ -72,136 +75,493 @@ Return ONLY the summary, no explanations.
         code=code
     )
 
-    try:
-        response = safe_llm_invoke(llm, messages)
-        summary = response.content.strip()
-
-        embeddings = OpenAIEmbeddings(model="text-embedding-3-small")
-        vector_store_path = "./chroma_docs_db"
+    response = safe_llm_invoke(llm, messages)
+    return response.content.strip()
 
-        vector_store = Chroma(
-            collection_name="docs",
-            embedding_function=embeddings,
-            persist_directory=vector_store_path
-        )
+def query_docs_rag(llm, logs: str, code: str, k: int, use_llm_summary: bool = False) -> Tuple[List[ContextChunk], str]:
+    if not logs:
+        return ([], "No errors")
 
-        docs = vector_store.similarity_search(summary, k=k)
+    try:
+        signature = parse_error(logs, code)
 
-        docs_content = ""
-        for i, doc in enumerate(docs, 1):
-            docs_content += f"--- Documentation {i} ---\n{doc.page_content}\n\n"
+        # the llm summary is only an opt in fallback for logs the parser can't make sense of
+        if use_llm_summary and llm is not None and not signature.found:
+            summary = summarize_error_with_llm(llm, logs, code)
+        else:
+            summary = signature.as_query()
+
+        print(f"----Error signature for docs search: {summary}")
+
+        # exact symbol lookup first, signatures are shorter and more precise than similar chunks
+        symbol_index = get_symbol_index() if signature.symbol else None
+        entries = symbol_index.lookup(signature.symbol) if symbol_index is not None else []
+        if entries:
+            linked = get_retrieval_service().get_documents("docs", symbol_index.chunk_ids(entries)[:k - 1])
+            docs = [ContextChunk(slot="docs", text=f"--- API reference for {signature.symbol} ---\n{symbol_index.snippet(entries)}\n", score=1.0)]
+            docs += [
+                ContextChunk(slot="docs", text=f"--- Documentation {i} ---\n{doc.page_content}\n", score=0.9 - 0.1 * i)
+                for i, doc in enumerate(linked, 1)
+            ]
+            print(f"----Found {signature.symbol} in the symbol index with {len(linked)} linked docs")
+            return (docs, summary)
+
+        # the symbol goes to the lexical side on its own, the message around it would hide it from the identifier check
+        results = get_retrieval_service().search("docs", summary, k, lexical_query=signature.symbol)
+
+        docs = [
+            ContextChunk(slot="docs", text=f"--- Documentation {i} ---\n{doc.page_content}\n", score=similarity_to_score(score))
+            for i, (doc, score) in enumerate(results, 1)
+        ]
 
         print(f"----Retirved {len(docs)} docs from the query")
-        return (docs_content, summary)
+        return (docs, summary)
     
     except Exception as e:
         print(f"Error while performing RAG in docs in reviewer: {e}")
-        return ("Documentation retrival failed", logs)
+        return ([], logs)
+
+
+
+# invariant instructions, kept byte-identical across calls so providers can cache them as a prompt prefix
+FIX_INSTRUCTIONS = """You are a expert in fixing manim code with bugs, Return ONLY the fixed manim python code
+
+Fix manim code given the execution logs which tell about the bugs and problems in the code:
+YOUR JOB IS TO SEE THE PROBLEMS IN THE CODE REFERING TO THE ANIMATION PROMPT AND JUST CHANGE THE PROBLEMATIC LINES OF CODE
+DO NOT TRY TO CHANGE THE ENTIRE CODE UNLESS NECESSARY. JUST CHANGE THE PROBLEMATIC LINES. RETURN THE ENTIRE CORRECTED CODE ONLY.
+
+You will be given the current code, an error summary, previous errors of this segment, the execution logs,
+relevant manim community docs and the context (animation prompt, required duration, scene class name).
+
+REQUIREMENTS:
+1. Fix the code based of the logs given. RETURN ONLY THE CORRECTED CODE, Refer to the documentation
+2. Explain the bug/issue and fix you made in a short comment below your corrected code. Do not return any other explainations or comments in the code, just simple code
+3. The Timing of the animation should match EXACTLY the required duration. Use self.wait() if needed.
+4. Do not change the animation scenes or colours unless neccessary
+5. The video rendered by the code should have no elements that overlap
+6. Use modules and functions that are part of the manim community library
+7. Make sure that the class name is the given scene class name and the class in inhertited from Scene or ThreeDScene Class only.
+8. Refer (if neccessary) to the comment about the previous issue/bug and the fix at the end of the code block if it exists.
+9. Check the previous errors and do not make the same mistakes again.
+10. The background colour should be pure black (#000000)
+11. Use ONLY valid Manim Community colors: BLUE, RED, GREEN, YELLOW, PURPLE_A, PURPLE_B, PURPLE_C, ORANGE, WHITE, PINK, GRAY
+   - NO: GOLD, TEAL, CYAN, MAGENTA, MAROON, PASTEL_*, VIVID_*, BRIGHT_*
 
+If logs are empty, return the EXACT code unchanged.
 
+DO NOT USE external resources and dependencies like svg's, images or other libraries (other than the one's already used in code)
+DO NOT CHANGE/MENTION MINOR THINGS like missing or wrong comments in code, CHANGE THE CODE that is crucial to the functioning of the code.
+"""
 
 class CodeReviewerAgent:
     """Reviews and fixes the manim code through iterative cycles"""
 
-    def __init__(self, llm: ChatAnthropic, llm2: ChatOpenAI, max_cycles: int =5): #yaha
+    def __init__(self, llm: ChatAnthropic, llm2: ChatOpenAI, max_cycles: int =5, tex_cache: Optional[TexCache] = None, use_manim_server: bool = True, memory_mb: Optional[int] = None, rescale_waits: bool = True, duration_tolerance: float = 0.5, memo: Optional[ValidationMemo] = None, llm_error_summary: bool = False, fix_store: Optional[FixStore] = None, tier_policy: Optional[ModelTierPolicy] = None, context_budget: int = DEFAULT_BUDGETS["fix"]): #yaha
         self.llm = llm
         self.llm2 = llm2
         self.max_cycles = max_cycles
+        self.tex_cache = tex_cache
+        self.use_manim_server = use_manim_server
+        self.memory_mb = memory_mb
+        self.rescale_waits = rescale_waits
+        self.duration_tolerance = duration_tolerance
+        self.memo = memo
+        self.llm_error_summary = llm_error_summary
+        self.fix_store = fix_store
+        self.tier_policy = tier_policy or ModelTierPolicy(strong=llm)
+        self.context_budget = context_budget
 
 
     def review_and_fix_code(self, code: str, segment_id: int, animation_prompt: str, duration: float) -> Tuple[str, bool]:
 
         current_code = code
         error_history = []
+        pending_fix = None
+        last_fix = None
 
         for cycle in range(self.max_cycles):
             print(f"----Code Review cycle {cycle + 1} for Segment {segment_id}")
 
-            success, logs = self._execute_code(current_code, segment_id)
+            success, logs = self.validate(current_code, segment_id)
+
+            if not success:
+                current_code, success, logs = self._autofix(current_code, logs, segment_id)
+
+            if last_fix is not None:
+                self.tier_policy.record(last_fix[0], last_fix[1], success)
+                last_fix = None
+
+            signature = None if success else parse_error(logs, current_code)
+            signature_key = normalize_signature(signature) if signature else None
+
+            # the last llm fix made its error go away, remember it for future runs
+            if pending_fix is not None and pending_fix[0] != signature_key and self.fix_store is not None:
+                self.fix_store.record(pending_fix[0], pending_fix[1], current_code)
+            pending_fix = None
+
+            known_fix = None
+            if not success and signature_key and self.fix_store is not None:
+                current_code, success, logs, known_fix = self._apply_known_fix(current_code, logs, segment_id, signature_key)
             
             if success:
-                docs_content = "Code validated successfully - no documentation needed"
+                docs = []
                 error_summary = "No errors"
             else:
-                docs_content, error_summary = query_docs_rag(
+                # a couple of extra docs, the packer drops what does not fit the fix budget
+                docs, error_summary = query_docs_rag(
                     llm=self.llm2, 
                     logs=logs, 
                     code=current_code, 
-                    k=3
+                    k=5,
+                    use_llm_summary=self.llm_error_summary
                 )
                 error_history.append({
                     "cycle": cycle+1,
                     "error": error_summary,
                     "code": current_code
                 })
+
+                if known_fix is not None:
+                    docs.insert(0, ContextChunk(slot="docs", text=f"--- Known fix for this error from previous runs ---\n{known_fix['diff']}\n", required=True))
                        
 
             if success:
+                current_code = self._sync_duration(current_code, segment_id, duration)
                 print(f"----Segment {segment_id} ready to run")
                 return (current_code, True)
             
+            code_before_fix = current_code
+            tier, llm = self.tier_policy.select(cycle, signature.exc_type if signature else None)
+            print(f"----Generating fix for segment {segment_id} with the {tier} model")
+
+            started = time.monotonic()
             current_code = self._generate_fix(
+                llm,
                 current_code, 
                 logs, 
                 animation_prompt, 
                 duration, 
                 segment_id,
                 error_summary,
-                docs_content,
+                docs,
                 error_history
             )
+            last_fix = (tier, time.monotonic() - started)
+
+            if signature_key:
+                pending_fix = (signature_key, code_before_fix)
 
         print(f"----Segment {segment_id} failed after {self.max_cycles} cycles")
         return (current_code, False)
     
-    def _execute_code(self, code: str, segment_id: int) -> Tuple[bool, str]:
-        """Execute Manim code and capture errors"""
+    async def areview_and_fix_code(self, code: str, segment_id: int, animation_prompt: str, duration: float) -> Tuple[str, bool]:
+        """Async twin of review_and_fix_code, llm calls and dry runs are awaited instead of holding a thread"""
 
-        try:
-            with tempfile.NamedTemporaryFile(mode="w", suffix=".py", delete=False) as f:
-                f.write(code)
-                temp_file = f.name
-
-            syntax_check = subprocess.run(
-                ["python", "-m", "py_compile", temp_file],
-                capture_output=True,
-                text=True,
-                timeout=30
-            )
+        current_code = code
+        error_history = []
+        pending_fix = None
+        last_fix = None
 
-            if syntax_check.returncode != 0:
-                os.unlink(temp_file)
-                return (False, f"Python syntax error: {syntax_check.stderr}")
-            
+        for cycle in range(self.max_cycles):
+            print(f"----Code Review cycle {cycle + 1} for Segment {segment_id}")
+
+            success, logs = await self.avalidate(current_code, segment_id)
+
+            if not success:
+                current_code, success, logs = await self._aautofix(current_code, logs, segment_id)
 
-            scene_pattern = r'class\s+(\w+)\s*\(\s*(?:Scene|ThreeDScene)\s*\)'
-            scene_names = re.findall(scene_pattern, code)
+            if last_fix is not None:
+                self.tier_policy.record(last_fix[0], last_fix[1], success)
+                last_fix = None
 
-            if not scene_names:
-                os.unlink(temp_file)
-                return (False, "No valid class found, must inherit from Scene or ThreeDScene")
+            signature = None if success else parse_error(logs, current_code)
+            signature_key = normalize_signature(signature) if signature else None
+
+            # the last llm fix made its error go away, remember it for future runs
+            if pending_fix is not None and pending_fix[0] != signature_key and self.fix_store is not None:
+                self.fix_store.record(pending_fix[0], pending_fix[1], current_code)
+            pending_fix = None
+
+            known_fix = None
+            if not success and signature_key and self.fix_store is not None:
+                current_code, success, logs, known_fix = await self._aapply_known_fix(current_code, logs, segment_id, signature_key)
             
-            logs = "ERROR in scene validation: \n\n"
-            success = True
-
-            for scene in scene_names:
-                command = [
-                    "manim",
-                    "-ql",
-                    "--dry_run",
-                    temp_file,
-                    scene
-                ]
-
-                process = subprocess.run(
-                    command,
-                    capture_output=True,
-                    text=True,
-                    timeout=60,
-                    env=os.environ.copy()
+            if success:
+                docs = []
+                error_summary = "No errors"
+            else:
+                # a couple of extra docs, the packer drops what does not fit the fix budget
+                # the lookup is local sqlite and at most one embedding request, a short thread hop
+                docs, error_summary = await asyncio.to_thread(
+                    query_docs_rag,
+                    self.llm2,
+                    logs,
+                    current_code,
+                    5,
+                    self.llm_error_summary
                 )
+                error_history.append({
+                    "cycle": cycle+1,
+                    "error": error_summary,
+                    "code": current_code
+                })
+
+                if known_fix is not None:
+                    docs.insert(0, ContextChunk(slot="docs", text=f"--- Known fix for this error from previous runs ---\n{known_fix['diff']}\n", required=True))
+                       
+
+            if success:
+                current_code = await self._async_duration(current_code, segment_id, duration)
+                print(f"----Segment {segment_id} ready to run")
+                return (current_code, True)
+            
+            code_before_fix = current_code
+            tier, llm = self.tier_policy.select(cycle, signature.exc_type if signature else None)
+            print(f"----Generating fix for segment {segment_id} with the {tier} model")
+
+            started = time.monotonic()
+            current_code = await self._agenerate_fix(
+                llm,
+                current_code, 
+                logs, 
+                animation_prompt, 
+                duration, 
+                segment_id,
+                error_summary,
+                docs,
+                error_history
+            )
+            last_fix = (tier, time.monotonic() - started)
+
+            if signature_key:
+                pending_fix = (signature_key, code_before_fix)
+
+        print(f"----Segment {segment_id} failed after {self.max_cycles} cycles")
+        return (current_code, False)
+    
+    def _apply_known_fix(self, code: str, logs: str, segment_id: int, signature_key: str) -> Tuple[str, bool, str, Optional[dict]]:
+        """Replay the best stored fix for this error, returns the fix so the llm can see it when replay fails"""
+
+        known_fix = self.fix_store.lookup(signature_key)
+        if known_fix is None:
+            return (code, False, logs, None)
+
+        replayed = apply_replacements(code, known_fix["replacements"])
+        if replayed is None:
+            print(f"----Known fix for {signature_key} does not apply to segment {segment_id}, passing it to the llm")
+            return (code, False, logs, known_fix)
+
+        success, new_logs = self.validate(replayed, segment_id)
+        self.fix_store.mark_applied(known_fix["id"], success)
+
+        if success:
+            print(f"----Applied known fix for {signature_key} to segment {segment_id}")
+            return (replayed, True, new_logs, None)
+
+        return (code, False, logs, known_fix)
+
+    def _sync_duration(self, code: str, segment_id: int, duration: float) -> str:
+        """Check the static scene runtime against the audio and rescale the waits if they drift apart"""
+
+        rescaled = self._rescale_candidate(code, segment_id, duration)
+        if rescaled is None:
+            return code
+
+        success, _ = self.validate(rescaled, segment_id)
+        return self._accept_rescaled(code, rescaled, segment_id, duration, success)
+
+    def _autofix(self, code: str, logs: str, segment_id: int, max_passes: int = 3) -> Tuple[str, bool, str]:
+        """Try the deterministic rewrite rules before spending an llm call, re-validating after each pass"""
+
+        success = False
+        for _ in range(max_passes):
+            fixed_code, applied = apply_autofixes(code, logs, segment_id)
+            if not applied:
+                break
+
+            print(f"----Applied auto fixes {', '.join(applied)} to segment {segment_id}, re-validating")
+            code = fixed_code
+            success, logs = self.validate(code, segment_id)
+            if success:
+                break
+
+        return (code, success, logs)
+
+    async def _aautofix(self, code: str, logs: str, segment_id: int, max_passes: int = 3) -> Tuple[str, bool, str]:
+        success = False
+        for _ in range(max_passes):
+            fixed_code, applied = apply_autofixes(code, logs, segment_id)
+            if not applied:
+                break
+
+            print(f"----Applied auto fixes {', '.join(applied)} to segment {segment_id}, re-validating")
+            code = fixed_code
+            success, logs = await self.avalidate(code, segment_id)
+            if success:
+                break
+
+        return (code, success, logs)
+
+    async def _aapply_known_fix(self, code: str, logs: str, segment_id: int, signature_key: str) -> Tuple[str, bool, str, Optional[dict]]:
+        known_fix = self.fix_store.lookup(signature_key)
+        if known_fix is None:
+            return (code, False, logs, None)
+
+        replayed = apply_replacements(code, known_fix["replacements"])
+        if replayed is None:
+            print(f"----Known fix for {signature_key} does not apply to segment {segment_id}, passing it to the llm")
+            return (code, False, logs, known_fix)
+
+        success, new_logs = await self.avalidate(replayed, segment_id)
+        self.fix_store.mark_applied(known_fix["id"], success)
+
+        if success:
+            print(f"----Applied known fix for {signature_key} to segment {segment_id}")
+            return (replayed, True, new_logs, None)
+
+        return (code, False, logs, known_fix)
+
+    def _rescale_candidate(self, code: str, segment_id: int, duration: float) -> Optional[str]:
+        """Wait rescaled version of the code when the estimate drifts from the audio, None to keep the code"""
 
-                scene_log = f"""
+        report = analyze_duration(code, segment_id, duration)
+        if report is None or duration <= 0:
+            return None
+
+        approx = " (approximate)" if report.approximate else ""
+        print(f"----Segment {segment_id} estimated runtime {report.total:.2f}s{approx}, audio {duration:.2f}s, delta {report.delta:+.2f}s")
+
+        if abs(report.delta) <= self.duration_tolerance or not self.rescale_waits:
+            return None
+
+        if report.approximate:
+            print(f"----Segment {segment_id} runtime estimate is approximate, keeping original timing")
+            return None
+
+        rescaled = rescale_waits(code, segment_id, duration)
+        if not rescaled or rescaled == code:
+            return None
+        return rescaled
+
+    def _accept_rescaled(self, code: str, rescaled: str, segment_id: int, duration: float, success: bool) -> str:
+        if not success:
+            print(f"----Rescaled waits broke segment {segment_id}, keeping original timing")
+            return code
+
+        new_report = analyze_duration(rescaled, segment_id, duration)
+        print(f"----Rescaled waits in segment {segment_id}, new estimated runtime {new_report.total:.2f}s")
+        return rescaled
+
+    async def _async_duration(self, code: str, segment_id: int, duration: float) -> str:
+        """Async twin of _sync_duration"""
+        rescaled = self._rescale_candidate(code, segment_id, duration)
+        if rescaled is None:
+            return code
+
+        success, _ = await self.avalidate(rescaled, segment_id)
+        return self._accept_rescaled(code, rescaled, segment_id, duration, success)
+
+    def _checked_or_memoized(self, code: str, segment_id: int) -> Optional[Tuple[bool, str]]:
+        """Validation result without a dry run, from the static checks or the memo, None when manim has to run"""
+
+        diagnostics = check_manim_code(code, segment_id)
+        if diagnostics:
+            print(f"----Static check found {len(diagnostics)} problems in segment {segment_id}, skipping dry run")
+            return (False, format_diagnostics(diagnostics))
+
+        if self.memo is not None:
+            memoized = self.memo.get(code, segment_id)
+            if memoized is not None:
+                print(f"----Segment {segment_id} script already validated, reusing {'pass' if memoized[0] else 'failure'} from memo")
+                return memoized
+
+        return None
+
+    def _remember(self, code: str, segment_id: int, success: bool, logs: str):
+        # timeouts and crashes of the validator itself say nothing about the script,
+        # the memo also skips failures it can't attribute to the code (see failure_kind)
+        if self.memo is not None and not logs.startswith(TRANSIENT_VALIDATION_ERRORS):
+            self.memo.put(code, segment_id, success, logs)
+
+    def validate(self, code: str, segment_id: int) -> Tuple[bool, str]:
+        """Static checks first, only code that passes them is dry run through manim"""
+
+        result = self._checked_or_memoized(code, segment_id)
+        if result is not None:
+            return result
+
+        success, logs = self._execute_code(code, segment_id)
+        self._remember(code, segment_id, success, logs)
+        return (success, logs)
+
+    async def avalidate(self, code: str, segment_id: int) -> Tuple[bool, str]:
+        result = self._checked_or_memoized(code, segment_id)
+        if result is not None:
+            return result
+
+        success, logs = await self._aexecute_code(code, segment_id)
+        self._remember(code, segment_id, success, logs)
+        return (success, logs)
+
+    def _prepare_dry_run(self, code: str) -> Tuple[Optional[Tuple[bool, str]], Optional[dict]]:
+        """Syntax and scene checks, then the temp script and media dir for the dry run
+
+        Returns (result, None) when the code fails before manim is needed, else (None, job).
+        """
+        with tempfile.NamedTemporaryFile(mode="w", suffix=".py", delete=False) as f:
+            f.write(code)
+            temp_file = f.name
+
+        # compiling in process is enough for a syntax check, no need for a py_compile subprocess
+        try:
+            compile(code, temp_file, "exec")
+        except (SyntaxError, ValueError) as e:
+            os.unlink(temp_file)
+            return ((False, f"Python syntax error: {''.join(traceback.format_exception_only(e))}"), None)
+
+        scene_pattern = r'class\s+(\w+)\s*\(\s*(?:Scene|ThreeDScene)\s*\)'
+        scene_names = re.findall(scene_pattern, code)
+
+        if not scene_names:
+            os.unlink(temp_file)
+            return ((False, "No valid class found, must inherit from Scene or ThreeDScene"), None)
+
+        job = {"temp_file": temp_file, "scenes": scene_names, "media_dir": None}
+        try:
+            job["media_dir"] = tempfile.mkdtemp(prefix="manim_dry_run_")
+            if self.tex_cache is not None:
+                self.tex_cache.seed(job["media_dir"], tex_svg_names(code))
+        except Exception:
+            self._cleanup_dry_run(job)
+            raise
+        return (None, job)
+
+    @staticmethod
+    def _dry_run_args(job: dict, scene: str) -> List[str]:
+        return [
+            "-ql",
+            "--dry_run",
+            "--media_dir", job["media_dir"],
+            job["temp_file"],
+            scene
+        ]
+
+    @staticmethod
+    def _cleanup_dry_run(job: Optional[dict]):
+        if job is None:
+            return
+        if os.path.exists(job["temp_file"]):
+            os.unlink(job["temp_file"])
+        if job["media_dir"]:
+            shutil.rmtree(job["media_dir"], ignore_errors=True)
+
+    def _finish_dry_run(self, job: dict, results: list) -> Tuple[bool, str]:
+        """Collect the (scene, ManimResult) pairs into the validation logs and clean up"""
+        logs = "ERROR in scene validation: \n\n"
+        success = True
+
+        for scene, process in results:
+            scene_log = f"""
                 SCENE: {scene}
                 --------------------
                 STDOUT:
@@ -212,52 +572,92 @@ class CodeReviewerAgent:
                 --------------------
                 """
 
-                logs += scene_log
+            logs += scene_log
 
-                if process.returncode != 0:
-                    success = False
-                    logs += f"\n\nERROR: Scene {scene} validation failed with exit code {process.returncode}\n"
+            if process.returncode != 0:
+                success = False
+                logs += f"\n\nERROR: Scene {scene} validation failed with exit code {process.returncode}\n"
 
-            os.unlink(temp_file)
+        if success and self.tex_cache is not None:
+            self.tex_cache.publish(job["media_dir"])
+        self._cleanup_dry_run(job)
+
+        if success:
+            return (True, "Success, All scenes are validated successfully")
+        return (False, logs)
+
+    def _execute_code(self, code: str, segment_id: int) -> Tuple[bool, str]:
+        """Execute Manim code and capture errors"""
+
+        job = None
+        try:
+            early, job = self._prepare_dry_run(code)
+            if early is not None:
+                return early
+
+            results = [
+                (scene, run_manim(self._dry_run_args(job, scene), timeout=60, memory_mb=self.memory_mb, use_server=self.use_manim_server))
+                for scene in job["scenes"]
+            ]
+            return self._finish_dry_run(job, results)
 
-            if success:
-                return (True, "Success, All scenes are validated successfully")
-            else:
-                return (False, logs)
-                
-                
         except subprocess.TimeoutExpired:
-            if os.path.exists(temp_file):
-                os.unlink(temp_file)
+            self._cleanup_dry_run(job)
             print("Timeout error in _execute_code")
             return (False, "Code validation timed out (timeout error)")
         except Exception as e:
-            if os.path.exists(temp_file):
-                os.unlink(temp_file)
+            self._cleanup_dry_run(job)
             print(f"Error in _execute_code: {e}")
             return (False, f"Validation error: {e}")
-        
-    def _generate_fix(self, code: str, logs: str, animation_prompt: str, duration: float, segment_id: int, error_summary: str, docs_content: str, error_history: List[dict]) -> str:
 
-        history_text = ""
-        if error_history:
-            history_text = "\n---PREVIOUS ERRORS IN THIS SEGMENT START---\n\n"
-            for entry in error_history[-5:]:
-                history_text += f"CYCLE {entry["cycle"]}: {entry["error"]}\n"
-            history_text += "\n---END OF PREVIOUS ERRORS ---\n"
+    async def _aexecute_code(self, code: str, segment_id: int) -> Tuple[bool, str]:
+        """Async twin of _execute_code, dry runs are awaited through arun_manim instead of blocking a thread"""
+
+        job = None
+        try:
+            early, job = self._prepare_dry_run(code)
+            if early is not None:
+                return early
+
+            results = []
+            for scene in job["scenes"]:
+                results.append((scene, await arun_manim(self._dry_run_args(job, scene), timeout=60, memory_mb=self.memory_mb, use_server=self.use_manim_server)))
+            return self._finish_dry_run(job, results)
+
+        except subprocess.TimeoutExpired:
+            self._cleanup_dry_run(job)
+            print("Timeout error in _aexecute_code")
+            return (False, "Code validation timed out (timeout error)")
+        except Exception as e:
+            self._cleanup_dry_run(job)
+            print(f"Error in _aexecute_code: {e}")
+            return (False, f"Validation error: {e}")
+
+    def _fix_messages(self, llm, code: str, logs: str, animation_prompt: str, duration: float, segment_id: int, error_summary: str, docs: List[ContextChunk], error_history: List[dict]) -> list:
 
         if len(logs) > 1000:
             truncated_logs = logs[:500] + "\n\n... (middle section truncated) ...\n\n" + logs[-500:]
         else:
             truncated_logs = logs
 
+        # code and logs always go in, recent errors and the closest docs share what is left of the budget
+        chunks = [
+            ContextChunk(slot="code", text=code, required=True),
+            ContextChunk(slot="logs", text=truncated_logs, required=True),
+        ]
+        recent = error_history[-5:]
+        for age, entry in enumerate(reversed(recent)):
+            chunks.append(ContextChunk(slot="history", text=f"CYCLE {entry["cycle"]}: {entry["error"]}", score=1.0 - 0.1 * age))
+        chunks.extend(docs)
+
+        context = pack_context(chunks, self.context_budget, f"Segment {segment_id} fix")
+
+        history_text = ""
+        if context.get("history"):
+            history_text = f"\n---PREVIOUS ERRORS IN THIS SEGMENT START---\n\n{context['history']}\n\n---END OF PREVIOUS ERRORS ---\n"
 
-        prompt = ChatPromptTemplate.from_messages([("system", "You are a expert in fixing manim code with bugs, Return ONLY the fixed manim python code"),
-                ("human", """
-Fix manim code given the execution logs which tell about the bugs and problems in the code:
-YOUR JOB IS TO SEE THE PROBLEMS IN THE CODE REFERING TO THE PROMPT BELOW AND JUST CHANGE THE PROBLEMATIC LINES OF CODE
-DO NOT TRY TO CHANGE THE ENTIRE CODE UNLESS NECESSARY. JUST CHANGE THE PROBLEMATIC LINES. RETURN THE ENTIRE CORRECTED CODE ONLY.
 
+        prompt = ChatPromptTemplate.from_messages([("human", """
 CURRENT CODE:
 ```python
 {code}
@@ -284,42 +684,23 @@ DOCUMENTATION END-----------------
 CONTEXT:
 - animation prompt: {animation_prompt}
 - Required duration: {duration} seconds
-- Segment ID: {segment_id}
-
-REQUIREMENTS:
-1. Fix the code based of the logs given above. RETURN ONLY THE CORRECTED CODE, Refer to the documentation
-2. Explain the bug/issue and fix you made in a short comment below your corrected code. Do not return any other explainations or comments in the code, just simple code
-3. The Timing of the animation should match EXACTLY {duration} seconds. Use self.wait() if needed.
-4. Do not change the animation scenes or colours unless neccessary
-5. The video rendered by the code should have no elements that overlap
-6. Use modules and functions that are part of the manim community library
-7. Make sure that Class name is Segment{segment_id} and the class in inhertited from Scene or ThreeDScene Class only.
-8. Refer (if neccessary) to the comment about the previous issue/bug and the fix at the end of the code block if it exists.
-9. Check the previous errors and do not make the same mistakes again.
-10. The background colour should be pure black (#000000)
-11. Use ONLY valid Manim Community colors: BLUE, RED, GREEN, YELLOW, PURPLE_A, PURPLE_B, PURPLE_C, ORANGE, WHITE, PINK, GRAY
-   - NO: GOLD, TEAL, CYAN, MAGENTA, MAROON, PASTEL_*, VIVID_*, BRIGHT_*
-
-If logs are empty, return the EXACT code unchanged.
-
-DO NOT USE external resources and dependencies like svg's, images or other libraries (other than the one's already used in code)
-DO NOT CHANGE/MENTION MINOR THINGS like missing or wrong comments in code, CHANGE THE CODE that is crucial to the functioning of the code.
-
+- Scene class name: Segment{segment_id}
 """)])
         
-        messages = prompt.format_messages(
+        messages = [cacheable_system_message(llm, FIX_INSTRUCTIONS, "Fix"), *prompt.format_messages(
         code=code,
         error_summary=error_summary,
         previous_errors= history_text,  
         logs=truncated_logs,  
-        docs=docs_content,  
+        docs=context.get("docs") or "No documentation found",  
         animation_prompt=animation_prompt,
         duration=duration,
         segment_id=segment_id
-    )
-
-        response = safe_llm_invoke(self.llm, messages)
+    )]
+        return messages
 
+    @staticmethod
+    def _extract_fix(response) -> str:
         manim_code = response.content
         if "```python" in manim_code:
             manim_code = manim_code.split("```python")[1].split("```")[0].strip()
@@ -329,26 +710,93 @@ DO NOT CHANGE/MENTION MINOR THINGS like missing or wrong comments in code, CHANG
             return manim_code
         
         return manim_code.strip()
+
+    def _generate_fix(self, llm, code: str, logs: str, animation_prompt: str, duration: float, segment_id: int, error_summary: str, docs: List[ContextChunk], error_history: List[dict]) -> str:
+        messages = self._fix_messages(llm, code, logs, animation_prompt, duration, segment_id, error_summary, docs, error_history)
+        response = safe_llm_invoke(llm, messages)
+        report_prompt_cache(response, f"Segment {segment_id} fix")
+        return self._extract_fix(response)
+
+    async def _agenerate_fix(self, llm, code: str, logs: str, animation_prompt: str, duration: float, segment_id: int, error_summary: str, docs: List[ContextChunk], error_history: List[dict]) -> str:
+        messages = self._fix_messages(llm, code, logs, animation_prompt, duration, segment_id, error_summary, docs, error_history)
+        response = await safe_llm_ainvoke(llm, messages)
+        report_prompt_cache(response, f"Segment {segment_id} fix")
+        return self._extract_fix(response)
     
+def create_code_reviewer(configurable: dict) -> CodeReviewerAgent:
+    return CodeReviewerAgent(
+        llm=configurable.get("review_llm"),
+        llm2=configurable.get("summary_llm"),
+        max_cycles=5,
+        tex_cache=get_tex_cache(configurable),
+        use_manim_server=configurable.get("manim_server", True),
+        memory_mb=configurable.get("manim_memory_mb"),
+        rescale_waits=configurable.get("rescale_waits", True),
+        duration_tolerance=configurable.get("duration_tolerance", 0.5),
+        memo=get_validation_memo(configurable),
+        llm_error_summary=configurable.get("llm_error_summary", False),
+        fix_store=get_fix_store(configurable),
+        tier_policy=get_tier_policy(configurable, "review"),
+        context_budget=get_context_budget(configurable, "fix")
+    )
+
+def review_segment(reviewer: CodeReviewerAgent, segment: VideoSegment) -> Tuple[VideoSegment, bool]:
+    print(f"----Reviewing code for segment {segment.segment_id}")
+
+    fixed_code, success = reviewer.review_and_fix_code(
+        code=segment.manim_script,
+        segment_id=segment.segment_id,
+        animation_prompt=segment.animation_prompt,
+        duration=segment.audio_duration_sec
+    )
+
+    segment.manim_script = fixed_code
+    return (segment, success)
+
+async def areview_segment(reviewer: CodeReviewerAgent, segment: VideoSegment) -> Tuple[VideoSegment, bool]:
+    print(f"----Reviewing code for segment {segment.segment_id}")
+
+    fixed_code, success = await reviewer.areview_and_fix_code(
+        code=segment.manim_script,
+        segment_id=segment.segment_id,
+        animation_prompt=segment.animation_prompt,
+        duration=segment.audio_duration_sec
+    )
+
+    segment.manim_script = fixed_code
+    return (segment, success)
+
+def _report_review_stats(reviewer: CodeReviewerAgent, configurable: dict):
+    get_tier_policy(configurable, "manim").report("Codegen")
+    reviewer.tier_policy.report("Reviewer")
+
+    if reviewer.fix_store is not None:
+        stats = reviewer.fix_store.stats()
+        print(f"----Fix store: {stats.get('hits', 0)}/{stats.get('lookups', 0)} lookups hit (rate {stats['hit_rate']}), {stats.get('applied_success', 0)} fixes replayed successfully")
+
 def code_reviewer_node(state: VideoState, config) -> dict:
 
-    reviewer = CodeReviewerAgent(llm=config["configurable"]["review_llm"],llm2= config["configurable"]["summary_llm"],max_cycles=5) 
+    reviewer = create_code_reviewer(config["configurable"])
 
-    updated_segments = []
-    segments_needing_regen = []
+    segments_to_review = [segment for segment in state.segments if segment.manim_script]
+    max_workers = max(1, min(config["configurable"].get("review_concurrency", 4), len(segments_to_review) or 1))
 
-    for segment in state.segments:
-        if segment.manim_script:
-            print(f"----Reviewing code for segment {segment.segment_id}")
+    print(f"----Reviewing {len(segments_to_review)} segments with up to {max_workers} in parallel")
 
-            fixed_code, success = reviewer.review_and_fix_code(
-                code=segment.manim_script,
-                segment_id=segment.segment_id,
-                animation_prompt=segment.animation_prompt,
-                duration=segment.audio_duration_sec
-            )
+    updated_segments = [segment for segment in state.segments if not segment.manim_script]
+    segments_needing_regen = []
+
+    # review time is llm and dry run latency, so threads are enough to overlap the segments
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {executor.submit(review_segment, reviewer, segment): segment for segment in segments_to_review}
 
-            segment.manim_script = fixed_code
+        for future in as_completed(futures):
+            segment = futures[future]
+            try:
+                segment, success = future.result()
+            except Exception as e:
+                print(f"----Error reviewing segment {segment.segment_id}: {e}")
+                success = False
 
             if not success:
                 print(f"----Segment {segment.segment_id} failed in reviewer, sending for regen")
@@ -356,7 +804,46 @@ def code_reviewer_node(state: VideoState, config) -> dict:
             else:
                 print(f"----Segment {segment.segment_id} validation successful")
 
-        updated_segments.append(segment)
+            updated_segments = merge_segments_reducer(updated_segments, [segment])
+
+    _report_review_stats(reviewer, config["configurable"])
+
+    return {
+        "segments": updated_segments,
+        "segments_needing_regeneration": segments_needing_regen
+    }
+
+async def acode_reviewer_node(state: VideoState, config) -> dict:
+    """Async reviewer node, review loops run on the event loop bounded by the "review" semaphore"""
+
+    configurable = config["configurable"]
+    reviewer = create_code_reviewer(configurable)
+    semaphore = get_semaphore(configurable, "review")
+
+    segments_to_review = [segment for segment in state.segments if segment.manim_script]
+    print(f"----Reviewing {len(segments_to_review)} segments")
+
+    async def review(segment):
+        async with semaphore:
+            try:
+                return await areview_segment(reviewer, segment)
+            except Exception as e:
+                print(f"----Error reviewing segment {segment.segment_id}: {e}")
+                return (segment, False)
+
+    updated_segments = [segment for segment in state.segments if not segment.manim_script]
+    segments_needing_regen = []
+
+    for segment, success in await asyncio.gather(*(review(segment) for segment in segments_to_review)):
+        if not success:
+            print(f"----Segment {segment.segment_id} failed in reviewer, sending for regen")
+            segments_needing_regen.append(segment)
+        else:
+            print(f"----Segment {segment.segment_id} validation successful")
+
+        updated_segments = merge_segments_reducer(updated_segments, [segment])
+
+    _report_review_stats(reviewer, configurable)
 
     return {
         "segments": updated_segments,
@@ -371,6 +858,6 @@ def route_after_review(state: VideoState):
         print(f"----Sending {len(segments_needing_regen)} segments back to regeneration")
         return "manim_generation"
     else:
-        print("----All segments validated successfully, proceeding to renderer")
-        return "manim_renderer"
+        print("----All segments validated successfully, proceeding to TeX prewarm and renderer")
+        return "tex_prewarm"
 
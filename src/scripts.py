@@ -3,12 +3,11 @@ from langchain_core.messages import HumanMessage
 from .state import VideoState, ScriptOutput, VideoSegment
 from langchain_core.runnables.config import RunnableConfig
 from langchain_core.prompts import ChatPromptTemplate
+from .rate_limit import safe_llm_invoke, safe_llm_ainvoke, llm_key
+from .concurrency import get_semaphore
 
 
-def scriptwriter_agent(state: VideoState, config: RunnableConfig) -> VideoState:
-    print("Running scriptwriter\n")
-
-    llm = config["configurable"]["script_llm"]
+def _script_messages(topic: str):
 
     prompt = ChatPromptTemplate.from_messages([
     ("system", "You are a expert at creating scripts for science and maths educational videos."),
@@ -35,35 +34,58 @@ def scriptwriter_agent(state: VideoState, config: RunnableConfig) -> VideoState:
     Make it engaging and educational
     """)])
 
-    messages = prompt.format_messages(topic = state.topic)
+    return prompt.format_messages(topic = topic)
+
+def _apply_script(state: VideoState, response: ScriptOutput) -> VideoState:
+
+    state.full_script = response.full_script
+    print(response.full_script)
+    state.segments = []
+
+    for seg in response.segments:
+        segment = VideoSegment(
+            segment_id=seg.segment_id,
+            text=seg.script,
+            planned_duration=seg.duration_sec,
+            audio_path="",
+            audio_duration_sec=0.0,
+            animation_prompt="",
+            video_path="",
+            manim_script=""
+        )
+        state.segments.append(segment)
+
+    return state
+
+def scriptwriter_agent(state: VideoState, config: RunnableConfig) -> VideoState:
+    print("Running scriptwriter\n")
+
+    llm = config["configurable"]["script_llm"]
+
+    messages = _script_messages(state.topic)
     structured_llm = llm.with_structured_output(ScriptOutput)
 
     try:
-        response = structured_llm.invoke(messages)
-
-        state.full_script = response.full_script
-        print(response.full_script)
-        state.segments = []
-
-        for seg in response.segments:
-            segment = VideoSegment(
-                segment_id=seg.segment_id,
-                text=seg.script,
-                planned_duration=seg.duration_sec,
-                audio_path="",
-                audio_duration_sec=0.0,
-                animation_prompt="",
-                video_path="",
-                manim_script=""
-            )
-            state.segments.append(segment)
-
-        return state
+        response = safe_llm_invoke(structured_llm, messages, key=llm_key(llm), schema=ScriptOutput)
+        return _apply_script(state, response)
     except Exception as e:
         state.error = f"ScriptWriter error: {e}"
         print(f"Error in scriptwriter: {e}\n")
         return state
-    
 
+async def ascriptwriter_agent(state: VideoState, config: RunnableConfig) -> VideoState:
+    print("Running scriptwriter\n")
 
-    
\ No newline at end of file
+    llm = config["configurable"]["script_llm"]
+
+    messages = _script_messages(state.topic)
+    structured_llm = llm.with_structured_output(ScriptOutput)
+
+    try:
+        async with get_semaphore(config["configurable"], "llm"):
+            response = await safe_llm_ainvoke(structured_llm, messages, key=llm_key(llm), schema=ScriptOutput)
+        return _apply_script(state, response)
+    except Exception as e:
+        state.error = f"ScriptWriter error: {e}"
+        print(f"Error in scriptwriter: {e}\n")
+        return state
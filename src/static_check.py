@@ -0,0 +1,175 @@
+from pydantic import BaseModel
+from functools import lru_cache
+from typing import List, Optional, Set
+import builtins
+import inspect
+import ast
+
+# colours the prompts forbid, some exist in manim but render badly or break the dry run
+FORBIDDEN_COLORS = {"GOLD", "TEAL", "CYAN", "MAGENTA", "MAROON"}
+FORBIDDEN_COLOR_PREFIXES = ("PASTEL_", "VIVID_", "BRIGHT_")
+FORBIDDEN_BASES = {"MovingCameraScene"}
+ALLOWED_BASES = {"Scene", "ThreeDScene"}
+
+class Diagnostic(BaseModel):
+    code: str
+    message: str
+    line: Optional[int] = None
+
+    def __str__(self) -> str:
+        location = f"line {self.line}: " if self.line else ""
+        return f"[{self.code}] {location}{self.message}"
+
+@lru_cache(maxsize=1)
+def _manim_namespace() -> Optional[dict]:
+    """Public names exported by `from manim import *`, None when manim isn't importable"""
+    try:
+        import manim
+    except Exception:
+        return None
+
+    names = getattr(manim, "__all__", None) or [name for name in dir(manim) if not name.startswith("_")]
+    return {name: getattr(manim, name) for name in names if hasattr(manim, name)}
+
+@lru_cache(maxsize=512)
+def _accepted_kwargs(name: str) -> Optional[frozenset]:
+    """Keyword args a manim callable accepts, None when it takes **kwargs or can't be inspected"""
+    obj = (_manim_namespace() or {}).get(name)
+    if obj is None or not callable(obj):
+        return None
+
+    try:
+        signature = inspect.signature(obj)
+    except (TypeError, ValueError):
+        return None
+
+    accepted = set()
+    for param in signature.parameters.values():
+        if param.kind == inspect.Parameter.VAR_KEYWORD:
+            return None
+        accepted.add(param.name)
+    return frozenset(accepted)
+
+def _bound_names(tree: ast.AST) -> Set[str]:
+    """Every name the script binds anywhere, scopes are ignored to keep false positives down"""
+    names = set()
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Name) and isinstance(node.ctx, (ast.Store, ast.Del)):
+            names.add(node.id)
+        elif isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+            names.add(node.name)
+        elif isinstance(node, ast.arg):
+            names.add(node.arg)
+        elif isinstance(node, (ast.Import, ast.ImportFrom)):
+            for alias in node.names:
+                names.add((alias.asname or alias.name).split(".")[0])
+        elif isinstance(node, ast.ExceptHandler) and node.name:
+            names.add(node.name)
+        elif isinstance(node, (ast.Global, ast.Nonlocal)):
+            names.update(node.names)
+        elif isinstance(node, ast.MatchAs) and node.name:
+            names.add(node.name)
+    return names
+
+def _base_name(base: ast.expr) -> str:
+    if isinstance(base, ast.Name):
+        return base.id
+    if isinstance(base, ast.Attribute):
+        return base.attr
+    return ""
+
+def _self_attributes(class_node: ast.ClassDef) -> Set[str]:
+    attrs = {node.name for node in class_node.body if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef))}
+    for node in ast.walk(class_node):
+        if isinstance(node, ast.Attribute) and isinstance(node.ctx, ast.Store) and isinstance(node.value, ast.Name) and node.value.id == "self":
+            attrs.add(node.attr)
+    return attrs
+
+def check_manim_code(code: str, segment_id: int) -> List[Diagnostic]:
+    """Static checks that catch the common generated code failures without running manim"""
+
+    try:
+        tree = ast.parse(code)
+    except SyntaxError as e:
+        return [Diagnostic(code="syntax_error", message=f"{e.msg}: {(e.text or '').strip()}", line=e.lineno)]
+
+    diagnostics = []
+
+    imports_manim = any(
+        isinstance(node, ast.ImportFrom) and node.module and node.module.split(".")[0] == "manim"
+        for node in tree.body
+    ) or any(
+        isinstance(node, ast.Import) and any(alias.name == "manim" for alias in node.names)
+        for node in tree.body
+    )
+    if not imports_manim:
+        diagnostics.append(Diagnostic(code="missing_import", message="Missing 'from manim import *'", line=1))
+
+    classes = [node for node in tree.body if isinstance(node, ast.ClassDef)]
+    expected_class = f"Segment{segment_id}"
+    scene_class = next((node for node in classes if node.name == expected_class), None)
+
+    if scene_class is None:
+        diagnostics.append(Diagnostic(code="missing_scene_class", message=f"No class named {expected_class} found"))
+
+    for node in classes:
+        for base in node.bases:
+            base_name = _base_name(base)
+            if base_name in FORBIDDEN_BASES:
+                diagnostics.append(Diagnostic(code="forbidden_base_class", message=f"{node.name} inherits from {base_name}, use Scene or ThreeDScene", line=node.lineno))
+
+    if scene_class is not None and not any(_base_name(base) in ALLOWED_BASES for base in scene_class.bases):
+        diagnostics.append(Diagnostic(code="invalid_base_class", message=f"{expected_class} must inherit from Scene or ThreeDScene", line=scene_class.lineno))
+
+    namespace = _manim_namespace()
+    bound = _bound_names(tree) | set(dir(builtins))
+    reported = set()
+
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Name) and isinstance(node.ctx, ast.Load):
+            name = node.id
+            if name in FORBIDDEN_COLORS or name.startswith(FORBIDDEN_COLOR_PREFIXES):
+                if name not in bound and ("color", name) not in reported:
+                    reported.add(("color", name))
+                    diagnostics.append(Diagnostic(code="forbidden_color", message=f"Colour {name} is not allowed, use BLUE, RED, GREEN, YELLOW, PURPLE, ORANGE, WHITE, PINK or GRAY", line=node.lineno))
+                continue
+
+            if namespace is not None and name not in bound and name not in namespace and ("name", name) not in reported:
+                reported.add(("name", name))
+                diagnostics.append(Diagnostic(code="undefined_name", message=f"Name {name} is not defined and is not exported by manim", line=node.lineno))
+
+        elif isinstance(node, ast.Call) and isinstance(node.func, ast.Name) and namespace is not None:
+            name = node.func.id
+            if name in bound:
+                continue
+            accepted = _accepted_kwargs(name)
+            if accepted is None:
+                continue
+            for keyword in node.keywords:
+                if keyword.arg and keyword.arg not in accepted:
+                    diagnostics.append(Diagnostic(code="unknown_kwarg", message=f"{name}() got an unexpected keyword argument '{keyword.arg}'", line=node.lineno))
+
+    if namespace is not None:
+        for node in classes:
+            scene_bases = [namespace.get(_base_name(base)) for base in node.bases]
+            scene_bases = [base for base in scene_bases if inspect.isclass(base)]
+            if not scene_bases:
+                continue
+
+            own_attrs = _self_attributes(node)
+            for call in ast.walk(node):
+                if not (isinstance(call, ast.Call) and isinstance(call.func, ast.Attribute)):
+                    continue
+                target = call.func
+                if not (isinstance(target.value, ast.Name) and target.value.id == "self"):
+                    continue
+                if target.attr in own_attrs or any(hasattr(base, target.attr) for base in scene_bases):
+                    continue
+                diagnostics.append(Diagnostic(code="unknown_scene_method", message=f"{node.name} has no method self.{target.attr}() (base: {', '.join(base.__name__ for base in scene_bases)})", line=call.lineno))
+
+    return diagnostics
+
+def format_diagnostics(diagnostics: List[Diagnostic]) -> str:
+    lines = ["STATIC CHECK FAILED (code was not executed):"]
+    lines.extend(str(diagnostic) for diagnostic in diagnostics)
+    return "\n".join(lines)
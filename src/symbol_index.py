@@ -0,0 +1,224 @@
+from pathlib import Path
+from typing import Dict, List, Optional
+from .static_check import _manim_namespace
+from .render_cache import manim_version
+from .context_packer import ContextChunk
+import threading
+import difflib
+import inspect
+import json
+import re
+
+SYMBOL_INDEX_PATH = Path("./symbol_index/manim_symbols.json")
+
+MAX_CHUNKS_PER_SYMBOL = 5
+WORD = re.compile(r"[A-Za-z_][A-Za-z0-9_]*")
+CLASS_NAME = re.compile(r"\b([A-Z][a-z]+[A-Za-z0-9]*)\b")
+# ErrorSignature.symbol forms: Class.attr, Class(kwarg=), Class(arg), Class
+SYMBOL_FORM = re.compile(r"^([\w]+)(?:\.(\w+)|\((\w+)=?\))?$")
+
+def _signature(obj) -> str:
+    try:
+        return str(inspect.signature(obj))
+    except (TypeError, ValueError):
+        return "(...)"
+
+def _summary(obj, limit: int = 300) -> str:
+    """First paragraph of the object's own docstring, inherited ones would describe the base class"""
+    doc = inspect.cleandoc(obj.__doc__) if isinstance(getattr(obj, "__doc__", None), str) else ""
+    return doc.split("\n\n")[0].replace("\n", " ").strip()[:limit]
+
+def _is_manim(obj) -> bool:
+    return (getattr(obj, "__module__", "") or "").startswith("manim")
+
+def build_symbols(namespace: Dict[str, object]) -> Dict[str, dict]:
+    """Classes, their own methods and functions of the manim namespace, methods keyed as Owner.method"""
+    symbols: Dict[str, dict] = {}
+
+    def add_class(cls):
+        if cls.__name__ in symbols:
+            return
+        symbols[cls.__name__] = {
+            "kind": "class",
+            "signature": f"{cls.__name__}{_signature(cls)}",
+            "doc": _summary(cls),
+            "module": cls.__module__,
+            "mro": [base.__name__ for base in cls.__mro__ if _is_manim(base)],
+            "methods": [],
+        }
+
+        # only the methods a class defines itself, inherited ones are found through the mro at lookup
+        for name, member in vars(cls).items():
+            if name.startswith("_"):
+                continue
+            if isinstance(member, (staticmethod, classmethod)):
+                member = member.__func__
+            if isinstance(member, property):
+                symbols[f"{cls.__name__}.{name}"] = {"kind": "property", "signature": f"{cls.__name__}.{name}", "doc": _summary(member)}
+            elif inspect.isfunction(member):
+                symbols[f"{cls.__name__}.{name}"] = {"kind": "method", "signature": f"{cls.__name__}.{name}{_signature(member)}", "doc": _summary(member)}
+            else:
+                continue
+            symbols[cls.__name__]["methods"].append(name)
+
+        for base in cls.__mro__[1:]:
+            if _is_manim(base):
+                add_class(base)
+
+    for name, obj in namespace.items():
+        if name.startswith("_") or not _is_manim(obj):
+            continue
+        if inspect.isclass(obj):
+            add_class(obj)
+        elif inspect.isfunction(obj):
+            symbols[name] = {"kind": "function", "signature": f"{name}{_signature(obj)}", "doc": _summary(obj)}
+
+    return symbols
+
+def link_doc_chunks(symbols: Dict[str, dict], chunk_ids: List[str], chunk_texts: List[str]):
+    """Attach the ids of docs chunks that mention a class, or a class together with one of its (inherited) methods"""
+    for chunk_id, text in zip(chunk_ids, chunk_texts):
+        words = set(WORD.findall(text))
+        for word in words:
+            entry = symbols.get(word)
+            if entry is None or entry["kind"] != "class":
+                continue
+            chunks = entry.setdefault("chunks", [])
+            if len(chunks) < MAX_CHUNKS_PER_SYMBOL:
+                chunks.append(chunk_id)
+            for owner in entry["mro"]:
+                for method in symbols.get(owner, {}).get("methods", []):
+                    if method not in words:
+                        continue
+                    method_chunks = symbols[f"{owner}.{method}"].setdefault("chunks", [])
+                    if chunk_id not in method_chunks and len(method_chunks) < MAX_CHUNKS_PER_SYMBOL:
+                        method_chunks.append(chunk_id)
+
+def build_symbol_index(docs_store=None, path: Path = SYMBOL_INDEX_PATH) -> Optional[Path]:
+    """Introspect the installed manim and join its symbols with the chunk ids of the docs collection"""
+    namespace = _manim_namespace()
+    if namespace is None:
+        print("Warning: manim is not importable, symbol index not built")
+        return None
+
+    symbols = build_symbols(namespace)
+    if docs_store is not None:
+        data = docs_store._collection.get(include=["documents"])
+        link_doc_chunks(symbols, data["ids"], data["documents"])
+
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(f"tmp_{path.name}")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump({"manim_version": manim_version(), "symbols": symbols}, f)
+    tmp_path.replace(path)
+
+    print(f"----Symbol index with {len(symbols)} symbols written to {path}")
+    return path
+
+class SymbolIndex:
+    """Exact lookups of manim classes, methods and functions with their signatures and linked docs chunks"""
+
+    def __init__(self, symbols: Dict[str, dict]):
+        self.symbols = symbols
+
+    @classmethod
+    def load(cls, path: Path = SYMBOL_INDEX_PATH) -> "SymbolIndex":
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        if data.get("manim_version") != manim_version():
+            print(f"Warning: symbol index was built for manim {data.get('manim_version')}, installed is {manim_version()}")
+        return cls(data["symbols"])
+
+    def _member(self, class_name: str, member: str) -> Optional[dict]:
+        """Method or property of a class, resolved through its mro"""
+        entry = self.symbols.get(class_name)
+        if entry is None or entry["kind"] != "class":
+            return None
+        for owner in entry["mro"]:
+            found = self.symbols.get(f"{owner}.{member}")
+            if found is not None:
+                return found
+        return None
+
+    def _all_members(self, class_name: str) -> List[str]:
+        members = []
+        for owner in self.symbols[class_name]["mro"]:
+            members.extend(self.symbols.get(owner, {}).get("methods", []))
+        return members
+
+    def lookup(self, symbol: str) -> List[dict]:
+        """Entries for an ErrorSignature style symbol, closest members of the class when the member does not exist"""
+        match = SYMBOL_FORM.match(symbol or "")
+        if match is None:
+            return []
+
+        name, member, argument = match.groups()
+        entry = self.symbols.get(name)
+        if entry is None:
+            return []
+        if entry["kind"] != "class" or not member:
+            return [entry]
+
+        found = self._member(name, member)
+        if found is not None:
+            return [found, entry]
+
+        close = difflib.get_close_matches(member, self._all_members(name), n=3)
+        return [entry] + [self._member(name, candidate) for candidate in close]
+
+    def snippet(self, entries: List[dict]) -> str:
+        """Compact signatures and one line docs instead of whole docs chunks"""
+        lines = []
+        for entry in entries:
+            lines.append(entry["signature"])
+            if entry.get("doc"):
+                lines.append(f"    {entry['doc']}")
+        return "\n".join(lines)
+
+    def chunk_ids(self, entries: List[dict]) -> List[str]:
+        ids = []
+        for entry in entries:
+            for chunk_id in entry.get("chunks", []):
+                if chunk_id not in ids:
+                    ids.append(chunk_id)
+        return ids
+
+    def signature_chunks(self, text: str, limit: int = 8) -> List[ContextChunk]:
+        """Signatures of the manim classes named in a prompt, e.g. the pseudocode given to codegen"""
+        chunks = []
+        seen = set()
+        for name in CLASS_NAME.findall(text):
+            entry = self.symbols.get(name)
+            if name in seen or entry is None or entry["kind"] == "method":
+                continue
+            seen.add(name)
+            chunks.append(ContextChunk(slot="docs", text=f"--- Signature ---\n{self.snippet([entry])}\n", score=1.0))
+            if len(chunks) >= limit:
+                break
+        return chunks
+
+_index: Optional[SymbolIndex] = None
+_index_loaded = False
+_index_lock = threading.Lock()
+
+def get_symbol_index(path: Path = SYMBOL_INDEX_PATH) -> Optional[SymbolIndex]:
+    """Process wide symbol index, None when it has not been built"""
+    global _index, _index_loaded
+    with _index_lock:
+        if not _index_loaded:
+            _index_loaded = True
+            try:
+                _index = SymbolIndex.load(path) if Path(path).exists() else None
+            except Exception as e:
+                print(f"Error loading symbol index: {e}")
+                _index = None
+        return _index
+
+if __name__ == "__main__":
+    from langchain_chroma import Chroma
+    from .retrieval import COLLECTIONS
+
+    docs_dir = COLLECTIONS["docs"]
+    store = Chroma(collection_name="docs", persist_directory=docs_dir) if Path(docs_dir).exists() else None
+    build_symbol_index(store)
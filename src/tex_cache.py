@@ -0,0 +1,143 @@
+from pathlib import Path
+from typing import Iterable, Optional
+import contextlib
+import os
+import shutil
+import time
+import uuid
+
+try:
+    import fcntl
+except ImportError:  # windows
+    fcntl = None
+
+DEFAULT_CACHE_DIR = Path(".cache/tex")
+DEFAULT_MAX_BYTES = 512 * 1024 ** 2
+DEFAULT_MAX_AGE_DAYS = 30
+
+# manim writes compiled LaTeX to <media_dir>/Tex and Pango text to <media_dir>/texts,
+# both named by a hash of their content so the svgs can be shared between renders
+CACHED_SUBDIRS = ("Tex", "texts")
+
+class TexCache:
+    """Persistent svg cache shared by every render and dry run
+
+    Renders never write into the cache directly, each job gets its own media dir seeded
+    with hard links to the cached svgs and newly compiled svgs are published back
+    with an atomic rename, so concurrent jobs never see a half written file.
+    """
+
+    def __init__(self, cache_dir: Path = DEFAULT_CACHE_DIR, max_bytes: int = DEFAULT_MAX_BYTES, max_age_days: float = DEFAULT_MAX_AGE_DAYS):
+        self.cache_dir = Path(cache_dir)
+        self.max_bytes = max_bytes
+        self.max_age_sec = max_age_days * 24 * 3600
+        for subdir in CACHED_SUBDIRS:
+            (self.cache_dir / subdir).mkdir(parents=True, exist_ok=True)
+
+    @contextlib.contextmanager
+    def _locked(self):
+        if fcntl is None:
+            yield
+            return
+
+        with open(self.cache_dir / ".lock", "w") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def seed(self, media_dir: Path, names: Optional[Iterable[str]] = None) -> int:
+        """Link cached svgs into a job's media dir, returns the number of files linked
+
+        With `names` (see tex_prewarm.tex_svg_names) only those Tex svgs are linked, so a job
+        costs a few links instead of one per cached file. Pango text svgs are cheap to render
+        and are only seeded when everything is. Without `names` the whole cache is linked.
+        """
+        if names is not None:
+            return self._link((self.cache_dir / "Tex" / name for name in names), Path(media_dir) / "Tex")
+
+        linked = 0
+        for subdir in CACHED_SUBDIRS:
+            linked += self._link((self.cache_dir / subdir).glob("*.svg"), Path(media_dir) / subdir)
+        return linked
+
+    def _link(self, svgs: Iterable[Path], target_dir: Path) -> int:
+        target_dir.mkdir(parents=True, exist_ok=True)
+        linked = 0
+        for svg in svgs:
+            target = target_dir / svg.name
+            if target.exists():
+                continue
+            try:
+                os.link(svg, target)
+            except FileNotFoundError:
+                # evicted while we were iterating, or never cached
+                continue
+            except OSError:
+                shutil.copy2(svg, target)
+            linked += 1
+        return linked
+
+    def publish(self, media_dir: Path) -> int:
+        """Move newly compiled svgs from a finished job into the cache, returns the number added"""
+        published = 0
+        for subdir in CACHED_SUBDIRS:
+            source_dir = Path(media_dir) / subdir
+            if not source_dir.exists():
+                continue
+
+            for svg in source_dir.glob("*.svg"):
+                target = self.cache_dir / subdir / svg.name
+                if target.exists():
+                    continue
+
+                tmp = target.with_name(f".{svg.name}.{uuid.uuid4().hex}")
+                try:
+                    shutil.copy2(svg, tmp)
+                    os.replace(tmp, target)
+                    published += 1
+                except OSError as e:
+                    tmp.unlink(missing_ok=True)
+                    print(f"----TeX cache publish failed for {svg.name}: {e}")
+
+        if published:
+            self.evict()
+
+        return published
+
+    def evict(self):
+        now = time.time()
+        with self._locked():
+            entries = []
+            total = 0
+            for subdir in CACHED_SUBDIRS:
+                for svg in (self.cache_dir / subdir).glob("*.svg"):
+                    try:
+                        stat = svg.stat()
+                    except FileNotFoundError:
+                        continue
+
+                    last_used = max(stat.st_atime, stat.st_mtime)
+                    if now - last_used > self.max_age_sec:
+                        svg.unlink(missing_ok=True)
+                        continue
+
+                    entries.append((last_used, stat.st_size, svg))
+                    total += stat.st_size
+
+            for _, size, svg in sorted(entries):
+                if total <= self.max_bytes:
+                    break
+                svg.unlink(missing_ok=True)
+                total -= size
+
+def get_tex_cache(configurable: dict) -> Optional[TexCache]:
+    if not configurable.get("tex_cache", True):
+        return None
+
+    return TexCache(
+        cache_dir=Path(configurable.get("tex_cache_dir", DEFAULT_CACHE_DIR)),
+        max_bytes=configurable.get("tex_cache_max_bytes", DEFAULT_MAX_BYTES),
+        max_age_days=configurable.get("tex_cache_max_age_days", DEFAULT_MAX_AGE_DAYS)
+    )
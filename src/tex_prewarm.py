@@ -0,0 +1,228 @@
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from langchain_core.runnables.config import RunnableConfig
+from pathlib import Path
+from typing import List, Optional, Set, Tuple
+from functools import lru_cache
+from .state import VideoState
+from .tex_cache import TexCache, get_tex_cache
+import multiprocessing
+import tempfile
+import shutil
+import ast
+import os
+
+TEX_CLASSES = ("MathTex", "Tex", "SingleStringMathTex")
+
+# kwargs that change the LaTeX source manim compiles, everything else (colours, fonts sizes) only styles the svg
+TEX_KWARGS = ("tex_environment", "arg_separator", "substrings_to_isolate", "tex_to_color_map")
+
+TexJob = Tuple[str, tuple, tuple]
+
+def _literal(node: ast.AST):
+    return ast.literal_eval(node)
+
+def _call_name(call: ast.Call) -> str:
+    if isinstance(call.func, ast.Name):
+        return call.func.id
+    if isinstance(call.func, ast.Attribute):
+        return call.func.attr
+    return ""
+
+def _tex_kwargs(call: ast.Call):
+    kwargs = []
+    for keyword in call.keywords:
+        if keyword.arg == "tex_template" or keyword.arg is None:
+            # custom templates and **kwargs can't be reproduced statically
+            return None
+        if keyword.arg not in TEX_KWARGS:
+            continue
+
+        if keyword.arg == "tex_to_color_map":
+            # only the keys decide how the tex is split, the colours do not matter
+            if not isinstance(keyword.value, ast.Dict):
+                return None
+            keys = [_literal(key) for key in keyword.value.keys]
+            kwargs.append((keyword.arg, tuple((key, "#FFFFFF") for key in keys)))
+        else:
+            value = _literal(keyword.value)
+            kwargs.append((keyword.arg, tuple(value) if isinstance(value, list) else value))
+
+    return tuple(sorted(kwargs))
+
+def extract_tex_jobs(manim_script: str) -> List[TexJob]:
+    """Statically find every MathTex/Tex call whose arguments are plain literals"""
+    try:
+        tree = ast.parse(manim_script)
+    except SyntaxError:
+        return []
+
+    jobs = []
+    for node in ast.walk(tree):
+        if not isinstance(node, ast.Call):
+            continue
+
+        class_name = _call_name(node)
+        if class_name not in TEX_CLASSES:
+            continue
+
+        try:
+            args = tuple(_literal(arg) for arg in node.args)
+            kwargs = _tex_kwargs(node)
+        except (ValueError, TypeError, SyntaxError):
+            continue
+
+        if not args or kwargs is None or not all(isinstance(arg, str) for arg in args):
+            continue
+
+        jobs.append((class_name, args, kwargs))
+
+    return jobs
+
+@lru_cache(maxsize=4096)
+def _job_svg_names(job: TexJob) -> frozenset:
+    """File names manim gives the svgs of one tex call, computed with manim's own template and hash
+
+    A MathTex compiles its joined string and then every piece on its own, so one call can need
+    several svgs. Names that don't match what manim ends up writing only cost a recompile.
+    """
+    import manim
+    from manim.utils.tex_file_writing import tex_hash
+
+    class_name, args, kwargs = job
+    kwargs = dict(kwargs)
+    tex_class = manim.Tex if class_name == "Tex" else manim.MathTex
+    environment = kwargs.get("tex_environment", "center" if class_name == "Tex" else "align*")
+
+    # an uninitialised instance is enough to run manim's string splitting without compiling anything
+    mob = object.__new__(tex_class)
+    if class_name == "SingleStringMathTex":
+        expressions = list(args[:1])
+    else:
+        separator = kwargs.get("arg_separator", "" if class_name == "Tex" else " ")
+        mob.substrings_to_isolate = list(kwargs.get("substrings_to_isolate") or [])
+        mob.tex_to_color_map = dict(kwargs.get("tex_to_color_map") or ())
+        pieces = mob._break_up_tex_strings(args)
+        expressions = [separator.join(pieces), *pieces]
+
+    template = manim.config.tex_template
+    return frozenset(
+        tex_hash(template.get_texcode_for_expression_in_env(mob._get_modified_expression(expression), environment)) + ".svg"
+        for expression in expressions
+    )
+
+def tex_svg_names(manim_script: str) -> Optional[Set[str]]:
+    """Cached svgs a script can use, None when manim isn't importable here and the caller should seed everything"""
+    names = set()
+    for job in extract_tex_jobs(manim_script):
+        try:
+            names.update(_job_svg_names(job))
+        except ImportError:
+            return None
+        except Exception:
+            # manim's internals moved, this expression simply gets compiled
+            continue
+    return names
+
+def _compile_tex(job: TexJob, media_dir: str, cache_dir: str) -> TexJob:
+    """Runs in a worker process, builds the mobject once so manim writes its svgs
+
+    Every job has its own media dir, so publishing only ever sees svgs this job finished.
+    """
+    import manim
+
+    try:
+        names = _job_svg_names(job)
+    except Exception:
+        names = frozenset()
+
+    tex_cache = TexCache(Path(cache_dir))
+    tex_cache.seed(Path(media_dir), names)
+    manim.config.media_dir = media_dir
+    class_name, args, kwargs = job
+    kwargs = dict(kwargs)
+    if "tex_to_color_map" in kwargs:
+        kwargs["tex_to_color_map"] = dict(kwargs["tex_to_color_map"])
+    if "substrings_to_isolate" in kwargs:
+        kwargs["substrings_to_isolate"] = list(kwargs["substrings_to_isolate"])
+
+    getattr(manim, class_name)(*args, **kwargs)
+    tex_cache.publish(Path(media_dir))
+    return job
+
+def _terminate_workers(executor: ProcessPoolExecutor):
+    """Stop workers still compiling, so nothing writes to the media dir or the cache after we return"""
+    processes = list((getattr(executor, "_processes", None) or {}).values())
+    for process in processes:
+        if process.is_alive():
+            process.terminate()
+    for process in processes:
+        process.join(timeout=5)
+
+def prewarm_tex(scripts: List[str], tex_cache: TexCache, max_workers: int, timeout: int = 120) -> int:
+    """Compile all unique tex expressions in parallel into the tex cache, returns the number compiled"""
+
+    jobs = []
+    seen = set()
+    for script in scripts:
+        for job in extract_tex_jobs(script):
+            if job not in seen:
+                seen.add(job)
+                jobs.append(job)
+
+    if not jobs:
+        return 0
+
+    media_dir = tempfile.mkdtemp(prefix="manim_tex_prewarm_")
+
+    compiled = 0
+    try:
+        # spawn so workers don't inherit the graph's threads
+        executor = ProcessPoolExecutor(max_workers=min(max_workers, len(jobs)), mp_context=multiprocessing.get_context("spawn"))
+        futures = [
+            executor.submit(_compile_tex, job, os.path.join(media_dir, f"job_{i}"), str(tex_cache.cache_dir))
+            for i, job in enumerate(jobs)
+        ]
+
+        timed_out = False
+        try:
+            for future in as_completed(futures, timeout=timeout):
+                try:
+                    future.result()
+                    compiled += 1
+                except Exception as e:
+                    print(f"----TeX prewarm failed for an expression, the renderer will compile it: {e}")
+        except TimeoutError:
+            timed_out = True
+            print(f"----TeX prewarm timed out after {timeout}s, continuing with partial cache")
+        finally:
+            for future in futures:
+                future.cancel()
+            if timed_out:
+                _terminate_workers(executor)
+            executor.shutdown(wait=True, cancel_futures=True)
+    finally:
+        shutil.rmtree(media_dir, ignore_errors=True)
+
+    return compiled
+
+def tex_prewarm_node(state: VideoState, config: RunnableConfig) -> dict:
+
+    configurable = config["configurable"]
+    tex_cache = get_tex_cache(configurable)
+
+    if tex_cache is None or not configurable.get("tex_prewarm", True):
+        print("----TeX prewarm disabled, skipping")
+        return {}
+
+    scripts = [segment.manim_script for segment in state.segments if segment.manim_script]
+    max_workers = configurable.get("tex_prewarm_workers") or os.cpu_count() or 1
+
+    print(f"Starting TeX prewarm for {len(scripts)} scripts")
+
+    try:
+        compiled = prewarm_tex(scripts, tex_cache, max_workers, timeout=configurable.get("tex_prewarm_timeout", 120))
+        print(f"----TeX prewarm compiled {compiled} unique expressions")
+    except Exception as e:
+        print(f"----Error in TeX prewarm, renderer will compile lazily: {e}")
+
+    return {}
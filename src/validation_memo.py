@@ -0,0 +1,96 @@
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+from .render_cache import manim_version
+from .error_parser import parse_error
+import threading
+import hashlib
+import sqlite3
+
+DEFAULT_MEMO_PATH = Path(".cache/validation_memo.sqlite")
+
+# errors the script itself causes, the same code fails the same way on every run
+DETERMINISTIC_ERRORS = {
+    "SyntaxError", "IndentationError", "NameError", "UnboundLocalError", "AttributeError", "TypeError",
+    "ValueError", "ImportError", "ModuleNotFoundError", "IndexError", "KeyError", "ZeroDivisionError",
+}
+
+# environment trouble that can surface as one of the errors above, e.g. a missing latex binary ends in a ValueError
+INFRASTRUCTURE_MARKERS = ("latex", "dvisvgm", "manim server", "memoryerror", "killed", "no space left", "timed out", "timeoutexpired")
+
+def failure_kind(logs: str) -> Optional[str]:
+    """Parsed error type of a failure the script deterministically causes, None for timeouts and infrastructure"""
+    lowered = logs.lower()
+    if any(marker in lowered for marker in INFRASTRUCTURE_MARKERS):
+        return None
+    signature = parse_error(logs)
+    return signature.exc_type if signature.exc_type in DETERMINISTIC_ERRORS else None
+
+class ValidationMemo:
+    """Remembers dry run outcomes by script hash so unchanged scripts are never validated twice
+
+    Always keeps an in-memory table for the current run, and mirrors it to sqlite
+    when a path is given so results survive across runs. Only passes and deterministic
+    code errors are remembered, a timeout or a broken environment is retried next time.
+    """
+
+    def __init__(self, path: Optional[Path] = None):
+        self._memory: Dict[str, Tuple[bool, str]] = {}
+        self._lock = threading.Lock()
+        self._conn = None
+        self.hits = 0
+        self.misses = 0
+
+        if path is not None:
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+            self._conn = sqlite3.connect(str(path), check_same_thread=False)
+            # memo_v2 also records the error kind, older tables may hold transient failures and are ignored
+            self._conn.execute("CREATE TABLE IF NOT EXISTS memo_v2 (key TEXT PRIMARY KEY, success INTEGER, error_kind TEXT, logs TEXT)")
+            self._conn.commit()
+
+    @staticmethod
+    def key(code: str, segment_id: int) -> str:
+        # the segment id decides the expected class name, the manim version decides the dry run outcome
+        return hashlib.sha256(f"{segment_id}\0{manim_version()}\0{code}".encode("utf-8")).hexdigest()
+
+    def get(self, code: str, segment_id: int) -> Optional[Tuple[bool, str]]:
+        key = self.key(code, segment_id)
+        with self._lock:
+            result = self._memory.get(key)
+            if result is None and self._conn is not None:
+                row = self._conn.execute("SELECT success, logs FROM memo_v2 WHERE key = ?", (key,)).fetchone()
+                if row is not None:
+                    result = (bool(row[0]), row[1])
+                    self._memory[key] = result
+
+            if result is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+            return result
+
+    def put(self, code: str, segment_id: int, success: bool, logs: str) -> bool:
+        """Remember a dry run outcome, returns False when the failure was not deterministic and is skipped"""
+        error_kind = None
+        if not success:
+            error_kind = failure_kind(logs)
+            if error_kind is None:
+                return False
+
+        key = self.key(code, segment_id)
+        with self._lock:
+            self._memory[key] = (success, logs)
+            if self._conn is not None:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO memo_v2 (key, success, error_kind, logs) VALUES (?, ?, ?, ?)",
+                    (key, int(success), error_kind, logs)
+                )
+                self._conn.commit()
+        return True
+
+_default_memo = ValidationMemo()
+
+def get_validation_memo(configurable: dict) -> Optional[ValidationMemo]:
+    """The memo passed in the run config, or a process wide in-memory one"""
+    if not configurable.get("validation_memo_enabled", True):
+        return None
+    return configurable.get("validation_memo") or _default_memo
@@ -0,0 +1,40 @@
+from src.duration import analyze_duration, rescale_waits
+import ast
+
+HELPER_TWICE = """from manim import *
+
+class Segment1(Scene):
+    def pause(self):
+        self.wait(1.5)
+
+    def construct(self):
+        self.play(Create(Circle()), run_time=2)
+        self.pause()
+        self.pause()
+"""
+
+def test_wait_in_helper_called_twice_is_rescaled_once():
+    rescaled = rescale_waits(HELPER_TWICE, 1, 4.0)
+
+    ast.parse(rescaled)
+    assert "self.wait(1)" in rescaled
+    assert analyze_duration(rescaled, 1, 4.0).total == 4.0
+
+def test_wait_without_duration_argument_is_skipped():
+    code = HELPER_TWICE.replace("self.pause()\n        self.pause()", "self.wait(frozen_frame=False)\n        self.wait(3)")
+    rescaled = rescale_waits(code, 1, 4.0)
+
+    assert "self.wait(frozen_frame=False)" in rescaled
+    assert "self.wait(1)" in rescaled
+
+def test_approximate_estimate_is_not_rescaled():
+    code = HELPER_TWICE.replace("self.pause()\n        self.pause()", "for item in items:\n            self.wait(2)")
+
+    assert analyze_duration(code, 1, 3.0).approximate
+    assert rescale_waits(code, 1, 3.0) is None
+
+def test_reassigned_constant_marks_estimate_approximate():
+    code = HELPER_TWICE.replace("self.pause()\n        self.pause()", "t = 1\n        t += 2\n        self.play(FadeIn(Square()), run_time=t)")
+
+    assert analyze_duration(code, 1, 5.0).approximate
+    assert rescale_waits(code, 1, 5.0) is None